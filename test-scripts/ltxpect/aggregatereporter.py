@@ -1,50 +1,123 @@
-from typing import Sequence, TYPE_CHECKING
+import asyncio
+from typing import Awaitable, Callable, Sequence, TYPE_CHECKING
 
 from .coreabc import ITestReporter
 from .testresult import TestResult
 
+_ReporterEvent = Callable[[ITestReporter], Awaitable[None]]
+
 
 class AggregateReporter:
     """Test reporter that delegates reporting to an ordered collection of
     other test reporters.
+
+    Each reporter is passed the events through its own bounded queue, by a task
+    of its own, such that a slow reporter holds up neither the other reporters
+    nor the tests that report their results (until its queue is full). Each
+    reporter receives the events in order.
+
+    The result of the test run is reported to the reporters in order, once all
+    of them have processed the preceding events. If a reporter raises an
+    exception, it is not passed any more events, and the exception is re-raised
+    from report_test_run_result_async().
     """
 
-    def __init__(self, reporters: Sequence[ITestReporter]) -> None:
+    def __init__(
+        self, reporters: Sequence[ITestReporter], max_pending_events: int = 1024
+    ) -> None:
         self.reporters = tuple(reporters)
+        self.max_pending_events = max_pending_events
+
+        self._queues: list[asyncio.Queue[_ReporterEvent]] = []
+        self._consumers: list[asyncio.Task[None]] = []
+        self._errors: list[Exception | None] = []
+
+    def _ensure_consumers_started(self) -> None:
+        if self._consumers:
+            return
+
+        self._queues = [
+            asyncio.Queue(maxsize=self.max_pending_events) for _ in self.reporters
+        ]
+        self._errors = [None] * len(self.reporters)
+        self._consumers = [
+            asyncio.ensure_future(self._consume_events_async(index))
+            for index in range(len(self.reporters))
+        ]
+
+    async def _stop_consumers_async(self) -> None:
+        consumers = self._consumers
+        self._consumers = []
+
+        for consumer in consumers:
+            consumer.cancel()
+
+        if consumers:
+            await asyncio.wait(consumers)
+
+    async def _consume_events_async(self, index: int) -> None:
+        reporter = self.reporters[index]
+        queue = self._queues[index]
+
+        while True:
+            event = await queue.get()
+
+            try:
+                # Keep taking events after an error, such that the events are
+                # not held up by a full queue
+                if self._errors[index] is None:
+                    await event(reporter)
+            except Exception as e:
+                self._errors[index] = e
+            finally:
+                queue.task_done()
+
+    async def _dispatch_event_async(self, event: _ReporterEvent) -> None:
+        self._ensure_consumers_started()
+
+        for queue in self._queues:
+            await queue.put(event)
 
     async def report_warmup_compile_started_async(self) -> None:
         """Report that the warmup compile step has started."""
 
-        for reporter in self.reporters:
-            await reporter.report_warmup_compile_started_async()
+        await self._dispatch_event_async(
+            lambda reporter: reporter.report_warmup_compile_started_async()
+        )
 
     async def report_warmup_compile_progress_async(self, test_name: str) -> None:
         """Report that the warmup compile step has finished processing the
         specified test.
         """
 
-        for reporter in self.reporters:
-            await reporter.report_warmup_compile_progress_async(test_name)
+        await self._dispatch_event_async(
+            lambda reporter: reporter.report_warmup_compile_progress_async(test_name)
+        )
 
     async def report_warmup_compile_ended_async(self) -> None:
         """Report that the warmup compile step has ended."""
 
-        for reporter in self.reporters:
-            await reporter.report_warmup_compile_ended_async()
+        await self._dispatch_event_async(
+            lambda reporter: reporter.report_warmup_compile_ended_async()
+        )
 
     async def report_test_run_started_async(self) -> None:
         """Report that the test run has started."""
 
-        for reporter in self.reporters:
-            await reporter.report_test_run_started_async()
+        await self._dispatch_event_async(
+            lambda reporter: reporter.report_test_run_started_async()
+        )
 
     async def report_test_result_async(
         self, test_name: str, test_passed: bool, test_result: TestResult
     ) -> None:
         """Report the result of a single test case after having been run."""
 
-        for reporter in self.reporters:
-            await reporter.report_test_result_async(test_name, test_passed, test_result)
+        await self._dispatch_event_async(
+            lambda reporter: reporter.report_test_result_async(
+                test_name, test_passed, test_result
+            )
+        )
 
     async def report_test_run_result_async(self) -> None:
         """Report the result of the overall test run. The reporter is expected
@@ -52,8 +125,21 @@ class AggregateReporter:
         each individual test case.
         """
 
-        for reporter in self.reporters:
-            await reporter.report_test_run_result_async()
+        self._ensure_consumers_started()
+
+        # Let each reporter process all its pending events
+        await asyncio.gather(*(queue.join() for queue in self._queues))
+
+        errors = self._errors
+        await self._stop_consumers_async()
+
+        for reporter, error in zip(self.reporters, errors):
+            if error is None:
+                await reporter.report_test_run_result_async()
+
+        for error in errors:
+            if error is not None:
+                raise error
 
 
 if TYPE_CHECKING:
@@ -1,11 +1,151 @@
 import asyncio
+import collections
+import contextlib
+import enum
+import functools
 import os
-from typing import Awaitable, cast, Mapping, NamedTuple
+import signal
+import subprocess
+import sys
+import threading
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Awaitable, Callable, cast, Mapping, NamedTuple
 
 
-class AsyncPopenResult(NamedTuple):
-    """The result from running a child process, after it has terminated."""
+class AsyncPopenResourceUsage(NamedTuple):
+    """The resource usage of a child process, or the combined resource usage
+    of several child processes. Fields that are not available on the platform
+    are None.
+    """
+
+    wall_time: float
+    """Elapsed (wall-clock) time in seconds, from starting the child process
+    until it had terminated.
+    """
+
+    user_time: float | None = None
+    """CPU time spent in user mode, in seconds."""
+
+    system_time: float | None = None
+    """CPU time spent in kernel mode, in seconds."""
+
+    max_rss: int | None = None
+    """Maximum resident set size, in bytes. For a child process that runs other
+    processes, this is the maximum over the child process and its descendants.
+
+    NOTE: on Linux, this is at least the maximum resident set size of this
+    process when the child process was started, since the kernel also counts
+    the memory of the process image that is replaced by exec.
+    """
+
+    def combine(self, other: "AsyncPopenResourceUsage") -> "AsyncPopenResourceUsage":
+        """Return the combined resource usage, where times are added, and the
+        maximum resident set size is the largest of the two.
+        """
+
+        def add(a: float | None, b: float | None) -> float | None:
+            if a is None or b is None:
+                return a if b is None else b
+            return a + b
+
+        return AsyncPopenResourceUsage(
+            wall_time=self.wall_time + other.wall_time,
+            user_time=add(self.user_time, other.user_time),
+            system_time=add(self.system_time, other.system_time),
+            max_rss=(
+                max(self.max_rss or 0, other.max_rss or 0)
+                if self.max_rss is not None or other.max_rss is not None
+                else None
+            ),
+        )
+
+
+class AsyncPopenResourceUsageRecorder:
+    """Collects the resource usage of all child processes that are run by
+    popen_async() within a record_resource_usage() block, including from tasks
+    that are created within the block.
+    """
+
+    def __init__(self) -> None:
+        self.num_processes = 0
+        self.total: AsyncPopenResourceUsage | None = None
+
+    def add(self, resource_usage: AsyncPopenResourceUsage) -> None:
+        self.num_processes += 1
+        self.total = (
+            resource_usage if self.total is None else self.total.combine(resource_usage)
+        )
+
+
+_active_resource_usage_recorders: ContextVar[
+    tuple[AsyncPopenResourceUsageRecorder, ...]
+] = ContextVar("_active_resource_usage_recorders", default=())
+
+
+@contextlib.contextmanager
+def record_resource_usage() -> Iterator[AsyncPopenResourceUsageRecorder]:
+    """Record the resource usage of the child processes that are run within the
+    block (blocks may be nested).
+    """
+    recorder = AsyncPopenResourceUsageRecorder()
+    token = _active_resource_usage_recorders.set(
+        (*_active_resource_usage_recorders.get(), recorder)
+    )
+    try:
+        yield recorder
+    finally:
+        _active_resource_usage_recorders.reset(token)
+
 
+class AsyncPopenProcessInfo(NamedTuple):
+    """Information about a child process that was run by popen_async(), after
+    it has terminated.
+    """
+
+    args: tuple[str, ...]
+    """The command that was run."""
+
+    pid: int | None
+    """The process ID of the child process."""
+
+    start_time: float
+    """When the child process was started, as returned by loop.time() (which
+    is time.monotonic() for the standard event loops).
+    """
+
+    end_time: float
+    """When the child process had terminated, as returned by loop.time()."""
+
+    returncode: int | None
+    """The exit code of the child process, or None if not known."""
+
+    resource_usage: AsyncPopenResourceUsage
+    """The resource usage of the child process."""
+
+
+_active_process_observers: ContextVar[
+    tuple[Callable[[AsyncPopenProcessInfo], None], ...]
+] = ContextVar("_active_process_observers", default=())
+
+
+@contextlib.contextmanager
+def observe_processes(
+    observer: Callable[[AsyncPopenProcessInfo], None],
+) -> Iterator[None]:
+    """Call observer with information about each child process that is run
+    within the block (including from tasks that are created within the block),
+    after the child process has terminated. The observer is called in the
+    context of the task that ran the child process.
+    """
+    token = _active_process_observers.set((*_active_process_observers.get(), observer))
+    try:
+        yield
+    finally:
+        _active_process_observers.reset(token)
+
+
+class _AsyncPopenResultFields(NamedTuple):
     returncode: int
     """The exit code of the child process. Typically, an exit code 0 indicates
     that it ran successfully.
@@ -18,6 +158,41 @@ class AsyncPopenResult(NamedTuple):
     """Captured stderr from the child process, as a list of lines."""
 
 
+class AsyncPopenResult(_AsyncPopenResultFields):
+    """The result from running a child process, after it has terminated, which
+    unpacks as (returncode, stdout, stderr).
+    """
+
+    resource_usage: AsyncPopenResourceUsage | None = None
+    """The resource usage of the child process (not part of the tuple)."""
+
+    def __new__(
+        cls,
+        returncode: int,
+        stdout: tuple[bytes, ...],
+        stderr: tuple[bytes, ...],
+        *,
+        resource_usage: AsyncPopenResourceUsage | None = None,
+    ) -> "AsyncPopenResult":
+        self = super().__new__(cls, returncode, stdout, stderr)
+        self.resource_usage = resource_usage
+        return self
+
+
+class AsyncPopenTerminationStage(enum.Enum):
+    """How far the termination of a child process had to be escalated before
+    the child process (and its process group) terminated.
+    """
+
+    TERMINATED = "terminated"
+    """The process terminated after being sent SIGTERM."""
+
+    KILLED = "killed"
+    """The process did not terminate within the grace period after being sent
+    SIGTERM, and was sent SIGKILL.
+    """
+
+
 class AsyncPopenTimeoutError(Exception):
     """An error that is thrown if the wait for a child process to complete
     times out.
@@ -28,11 +203,15 @@ class AsyncPopenTimeoutError(Exception):
         returncode: int,
         stdout: tuple[bytes, ...],
         stderr: tuple[bytes, ...],
+        termination_stage: AsyncPopenTerminationStage | None = None,
+        resource_usage: AsyncPopenResourceUsage | None = None,
     ) -> None:
         super().__init__("The wait for the process to complete timed out")
         self._returncode = returncode
         self._stdout = stdout
         self._stderr = stderr
+        self._termination_stage = termination_stage
+        self._resource_usage = resource_usage
 
     @property
     def returncode(self) -> int:
@@ -51,26 +230,179 @@ class AsyncPopenTimeoutError(Exception):
         """Captured stderr from the child process, as a list of lines."""
         return self._stderr
 
+    @property
+    def termination_stage(self) -> AsyncPopenTerminationStage | None:
+        """How far the termination of the child process had to be escalated
+        after the timeout, or None if no child process was started.
+        """
+        return self._termination_stage
+
+    @property
+    def resource_usage(self) -> AsyncPopenResourceUsage | None:
+        """The resource usage of the child process, up until it was terminated,
+        or None if no child process was started.
+        """
+        return self._resource_usage
+
+
+class _LineBuffer:
+    """Splits the output from a pipe into lines as it arrives, and retains the
+    last lines, optionally bounded by a number of lines and/or bytes.
+    """
+
+    def __init__(self, max_lines: int | None, max_bytes: int | None) -> None:
+        self._max_bytes = max_bytes
+        self._partial_line = bytearray()
+        self._lines: collections.deque[bytes] = collections.deque(maxlen=max_lines)
+        self._num_line_bytes = 0
+
+    @staticmethod
+    def _find_end_of_complete_lines(data: bytearray) -> int:
+        # A trailing CR could be the first half of a CRLF, so hold it back until
+        # more data arrives
+        end = len(data) - 1 if data.endswith(b"\r") else len(data)
+        return max(data.rfind(b"\n", 0, end), data.rfind(b"\r", 0, end)) + 1
+
+    def _retain_line(self, line: bytes) -> None:
+        if self._lines.maxlen == 0:
+            return
+
+        if self._max_bytes is not None:
+            line = line[max(len(line) - self._max_bytes, 0) :]
+
+        if len(self._lines) == self._lines.maxlen:
+            self._num_line_bytes -= len(self._lines[0])
+
+        self._lines.append(line)
+        self._num_line_bytes += len(line)
+
+        if self._max_bytes is not None:
+            while self._num_line_bytes > self._max_bytes:
+                self._num_line_bytes -= len(self._lines.popleft())
+
+    def feed(self, data: bytes) -> list[bytes]:
+        """Add data from the pipe, and return the lines that were completed."""
+        self._partial_line.extend(data)
+
+        end = self._find_end_of_complete_lines(self._partial_line)
+        if end == 0:
+            lines = []
+        else:
+            lines = self._partial_line[:end].splitlines()
+            del self._partial_line[:end]
+
+        # Only the tail of an overly long line can be retained anyway
+        if self._max_bytes is not None and len(self._partial_line) > self._max_bytes:
+            del self._partial_line[: len(self._partial_line) - self._max_bytes]
+
+        result = [bytes(line) for line in lines]
+        for line in result:
+            self._retain_line(line)
+
+        return result
+
+    def flush(self) -> list[bytes]:
+        """Complete the last line, if the output did not end with a newline."""
+        result = [bytes(line) for line in self._partial_line.splitlines()]
+        self._partial_line.clear()
+
+        for line in result:
+            self._retain_line(line)
+
+        return result
+
+    @property
+    def lines(self) -> tuple[bytes, ...]:
+        return tuple(self._lines)
+
 
 class _AsyncProcessProtocol(asyncio.SubprocessProtocol):
     STDOUT = 1
     STDERR = 2
 
-    def __init__(self, completed_future: asyncio.Future[AsyncPopenResult]) -> None:
+    # Reading from the pipes is paused while this many lines are waiting to be
+    # passed to the line callback, and resumed when the backlog has been worked
+    # down to the low water mark
+    LINE_QUEUE_HIGH_WATER = 1024
+    LINE_QUEUE_LOW_WATER = 256
+
+    def __init__(
+        self,
+        completed_future: asyncio.Future[AsyncPopenResult],
+        max_captured_lines: int | None = None,
+        max_captured_bytes: int | None = None,
+        line_queue: asyncio.Queue[tuple[int, bytes] | None] | None = None,
+    ) -> None:
         self._completed_future = completed_future
-        self._stdout = bytearray()
-        self._stderr = bytearray()
+        self._stdout = _LineBuffer(max_captured_lines, max_captured_bytes)
+        self._stderr = _LineBuffer(max_captured_lines, max_captured_bytes)
+        self._line_queue = line_queue
+        self._is_reading_paused = False
         self._transport: asyncio.SubprocessTransport | None = None
 
+        self.child_resource_usage: tuple[float, float, int] | None = None
+        """The user time, system time and maximum resident set size (in bytes)
+        of the child process, which is set by the transport once the child
+        process has exited, if available on the platform.
+        """
+
     def connection_made(self, transport: asyncio.BaseTransport) -> None:
         assert isinstance(transport, asyncio.SubprocessTransport)
         self._transport = transport
 
+    def _set_reading_paused(self, paused: bool) -> None:
+        if self._transport is None or self._transport.is_closing():
+            return
+
+        for fd in (self.STDOUT, self.STDERR):
+            pipe_transport = self._transport.get_pipe_transport(fd)
+            if isinstance(pipe_transport, asyncio.ReadTransport):
+                if paused:
+                    pipe_transport.pause_reading()
+                else:
+                    pipe_transport.resume_reading()
+
+        self._is_reading_paused = paused
+
+    def _enqueue_lines(self, fd: int, lines: list[bytes]) -> None:
+        if self._line_queue is None:
+            return
+
+        for line in lines:
+            self._line_queue.put_nowait((fd, line))
+
+        if (
+            not self._is_reading_paused
+            and self._line_queue.qsize() >= self.LINE_QUEUE_HIGH_WATER
+        ):
+            self._set_reading_paused(True)
+
     def pipe_data_received(self, fd: int, data: bytes) -> None:
         if fd == self.STDOUT:
-            self._stdout.extend(data)
+            self._enqueue_lines(fd, self._stdout.feed(data))
         elif fd == self.STDERR:
-            self._stderr.extend(data)
+            self._enqueue_lines(fd, self._stderr.feed(data))
+
+    async def dispatch_lines_async(
+        self, line_callback: Callable[[int, bytes], Awaitable[None]]
+    ) -> None:
+        """Pass each line of output to the line callback, in the order in which
+        the lines were received, until the process has terminated.
+        """
+        assert self._line_queue is not None
+
+        while True:
+            item = await self._line_queue.get()
+            if item is None:
+                return
+
+            if (
+                self._is_reading_paused
+                and self._line_queue.qsize() <= self.LINE_QUEUE_LOW_WATER
+            ):
+                self._set_reading_paused(False)
+
+            await line_callback(*item)
 
     # Note: we use connection_lost() instead of process_exited(), because it seems that stdout and stderr data might
     # not be flushed when process_exited() is called, whereas the Python documentation states that
@@ -82,10 +414,252 @@ class _AsyncProcessProtocol(asyncio.SubprocessProtocol):
         returncode = self._transport.get_returncode()
         assert isinstance(returncode, int)
 
-        stdout = tuple(bytes(line) for line in self._stdout.splitlines())
-        stderr = tuple(bytes(line) for line in self._stderr.splitlines())
+        self._enqueue_lines(self.STDOUT, self._stdout.flush())
+        self._enqueue_lines(self.STDERR, self._stderr.flush())
+        if self._line_queue is not None:
+            self._line_queue.put_nowait(None)
+
+        self._completed_future.set_result(
+            AsyncPopenResult(returncode, self._stdout.lines, self._stderr.lines)
+        )
+
+
+# On POSIX, each child process is started in a new session, such that it is the
+# leader of a new process group that contains all its descendants
+_USE_PROCESS_GROUPS = os.name == "posix"
+
+
+def _signal_process_group(transport: asyncio.SubprocessTransport, kill: bool) -> None:
+    """Send SIGKILL (if kill is True) or SIGTERM to the process group of the
+    child process.
+
+    NOTE: on Windows, there are no process groups (and no SIGKILL), so only the
+    child process itself is terminated, with TerminateProcess() in either case.
+    Its descendants (e.g. the processes run by latexmk) are left running.
+    """
+    if _USE_PROCESS_GROUPS:
+        pid = transport.get_pid()
+        sig = signal.SIGKILL if kill else signal.SIGTERM
+
+        # The process group outlives its leader for as long as any of the
+        # leader's descendants are alive
+        with contextlib.suppress(ProcessLookupError, PermissionError):
+            os.killpg(pid, sig)
+    else:
+        with contextlib.suppress(ProcessLookupError):
+            if kill:
+                transport.kill()
+            else:
+                transport.terminate()
+
+
+async def _terminate_process_group_async(
+    transport: asyncio.SubprocessTransport,
+    completed_future: asyncio.Future[AsyncPopenResult],
+    grace_period: float,
+) -> AsyncPopenTerminationStage:
+    """Send SIGTERM to the process group of the child process, and escalate to
+    SIGKILL if the child process has not terminated after the grace period
+    (see _signal_process_group() for Windows).
+    """
+    stage = AsyncPopenTerminationStage.TERMINATED
+    _signal_process_group(transport, kill=False)
+
+    _done, pending = await asyncio.wait([completed_future], timeout=grace_period)
+    if pending:
+        stage = AsyncPopenTerminationStage.KILLED
+        _signal_process_group(transport, kill=True)
+
+    # Closing the transport makes sure that the pipes are closed, even if they
+    # are held open by a process that has escaped the process group
+    transport.close()
+    await completed_future
+
+    return stage
+
+
+class _PipeProtocol(asyncio.Protocol):
+    def __init__(self, transport: "_Wait4SubprocessTransport", fd: int) -> None:
+        self._transport = transport
+        self._fd = fd
+
+    def data_received(self, data: bytes) -> None:
+        self._transport._pipe_data_received(self._fd, data)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._transport._pipe_connection_lost()
+
+
+class _Wait4SubprocessTransport(asyncio.SubprocessTransport):
+    """Subprocess transport (for POSIX) that waits for the child process with
+    os.wait4() in a thread, like asyncio's ThreadedChildWatcher does with
+    waitpid(), to get the resource usage of the child process. The asyncio
+    child watchers discard it, and the growth of RUSAGE_CHILDREN can not be
+    attributed to a single child process when several exit at about the same
+    time.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        protocol: _AsyncProcessProtocol,
+        popen: "subprocess.Popen[bytes]",
+    ) -> None:
+        super().__init__()
+        self._loop = loop
+        self._protocol = protocol
+        self._popen = popen
+        self._pipes: dict[int, asyncio.ReadTransport] = {}
+        self._num_open_pipes = 2
+        self._returncode: int | None = None
+        self._is_closing = False
+        self._is_finished = False
+
+    async def connect_pipes_async(self) -> None:
+        for fd, pipe in ((1, self._popen.stdout), (2, self._popen.stderr)):
+            pipe_transport, _ = await self._loop.connect_read_pipe(
+                functools.partial(_PipeProtocol, self, fd), pipe
+            )
+            self._pipes[fd] = cast(asyncio.ReadTransport, pipe_transport)
+
+    def wait4(self) -> None:
+        """Wait for the child process to exit (blocking), and pass its exit code
+        and resource usage to the event loop.
+        """
+        _pid, status, rusage = os.wait4(self._popen.pid, 0)
+
+        # ru_maxrss is in kilobytes on Linux, but in bytes on macOS
+        max_rss = (
+            rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+        )
+
+        # (the event loop may have been closed in the meantime)
+        with contextlib.suppress(RuntimeError):
+            self._loop.call_soon_threadsafe(
+                self._process_exited,
+                os.waitstatus_to_exitcode(status),
+                (rusage.ru_utime, rusage.ru_stime, max_rss),
+            )
+
+    def _process_exited(
+        self, returncode: int, resource_usage: tuple[float, float, int]
+    ) -> None:
+        self._returncode = returncode
+
+        # Keep Popen from waiting for the child process itself
+        self._popen.returncode = returncode
+
+        self._protocol.child_resource_usage = resource_usage
+        self._protocol.process_exited()
+        self._finish_if_done()
+
+    def _pipe_data_received(self, fd: int, data: bytes) -> None:
+        self._protocol.pipe_data_received(fd, data)
+
+    def _pipe_connection_lost(self) -> None:
+        self._num_open_pipes -= 1
+        self._finish_if_done()
+
+    def _finish_if_done(self) -> None:
+        if self._is_finished or self._returncode is None or self._num_open_pipes:
+            return
+
+        self._is_finished = True
+        if self._popen.stdin is not None:
+            self._popen.stdin.close()
+
+        self._loop.call_soon(self._protocol.connection_lost, None)
+
+    def get_pid(self) -> int:
+        return self._popen.pid
+
+    def get_returncode(self) -> int | None:
+        return self._returncode
+
+    def get_pipe_transport(self, fd: int) -> asyncio.BaseTransport | None:
+        return self._pipes.get(fd)
 
-        self._completed_future.set_result(AsyncPopenResult(returncode, stdout, stderr))
+    def send_signal(self, signal: int) -> None:
+        # Popen.send_signal() would wait for the child process itself
+        if self._returncode is not None:
+            raise ProcessLookupError()
+
+        os.kill(self._popen.pid, signal)
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+    def is_closing(self) -> bool:
+        return self._is_closing
+
+    def close(self) -> None:
+        """Close the pipes, and kill the child process if it is still running
+        (like the asyncio subprocess transports).
+        """
+        if self._is_closing:
+            return
+
+        self._is_closing = True
+        for pipe_transport in self._pipes.values():
+            pipe_transport.close()
+
+        if self._popen.stdin is not None:
+            self._popen.stdin.close()
+
+        with contextlib.suppress(ProcessLookupError):
+            self.kill()
+
+
+async def _subprocess_exec_async(
+    loop: asyncio.AbstractEventLoop,
+    protocol_factory: Callable[[], _AsyncProcessProtocol],
+    *args: str,
+    cwd: str | None,
+    env: Mapping[str, str],
+    start_new_session: bool,
+) -> tuple[asyncio.SubprocessTransport, _AsyncProcessProtocol]:
+    """Start a child process, like loop.subprocess_exec(), but with a transport
+    that provides the resource usage of the child process (on POSIX).
+    """
+    if sys.platform == "win32":
+        return await loop.subprocess_exec(
+            protocol_factory,
+            *args,
+            cwd=cwd,
+            env=env,
+            start_new_session=start_new_session,
+        )
+
+    popen = subprocess.Popen(
+        args,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        start_new_session=start_new_session,
+    )
+
+    protocol = protocol_factory()
+    transport = _Wait4SubprocessTransport(loop, protocol, popen)
+
+    # The protocol gets the transport before any output arrives
+    protocol.connection_made(transport)
+
+    threading.Thread(
+        target=transport.wait4, name=f"wait4-{popen.pid}", daemon=True
+    ).start()
+
+    try:
+        await transport.connect_pipes_async()
+    except BaseException:
+        transport.close()
+        raise
+
+    return transport, protocol
 
 
 async def popen_async(
@@ -94,38 +668,159 @@ async def popen_async(
     timeout: float = 0,
     cwd: str | None = None,
     env: Mapping[str, str] | None = None,
+    *,
+    line_callback: Callable[[int, bytes], Awaitable[None]] | None = None,
+    max_captured_lines: int | None = None,
+    max_captured_bytes: int | None = None,
+    termination_grace_period: float = 5,
 ) -> AsyncPopenResult:
     """Run the (non-interactive) command described by args as a child process,
     and wait for the process to terminate (with an optional timeout).
+
+    If line_callback is given, it is awaited with the file descriptor (1 for
+    stdout, 2 for stderr) and content of each line of output, in order, while
+    the process runs. The process is terminated if the callback raises.
+
+    By default, all output is captured. The captured output can be limited to
+    the last max_captured_lines lines and/or max_captured_bytes bytes of each
+    of stdout and stderr (lines that are longer are truncated to their end).
+
+    On timeout or cancellation, the process group of the child process is sent
+    SIGTERM, followed by SIGKILL if the child process has not terminated after
+    termination_grace_period seconds. On Windows, only the child process
+    itself is terminated, and not its descendants.
+
+    The resource usage of the child process is returned with the result, and
+    recorded by any active record_resource_usage() blocks. Any active
+    observe_processes() observers are called once the child process has
+    terminated.
     """
     if env is None:
         env = os.environ
 
     completed_future = cast(asyncio.Future[AsyncPopenResult], loop.create_future())
 
-    transport, _protocol = await loop.subprocess_exec(
-        lambda: _AsyncProcessProtocol(completed_future), *args, cwd=cwd, env=env
+    line_queue: asyncio.Queue[tuple[int, bytes] | None] | None = None
+    if line_callback is not None:
+        line_queue = asyncio.Queue()
+
+    start_time = loop.time()
+
+    transport, protocol = await _subprocess_exec_async(
+        loop,
+        lambda: _AsyncProcessProtocol(
+            completed_future, max_captured_lines, max_captured_bytes, line_queue
+        ),
+        *args,
+        cwd=cwd,
+        env=env,
+        start_new_session=_USE_PROCESS_GROUPS,
+    )
+
+    return await _wait_for_process_async(
+        args,
+        transport,
+        protocol,
+        completed_future,
+        start_time,
+        timeout,
+        line_callback,
+        termination_grace_period,
     )
 
+
+async def _wait_for_process_async(
+    args: list[str],
+    transport: asyncio.SubprocessTransport,
+    protocol: _AsyncProcessProtocol,
+    completed_future: asyncio.Future[AsyncPopenResult],
+    start_time: float,
+    timeout: float,
+    line_callback: Callable[[int, bytes], Awaitable[None]] | None,
+    termination_grace_period: float,
+) -> AsyncPopenResult:
+    loop = asyncio.get_running_loop()
+
+    def get_resource_usage() -> AsyncPopenResourceUsage:
+        end_time = loop.time()
+        resource_usage = AsyncPopenResourceUsage(
+            end_time - start_time, *(protocol.child_resource_usage or ())
+        )
+
+        for recorder in _active_resource_usage_recorders.get():
+            recorder.add(resource_usage)
+
+        observers = _active_process_observers.get()
+        if observers:
+            process_info = AsyncPopenProcessInfo(
+                args=tuple(args),
+                pid=transport.get_pid(),
+                start_time=start_time,
+                end_time=end_time,
+                returncode=transport.get_returncode(),
+                resource_usage=resource_usage,
+            )
+            for observer in observers:
+                observer(process_info)
+
+        return resource_usage
+
+    dispatch_task: asyncio.Task[None] | None = None
+    if line_callback is not None:
+        dispatch_task = asyncio.create_task(
+            protocol.dispatch_lines_async(line_callback)
+        )
+
+        def on_dispatch_done(task: asyncio.Task[None]) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                transport.close()
+
+        dispatch_task.add_done_callback(on_dispatch_done)
+
     try:
-        to_await: Awaitable[AsyncPopenResult] = completed_future
+        # Note: need to shield the completed_future, to be able to do another
+        # await for it below (on timeout or cancellation) without it having
+        # been cancelled, or getting an InvalidStateError
+        to_await: Awaitable[AsyncPopenResult] = asyncio.shield(completed_future)
         if timeout > 0:
-            # Note: need to shield the completed_future, to be able to do another
-            # await for it below without getting an InvalidStateError
-            to_await = asyncio.wait_for(asyncio.shield(to_await), timeout)
+            to_await = asyncio.wait_for(to_await, timeout)
 
-        returncode, stdout, stderr = await to_await
-    except asyncio.CancelledError as e:
-        transport.close()
-        returncode, stdout, stderr = await completed_future
+        result = await to_await
+    except asyncio.CancelledError:
+        await _terminate_process_group_async(
+            transport, completed_future, termination_grace_period
+        )
+        get_resource_usage()
+
+        if dispatch_task is not None:
+            dispatch_task.cancel()
 
         raise
     except asyncio.TimeoutError:
-        transport.close()
-        returncode, stdout, stderr = await completed_future
+        termination_stage = await _terminate_process_group_async(
+            transport, completed_future, termination_grace_period
+        )
+        result = completed_future.result()
+        resource_usage = get_resource_usage()
 
-        raise AsyncPopenTimeoutError(returncode, stdout, stderr)
+        if dispatch_task is not None:
+            await dispatch_task
+
+        raise AsyncPopenTimeoutError(
+            result.returncode,
+            result.stdout,
+            result.stderr,
+            termination_stage,
+            resource_usage,
+        )
     else:
         transport.close()
 
-    return AsyncPopenResult(returncode, stdout, stderr)
+    resource_usage = get_resource_usage()
+
+    # Wait for the remaining lines to be passed to the callback, and propagate
+    # any exception from it
+    if dispatch_task is not None:
+        await dispatch_task
+
+    return AsyncPopenResult(*result, resource_usage=resource_usage)
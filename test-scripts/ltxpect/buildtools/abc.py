@@ -1,7 +1,6 @@
+from collections.abc import Sequence
 from typing import Awaitable, Protocol, NamedTuple
 
-from ltxpect import asyncpopen
-
 
 class ImageDimensions(NamedTuple):
     width: int
@@ -20,6 +19,24 @@ class IPngImageComparer(Protocol):
     ) -> Awaitable[bool]: ...
 
 
+class LatexBuildResult(NamedTuple):
+    """The result from building a LaTeX document."""
+
+    returncode: int
+    """The exit code of the build. An exit code 0 indicates that the document
+    was built successfully.
+    """
+
+    stdout: tuple[bytes, ...]
+    """Captured stdout from the build, as a list of lines."""
+
+    stderr: tuple[bytes, ...]
+    """Captured stderr from the build, as a list of lines."""
+
+    num_passes: int | None = None
+    """The number of LaTeX passes that were run, if known by the build tool."""
+
+
 class ILatexDocumentBuildTool(Protocol):
     def build_latex_document_async(
         self,
@@ -29,7 +46,18 @@ class ILatexDocumentBuildTool(Protocol):
         latex_build_dir_subpath: str,
         latex_jobname: str,
         timeout: float = 0,
-    ) -> Awaitable[asyncpopen.AsyncPopenResult]: ...
+    ) -> Awaitable[LatexBuildResult]: ...
+
+
+class IPreambleFormatProvider(Protocol):
+    def get_preamble_format_path_async(
+        self, texfile_parent_dir_path: str, texfile_filename: str, timeout: float = 0
+    ) -> Awaitable[str | None]:
+        """Return the path to a LaTeX format file with the preamble of the
+        specified document preloaded, generating the format file if needed.
+        Returns None if the document cannot be compiled against a preamble
+        format.
+        """
 
 
 class IPdfDocInfo(Protocol):
@@ -45,6 +73,20 @@ class IPdfDocInfoProvider(Protocol):
 
 
 class IPdfPageRasterizer(Protocol):
+    @property
+    def rasterizer_settings(self) -> str:
+        """A string that identifies the rasterizer and all settings that affect
+        the rasterized output (e.g. output device and resolution).
+        """
+
     def convert_pdf_page_to_png_async(
         self, pdf_path: str, page_num: int, output_png_path: str
     ) -> Awaitable[None]: ...
+
+    def convert_pdf_pages_to_png_async(
+        self, pdf_path: str, page_nums: Sequence[int], output_png_path_template: str
+    ) -> Awaitable[None]:
+        """Convert a set of pages from the same PDF to PNG images in one go. The
+        output_png_path_template must contain a single '%d' placeholder, which
+        is substituted with the page number of each converted page.
+        """
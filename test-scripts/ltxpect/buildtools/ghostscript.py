@@ -1,4 +1,8 @@
 import asyncio
+import os
+import subprocess
+import tempfile
+from collections.abc import Sequence
 from typing import Self, Type, TYPE_CHECKING
 
 from ltxpect import asyncpopen
@@ -7,47 +11,132 @@ from .abc import IPdfPageRasterizer
 
 
 class GhostScriptPdfPageRasterizer:
-    def __init__(self, gs_cmd: str) -> None:
+    GS_RENDER_ARGS = (
+        "-q",
+        "-dQUIET",
+        "-dSAFER",
+        "-dBATCH",
+        "-dNOPAUSE",
+        "-dNOPROMPT",
+        "-sDEVICE=png16m",
+        "-dPDFUseOldCMS=false",
+        "-dMaxBitmap=500000000",
+        "-dAlignToPixels=0",
+        "-dGridFitTT=2",
+        "-r150",
+    )
+
+    def __init__(self, gs_cmd: str, gs_version: str | None = None) -> None:
         self.gs_cmd = gs_cmd
 
-    async def convert_pdf_page_to_png_async(
-        self, pdf_path: str, page_num: int, output_png_path: str
-    ) -> None:
-        gs_cmd_args = [
+        # As output by "gs --version", since the rendering may change between
+        # GhostScript versions
+        self.gs_version = gs_version
+
+    @property
+    def rasterizer_settings(self) -> str:
+        version_settings = () if self.gs_version is None else (self.gs_version,)
+        return " ".join(
+            (os.path.basename(self.gs_cmd),) + version_settings + self.GS_RENDER_ARGS
+        )
+
+    def _get_gs_cmd_args(
+        self, pdf_path: str, page_selection_args: list[str], output_png_path: str
+    ) -> list[str]:
+        return [
             self.gs_cmd,
-            "-q",
-            "-dQUIET",
-            "-dSAFER",
-            "-dBATCH",
-            "-dNOPAUSE",
-            "-dNOPROMPT",
-            "-sDEVICE=png16m",
-            "-dPDFUseOldCMS=false",
-            "-dMaxBitmap=500000000",
-            "-dAlignToPixels=0",
-            "-dGridFitTT=2",
-            "-r150",
+            *self.GS_RENDER_ARGS,
             "-o",
             output_png_path,
-            "-dFirstPage=%s" % page_num,
-            "-dLastPage=%s" % page_num,
+            *page_selection_args,
             pdf_path,
         ]
 
+    async def convert_pdf_page_to_png_async(
+        self, pdf_path: str, page_num: int, output_png_path: str
+    ) -> None:
+        gs_cmd_args = self._get_gs_cmd_args(
+            pdf_path,
+            ["-dFirstPage=%s" % page_num, "-dLastPage=%s" % page_num],
+            output_png_path,
+        )
+
         returncode, _stdout, _stderr = await asyncpopen.popen_async(
             asyncio.get_running_loop(),
             gs_cmd_args,
             timeout=2 * 60,
+            max_captured_lines=0,
         )
 
         assert (
             returncode == 0
         ), f"Failed to generate PNG {output_png_path} from PDF {pdf_path} page {page_num}"
 
+    async def convert_pdf_pages_to_png_async(
+        self, pdf_path: str, page_nums: Sequence[int], output_png_path_template: str
+    ) -> None:
+        assert output_png_path_template.count("%d") == 1
+
+        sorted_page_nums = sorted(set(page_nums))
+        if not sorted_page_nums:
+            return
+
+        first_page_num = sorted_page_nums[0]
+        last_page_num = sorted_page_nums[-1]
+
+        if len(sorted_page_nums) == last_page_num - first_page_num + 1:
+            page_selection_args = [
+                "-dFirstPage=%s" % first_page_num,
+                "-dLastPage=%s" % last_page_num,
+            ]
+        else:
+            # NOTE: -sPageList requires GhostScript >= 9.52
+            page_selection_args = [
+                "-sPageList=%s" % ",".join(str(x) for x in sorted_page_nums)
+            ]
+
+        output_dir = os.path.dirname(output_png_path_template) or os.curdir
+
+        # GhostScript numbers the output files sequentially from 1, regardless of
+        # which pages are rendered. Render into a staging directory, and then move
+        # each output file to its final path, which is named by page number.
+        with tempfile.TemporaryDirectory(prefix=".gs-", dir=output_dir) as staging_dir:
+            staging_png_path_template = os.path.join(staging_dir, "%d.png")
+
+            gs_cmd_args = self._get_gs_cmd_args(
+                pdf_path, page_selection_args, staging_png_path_template
+            )
+
+            returncode, _stdout, _stderr = await asyncpopen.popen_async(
+                asyncio.get_running_loop(),
+                gs_cmd_args,
+                timeout=2 * 60 * len(sorted_page_nums),
+                max_captured_lines=0,
+            )
+
+            assert (
+                returncode == 0
+            ), f"Failed to generate PNGs {output_png_path_template} from PDF {pdf_path} pages {sorted_page_nums}"
+
+            for output_index, page_num in enumerate(sorted_page_nums, start=1):
+                os.replace(
+                    staging_png_path_template % output_index,
+                    output_png_path_template.replace("%d", str(page_num)),
+                )
+
     @classmethod
     def create(cls: Type[Self], locator: IExternalProgramLocator) -> Self:
         gs_cmd = locator.find_program("GhostScript", ["gs", "gswin64c", "gswin32c"])
-        return cls(gs_cmd)
+
+        gs_version = subprocess.run(
+            [gs_cmd, "--version"],
+            env=os.environ,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+
+        return cls(gs_cmd, gs_version.stdout.decode("utf-8", errors="replace").strip())
 
 
 if TYPE_CHECKING:
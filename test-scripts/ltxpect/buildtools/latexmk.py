@@ -0,0 +1,194 @@
+import asyncio
+import os
+import shlex
+import subprocess
+from collections.abc import Mapping
+from typing import Self, Type, TYPE_CHECKING
+
+from ltxpect import asyncpopen
+from ltxpect.coreabc import IExternalProgramLocator, IPathUtil
+from .abc import (
+    ILatexDocumentBuildTool,
+    IPreambleFormatProvider,
+    LatexBuildResult,
+)
+
+
+def _quote_shell_arg(arg: str) -> str:
+    """Quote an argument of a command that latexmk runs through the shell
+    (cmd.exe on Windows, and sh otherwise).
+    """
+    if os.name == "nt":
+        return subprocess.list2cmdline([arg])
+
+    return shlex.quote(arg)
+
+
+class LatexmkTestBuilder:
+    """Builds a test document by invoking latexmk directly, rather than going
+    through the _file target in test/Makefile. For documents that use
+    glossaries, latexmk is set up to run makeglossaries by itself.
+    """
+
+    # Only the last lines of output are kept, which is where LaTeX reports the
+    # error that stopped the build
+    MAX_CAPTURED_LINES = 500
+
+    def __init__(
+        self,
+        path_util: IPathUtil,
+        latexmk_cmd: str,
+        pdflatex_cmd: str,
+        makeglossaries_cmd: str,
+        env: Mapping[str, str] | None = None,
+        preamble_format_provider: IPreambleFormatProvider | None = None,
+    ) -> None:
+        self.path_util = path_util
+        self.latexmk_cmd = latexmk_cmd
+        self.pdflatex_cmd = pdflatex_cmd
+        self.makeglossaries_cmd = makeglossaries_cmd
+
+        # Extra environment variables for the build
+        self.env = dict(env or {})
+
+        self.preamble_format_provider = preamble_format_provider
+
+    def _uses_glossaries(self, texfile_path: str) -> bool:
+        with open(texfile_path, "rb") as fp:
+            return b"\\makeglossaries" in fp.read()
+
+    def _get_makeglossaries_custom_dependency_code(self) -> str:
+        """Perl code for latexmk, that makes latexmk run makeglossaries whenever
+        the glossary or acronym input files change, such that no separate
+        pdflatex and makeglossaries passes are needed before running latexmk.
+        """
+        makeglossaries_cmd = self.makeglossaries_cmd.replace("\\", "\\\\").replace(
+            "'", "\\'"
+        )
+
+        # Not using the -d option of makeglossaries, due to incompatibility with
+        # some systems. Instead, run it from within the output directory.
+        return (
+            "add_cus_dep('glo', 'gls', 0, 'ltxpect_makeglossaries');"
+            "add_cus_dep('acn', 'acr', 0, 'ltxpect_makeglossaries');"
+            "sub ltxpect_makeglossaries {"
+            " my ($base_name, $path) = fileparse($_[0]);"
+            " pushd($path);"
+            f" my $return = system('{makeglossaries_cmd}', '-q', $base_name);"
+            " popd();"
+            " return $return;"
+            " }"
+        )
+
+    async def build_latex_document_async(
+        self,
+        base_dir: str,
+        texfile_parent_dir_subpath: str,
+        texfile_filename: str,
+        latex_build_dir_subpath: str,
+        latex_jobname: str,
+        timeout: float = 0,
+    ) -> LatexBuildResult:
+        # Absolute path to the directory that contains the tex file
+        texfile_parent_dir_path = self.path_util.path_join(
+            base_dir, texfile_parent_dir_subpath
+        )
+
+        latex_build_dir_path = self.path_util.path_join(
+            base_dir, latex_build_dir_subpath
+        )
+
+        latex_build_dir_relative_to_texfile_parent_dir = self.path_util.path_relpath(
+            latex_build_dir_path, texfile_parent_dir_path
+        )
+
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+
+        env = {**os.environ, **self.env}
+        pdflatex_cmd_args = [_quote_shell_arg(self.pdflatex_cmd)]
+
+        if self.preamble_format_provider is not None:
+            fmt_path = (
+                await self.preamble_format_provider.get_preamble_format_path_async(
+                    texfile_parent_dir_path, texfile_filename, timeout=timeout
+                )
+            )
+
+            if fmt_path is not None:
+                # Let pdflatex find the format by name, by putting its directory
+                # first in the format search path (the trailing separator makes
+                # kpathsea append the default search path)
+                fmt_dir, fmt_filename = os.path.split(fmt_path)
+                env["TEXFORMATS"] = os.pathsep.join(
+                    (fmt_dir, env.get("TEXFORMATS", ""))
+                )
+                pdflatex_cmd_args.append(
+                    _quote_shell_arg(
+                        "-fmt={}".format(os.path.splitext(fmt_filename)[0])
+                    )
+                )
+
+            if timeout > 0:
+                timeout = max(timeout - (loop.time() - start_time), 1)
+
+        latexmk_extra_args: list[str] = []
+        if self._uses_glossaries(
+            self.path_util.path_join(texfile_parent_dir_path, texfile_filename)
+        ):
+            latexmk_extra_args = [
+                "-e",
+                self._get_makeglossaries_custom_dependency_code(),
+            ]
+
+        cmd = [
+            self.latexmk_cmd,
+            "-pdf",
+            "-pdflatex={} %O %S".format(" ".join(pdflatex_cmd_args)),
+            "-bibtex",
+            "-recorder",
+            "-latexoption=-shell-escape",
+            *latexmk_extra_args,
+            "-jobname={}".format(latex_jobname),
+            "-output-directory={}".format(
+                latex_build_dir_relative_to_texfile_parent_dir
+            ),
+            "-interaction=nonstopmode",
+            "-halt-on-error",
+            texfile_filename,
+        ]
+
+        returncode, stdout, stderr = await asyncpopen.popen_async(
+            loop,
+            cmd,
+            timeout=timeout,
+            cwd=texfile_parent_dir_path,
+            env=env,
+            max_captured_lines=self.MAX_CAPTURED_LINES,
+        )
+
+        return LatexBuildResult(returncode, stdout, stderr)
+
+    @classmethod
+    def create(
+        cls: Type[Self],
+        locator: IExternalProgramLocator,
+        path_util: IPathUtil,
+        env: Mapping[str, str] | None = None,
+        preamble_format_provider: IPreambleFormatProvider | None = None,
+    ) -> Self:
+        latexmk_cmd = locator.find_program("latexmk", ["latexmk"])
+        pdflatex_cmd = locator.find_program("pdflatex", ["pdflatex"])
+        makeglossaries_cmd = locator.find_program("makeglossaries", ["makeglossaries"])
+        return cls(
+            path_util,
+            latexmk_cmd,
+            pdflatex_cmd,
+            makeglossaries_cmd,
+            env,
+            preamble_format_provider,
+        )
+
+
+if TYPE_CHECKING:
+    _: type[ILatexDocumentBuildTool] = LatexmkTestBuilder
@@ -1,15 +1,22 @@
 import asyncio
+import os
+from collections.abc import Mapping
 from typing import TYPE_CHECKING
 
 from ltxpect import asyncpopen
 from ltxpect.coreabc import IPathUtil
-from .abc import ILatexDocumentBuildTool
+from .abc import ILatexDocumentBuildTool, LatexBuildResult
 
 
 class MakefileTestBuilder:
-    def __init__(self, path_util: IPathUtil) -> None:
+    def __init__(
+        self, path_util: IPathUtil, env: Mapping[str, str] | None = None
+    ) -> None:
         self.path_util = path_util
 
+        # Extra environment variables for the build
+        self.env = dict(env or {})
+
     async def build_latex_document_async(
         self,
         base_dir: str,
@@ -18,7 +25,7 @@ class MakefileTestBuilder:
         latex_build_dir_subpath: str,
         latex_jobname: str,
         timeout: float = 0,
-    ) -> asyncpopen.AsyncPopenResult:
+    ) -> LatexBuildResult:
         # Absolute path to the directory that contains the tex file
         texfile_parent_dir_path = self.path_util.path_join(
             base_dir, texfile_parent_dir_subpath
@@ -49,10 +56,15 @@ class MakefileTestBuilder:
             "LATEX_JOBNAME={}".format(latex_jobname),
         ]
 
-        return await asyncpopen.popen_async(
-            asyncio.get_running_loop(), cmd, timeout=timeout
+        returncode, stdout, stderr = await asyncpopen.popen_async(
+            asyncio.get_running_loop(),
+            cmd,
+            timeout=timeout,
+            env={**os.environ, **self.env},
         )
 
+        return LatexBuildResult(returncode, stdout, stderr)
+
 
 if TYPE_CHECKING:
     _: type[ILatexDocumentBuildTool] = MakefileTestBuilder
@@ -0,0 +1,742 @@
+import asyncio
+import hashlib
+import os
+import re
+import zlib
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, NamedTuple, Self, Type, TYPE_CHECKING
+
+from .abc import IPdfDocInfo, IPdfDocInfoProvider
+from .pdfinfo import PdfDocInfo
+
+# A PDF literal string, which may contain escaped characters, as well as
+# (one level of) balanced unescaped parentheses
+_PDF_STRING = rb"\((?:[^()\\]|\\.|\((?:[^()\\]|\\.)*\))*\)"
+
+# Parts of a PDF file that differ between two builds of the same document,
+# without affecting how the document is rendered. Each pattern is replaced
+# with a fixed placeholder when normalizing a PDF file.
+_VOLATILE_PDF_PATTERNS: tuple[tuple[re.Pattern[bytes], bytes], ...] = (
+    # Timestamps in the document information dictionary
+    (re.compile(rb"/CreationDate\s*" + _PDF_STRING), b"/CreationDate()"),
+    (re.compile(rb"/ModDate\s*" + _PDF_STRING), b"/ModDate()"),
+    # The file identifier in the trailer, which pdfTeX derives from the
+    # timestamp and the file name
+    (
+        re.compile(rb"/ID\s*\[\s*<[0-9A-Fa-f]*>\s*<[0-9A-Fa-f]*>\s*\]"),
+        b"/ID[]",
+    ),
+    # The producer and pdfTeX version banners
+    (re.compile(rb"/Producer\s*" + _PDF_STRING), b"/Producer()"),
+    (re.compile(rb"/PTEX\.Fullbanner\s*" + _PDF_STRING), b"/PTEX.Fullbanner()"),
+    # The cross-reference table and its offset, since the byte offsets of
+    # objects shift when any of the above have different lengths
+    (re.compile(rb"(?<=[\r\n])xref\s*[\r\n][0-9fn \r\n]*trailer"), b"xref trailer"),
+    (re.compile(rb"startxref\s+\d+"), b"startxref"),
+)
+
+
+def normalize_pdf_bytes(content: bytes) -> bytes:
+    """Replace the volatile metadata of a PDF file (timestamps, file
+    identifier, producer banner and cross-reference offsets) with fixed
+    placeholders, such that two builds of the same document compare equal.
+    """
+    for pattern, replacement in _VOLATILE_PDF_PATTERNS:
+        content = pattern.sub(replacement, content)
+
+    return content
+
+
+def pdf_files_are_equal_after_normalization(
+    pdf_path_first: str, pdf_path_second: str
+) -> bool:
+    """Check whether two PDF files are byte-identical after normalization.
+    If so, they are guaranteed to render identically. If not, they may or may
+    not render identically.
+    """
+    with open(pdf_path_first, "rb") as fp:
+        first = fp.read()
+
+    with open(pdf_path_second, "rb") as fp:
+        second = fp.read()
+
+    if first == second:
+        return True
+
+    return normalize_pdf_bytes(first) == normalize_pdf_bytes(second)
+
+
+class PdfParseError(Exception):
+    """An error that is thrown if a PDF file cannot be parsed by the
+    in-process PDF reader.
+    """
+
+
+class PdfName(str):
+    """A PDF name object (without the leading slash)."""
+
+
+class PdfRef(NamedTuple):
+    """A reference to an indirect PDF object."""
+
+    num: int
+    gen: int
+
+
+@dataclass(frozen=True, slots=True)
+class PdfStream:
+    """A PDF stream object, i.e. a dictionary and the (encoded) stream data."""
+
+    dictionary: dict[str, Any]
+    raw_data: bytes
+
+
+_WHITESPACE = b"\x00\t\n\x0c\r "
+_DELIMITERS = b"()<>[]{}/%"
+
+_WHITESPACE_AND_COMMENTS_RE = re.compile(rb"(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)*")
+_REF_RE = re.compile(rb"(\d+)\s+(\d+)\s+R(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])")
+_NUMBER_RE = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)")
+_REGULAR_CHARS_RE = re.compile(rb"[^\x00\t\n\x0c\r ()<>\[\]{}/%]*")
+_INDIRECT_OBJ_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj\b")
+_STREAM_KEYWORD_RE = re.compile(rb"stream(?:\r\n|\n|\r)")
+_XREF_ENTRY_RE = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+
+
+def _skip_whitespace(content: bytes, pos: int) -> int:
+    match = _WHITESPACE_AND_COMMENTS_RE.match(content, pos)
+    assert match is not None
+    return match.end()
+
+
+def _parse_literal_string(content: bytes, pos: int) -> tuple[bytes, int]:
+    assert content[pos : pos + 1] == b"("
+
+    depth = 0
+    i = pos
+    while i < len(content):
+        c = content[i]
+        if c == 0x5C:  # backslash
+            i += 2
+            continue
+        if c == 0x28:  # (
+            depth += 1
+        elif c == 0x29:  # )
+            depth -= 1
+            if depth == 0:
+                return content[pos + 1 : i], i + 1
+        i += 1
+
+    raise PdfParseError("Unterminated literal string")
+
+
+def parse_pdf_object(content: bytes, pos: int) -> tuple[Any, int]:
+    """Parse the PDF object at the given position, and return it along with
+    the position directly after it. Stream objects are not handled here (the
+    stream dictionary is returned).
+    """
+    pos = _skip_whitespace(content, pos)
+    if pos >= len(content):
+        raise PdfParseError("Unexpected end of file")
+
+    c = content[pos : pos + 1]
+
+    if c == b"/":
+        match = _REGULAR_CHARS_RE.match(content, pos + 1)
+        assert match is not None
+        return PdfName(match.group().decode("latin-1")), match.end()
+
+    if c == b"<" and content[pos : pos + 2] == b"<<":
+        result: dict[str, Any] = {}
+        pos += 2
+        while True:
+            pos = _skip_whitespace(content, pos)
+            if content[pos : pos + 2] == b">>":
+                return result, pos + 2
+
+            key, pos = parse_pdf_object(content, pos)
+            if not isinstance(key, PdfName):
+                raise PdfParseError(f"Expected name as dictionary key at {pos}")
+
+            result[key], pos = parse_pdf_object(content, pos)
+
+    if c == b"<":
+        end = content.find(b">", pos)
+        if end < 0:
+            raise PdfParseError("Unterminated hex string")
+        hex_digits = bytes(x for x in content[pos + 1 : end] if x not in _WHITESPACE)
+        return (
+            bytes.fromhex((hex_digits + b"0" * (len(hex_digits) % 2)).decode()),
+            end + 1,
+        )
+
+    if c == b"(":
+        return _parse_literal_string(content, pos)
+
+    if c == b"[":
+        items: list[Any] = []
+        pos += 1
+        while True:
+            pos = _skip_whitespace(content, pos)
+            if content[pos : pos + 1] == b"]":
+                return items, pos + 1
+
+            item, pos = parse_pdf_object(content, pos)
+            items.append(item)
+
+    ref_match = _REF_RE.match(content, pos)
+    if ref_match is not None:
+        return PdfRef(int(ref_match[1]), int(ref_match[2])), ref_match.end()
+
+    number_match = _NUMBER_RE.match(content, pos)
+    if number_match is not None:
+        token = number_match.group()
+        value = float(token) if b"." in token else int(token)
+        return value, number_match.end()
+
+    keyword_match = _REGULAR_CHARS_RE.match(content, pos)
+    assert keyword_match is not None
+    keyword = keyword_match.group()
+
+    if keyword == b"true":
+        return True, keyword_match.end()
+    if keyword == b"false":
+        return False, keyword_match.end()
+    if keyword == b"null":
+        return None, keyword_match.end()
+
+    raise PdfParseError(f"Unexpected token {keyword[:20]!r} at {pos}")
+
+
+def _apply_png_predictor(data: bytes, columns: int) -> bytes:
+    # Only the "Up" predictor is used in practice for xref streams, but all
+    # PNG predictors are handled, with a bytes-per-pixel of 1
+    row_len = columns + 1
+    prev = bytearray(columns)
+    out = bytearray()
+
+    for pos in range(0, len(data), row_len):
+        filter_type = data[pos]
+        row = bytearray(data[pos + 1 : pos + row_len])
+        for i in range(len(row)):
+            left = row[i - 1] if i > 0 else 0
+            up = prev[i]
+            up_left = prev[i - 1] if i > 0 else 0
+            if filter_type == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif filter_type == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif filter_type == 3:
+                row[i] = (row[i] + ((left + up) >> 1)) & 0xFF
+            elif filter_type == 4:
+                p = left + up - up_left
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - up_left)
+                if pa <= pb and pa <= pc:
+                    predictor = left
+                elif pb <= pc:
+                    predictor = up
+                else:
+                    predictor = up_left
+                row[i] = (row[i] + predictor) & 0xFF
+        out += row
+        prev = row
+
+    return bytes(out)
+
+
+def decode_pdf_stream(stream: PdfStream) -> bytes | None:
+    """Decode the data of a stream that has no filter, or only FlateDecode.
+    Returns None for streams using other filters.
+    """
+    filters = stream.dictionary.get("Filter")
+    if filters is None:
+        return stream.raw_data
+
+    if isinstance(filters, list):
+        if len(filters) != 1:
+            return None
+        filters = filters[0]
+
+    if filters != "FlateDecode":
+        return None
+
+    data = zlib.decompressobj().decompress(stream.raw_data)
+
+    decode_parms = stream.dictionary.get("DecodeParms")
+    if isinstance(decode_parms, list):
+        decode_parms = decode_parms[0] if decode_parms else None
+
+    if isinstance(decode_parms, dict) and decode_parms.get("Predictor", 1) >= 10:
+        data = _apply_png_predictor(data, int(decode_parms.get("Columns", 1)))
+
+    return data
+
+
+class PdfReader:
+    """Minimal in-process PDF reader, supporting cross-reference tables and
+    streams, object streams and the page tree. Only the FlateDecode filter is
+    supported for decoding stream data.
+    """
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+
+        # Maps object number -> byte offset (for uncompressed objects) or
+        # (object stream number, index) (for compressed objects)
+        self._xref: dict[int, int | tuple[int, int]] = {}
+        self.trailer: dict[str, Any] = {}
+
+        self._objects: dict[int, Any] = {}
+        self._object_streams: dict[int, tuple[bytes, list[tuple[int, int]]]] = {}
+
+        try:
+            self._read_xref()
+        except (PdfParseError, ValueError, IndexError, zlib.error):
+            self._xref.clear()
+            self.trailer.clear()
+            self._reconstruct_xref()
+
+    @classmethod
+    def from_file(cls: Type[Self], pdf_path: str) -> Self:
+        with open(pdf_path, "rb") as fp:
+            return cls(fp.read())
+
+    def _read_xref(self) -> None:
+        startxref_match = None
+        for startxref_match in _STARTXREF_RE.finditer(
+            self.content, max(0, len(self.content) - 1024)
+        ):
+            pass
+
+        if startxref_match is None:
+            raise PdfParseError("Missing startxref")
+
+        offset: int | None = int(startxref_match[1])
+        visited_offsets: set[int] = set()
+
+        while offset is not None and offset not in visited_offsets:
+            visited_offsets.add(offset)
+
+            pos = _skip_whitespace(self.content, offset)
+            if self.content.startswith(b"xref", pos):
+                trailer = self._read_xref_table(pos + 4)
+
+                # Hybrid-reference files have an additional xref stream
+                xref_stm_offset = trailer.get("XRefStm")
+                if isinstance(xref_stm_offset, int):
+                    self._read_xref_stream(xref_stm_offset)
+            else:
+                trailer = self._read_xref_stream(offset)
+
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+
+            prev = trailer.get("Prev")
+            offset = prev if isinstance(prev, int) else None
+
+        if "Root" not in self.trailer:
+            raise PdfParseError("Missing /Root in trailer")
+
+    def _read_xref_table(self, pos: int) -> dict[str, Any]:
+        while True:
+            pos = _skip_whitespace(self.content, pos)
+            if self.content.startswith(b"trailer", pos):
+                trailer, _ = parse_pdf_object(self.content, pos + 7)
+                if not isinstance(trailer, dict):
+                    raise PdfParseError("Invalid trailer")
+                return trailer
+
+            first_num, pos = parse_pdf_object(self.content, pos)
+            count, pos = parse_pdf_object(self.content, pos)
+            if not isinstance(first_num, int) or not isinstance(count, int):
+                raise PdfParseError("Invalid xref subsection header")
+
+            for obj_num in range(first_num, first_num + count):
+                pos = _skip_whitespace(self.content, pos)
+                entry_match = _XREF_ENTRY_RE.match(self.content, pos)
+                if entry_match is None:
+                    raise PdfParseError(f"Invalid xref entry at {pos}")
+                pos = entry_match.end()
+
+                # Entries from newer sections (read first) take precedence
+                if entry_match[3] == b"n" and obj_num not in self._xref:
+                    self._xref[obj_num] = int(entry_match[1])
+
+    def _read_xref_stream(self, offset: int) -> dict[str, Any]:
+        stream = self._parse_indirect_object_at(offset)
+        if not isinstance(stream, PdfStream) or stream.dictionary.get("Type") != "XRef":
+            raise PdfParseError(f"Expected xref stream at {offset}")
+
+        data = decode_pdf_stream(stream)
+        if data is None:
+            raise PdfParseError("Unsupported xref stream filter")
+
+        widths = stream.dictionary["W"]
+        index = stream.dictionary.get("Index", [0, stream.dictionary["Size"]])
+        entry_len = sum(widths)
+
+        def field(entry: bytes, field_index: int, default: int) -> int:
+            start = sum(widths[:field_index])
+            width = widths[field_index]
+            if width == 0:
+                return default
+            return int.from_bytes(entry[start : start + width], "big")
+
+        pos = 0
+        for first_num, count in zip(index[0::2], index[1::2]):
+            for obj_num in range(first_num, first_num + count):
+                entry = data[pos : pos + entry_len]
+                pos += entry_len
+
+                if obj_num in self._xref:
+                    continue
+
+                entry_type = field(entry, 0, 1)
+                if entry_type == 1:
+                    self._xref[obj_num] = field(entry, 1, 0)
+                elif entry_type == 2:
+                    self._xref[obj_num] = (field(entry, 1, 0), field(entry, 2, 0))
+
+        return stream.dictionary
+
+    def _reconstruct_xref(self) -> None:
+        # Fallback for broken files: scan the whole file for objects
+        for match in re.finditer(rb"(?<![0-9])(\d+)\s+(\d+)\s+obj\b", self.content):
+            self._xref[int(match[1])] = match.start()
+
+        for match in re.finditer(rb"trailer\s*<<", self.content):
+            try:
+                trailer, _ = parse_pdf_object(self.content, match.start() + 7)
+            except PdfParseError:
+                continue
+            if isinstance(trailer, dict):
+                self.trailer.update(trailer)
+
+        if "Root" not in self.trailer:
+            for obj_num in list(self._xref):
+                try:
+                    obj = self.get_object(obj_num)
+                except PdfParseError:
+                    continue
+                if isinstance(obj, dict) and obj.get("Type") == "Catalog":
+                    self.trailer["Root"] = PdfRef(obj_num, 0)
+                    break
+            else:
+                raise PdfParseError("Could not find document catalog")
+
+    def _parse_indirect_object_at(self, offset: int) -> Any:
+        header_match = _INDIRECT_OBJ_RE.match(self.content, offset)
+        if header_match is None:
+            raise PdfParseError(f"Expected indirect object at {offset}")
+
+        obj, pos = parse_pdf_object(self.content, header_match.end())
+
+        if isinstance(obj, dict):
+            pos = _skip_whitespace(self.content, pos)
+            stream_match = _STREAM_KEYWORD_RE.match(self.content, pos)
+            if stream_match is not None:
+                data_start = stream_match.end()
+                length = self.resolve(obj.get("Length"))
+
+                if not isinstance(length, int) or not self._is_endstream_at(
+                    data_start + length
+                ):
+                    # Missing or wrong /Length; fall back to searching
+                    end = self.content.find(b"endstream", data_start)
+                    if end < 0:
+                        raise PdfParseError("Unterminated stream")
+                    length = len(self.content[data_start:end].rstrip(b"\r\n"))
+
+                return PdfStream(obj, self.content[data_start : data_start + length])
+
+        return obj
+
+    def _is_endstream_at(self, pos: int) -> bool:
+        pos = _skip_whitespace(self.content, pos)
+        return self.content.startswith(b"endstream", pos)
+
+    def _get_object_stream(
+        self, stream_num: int
+    ) -> tuple[bytes, list[tuple[int, int]]]:
+        if stream_num not in self._object_streams:
+            stream = self.get_object(stream_num)
+            if not isinstance(stream, PdfStream):
+                raise PdfParseError(f"Object {stream_num} is not an object stream")
+
+            data = decode_pdf_stream(stream)
+            if data is None:
+                raise PdfParseError("Unsupported object stream filter")
+
+            num_objects = stream.dictionary["N"]
+            first = stream.dictionary["First"]
+
+            header: list[tuple[int, int]] = []
+            pos = 0
+            for _ in range(num_objects):
+                obj_num, pos = parse_pdf_object(data, pos)
+                obj_offset, pos = parse_pdf_object(data, pos)
+                header.append((obj_num, first + obj_offset))
+
+            self._object_streams[stream_num] = (data, header)
+
+        return self._object_streams[stream_num]
+
+    def get_object(self, obj_num: int) -> Any:
+        """Get the indirect object with the given object number."""
+        if obj_num in self._objects:
+            return self._objects[obj_num]
+
+        location = self._xref.get(obj_num)
+        if location is None:
+            # References to missing objects are treated as null
+            obj = None
+        elif isinstance(location, int):
+            obj = self._parse_indirect_object_at(location)
+        else:
+            stream_num, index = location
+            data, header = self._get_object_stream(stream_num)
+            obj, _ = parse_pdf_object(data, header[index][1])
+
+        self._objects[obj_num] = obj
+        return obj
+
+    def resolve(self, obj: Any) -> Any:
+        """Resolve an object, if it is a reference to an indirect object."""
+        visited: set[PdfRef] = set()
+        while isinstance(obj, PdfRef):
+            if obj in visited:
+                raise PdfParseError("Circular reference")
+            visited.add(obj)
+            obj = self.get_object(obj.num)
+
+        return obj
+
+    @property
+    def catalog(self) -> dict[str, Any]:
+        catalog = self.resolve(self.trailer["Root"])
+        if not isinstance(catalog, dict):
+            raise PdfParseError("Invalid document catalog")
+        return catalog
+
+    @property
+    def num_pages(self) -> int:
+        """The number of pages, as stated by the root of the page tree."""
+        pages = self.resolve(self.catalog.get("Pages"))
+        if not isinstance(pages, dict) or not isinstance(pages.get("Count"), int):
+            raise PdfParseError("Invalid page tree root")
+        return pages["Count"]
+
+    def get_pages(self) -> list[tuple[PdfRef | None, dict[str, Any]]]:
+        """Get all pages in the page tree, in order, as (reference, page
+        dictionary) pairs. Inheritable page attributes are copied into each
+        page dictionary.
+        """
+        pages: list[tuple[PdfRef | None, dict[str, Any]]] = []
+        visited: set[PdfRef] = set()
+
+        def visit(node_ref: Any, inherited: dict[str, Any]) -> None:
+            if isinstance(node_ref, PdfRef):
+                if node_ref in visited:
+                    raise PdfParseError("Cycle in page tree")
+                visited.add(node_ref)
+
+            node = self.resolve(node_ref)
+            if not isinstance(node, dict):
+                raise PdfParseError("Invalid page tree node")
+
+            if node.get("Type") == "Pages" or "Kids" in node:
+                inherited = dict(inherited)
+                for key in _INHERITABLE_PAGE_ATTRIBUTES:
+                    if key in node:
+                        inherited[key] = node[key]
+
+                for kid in self.resolve(node.get("Kids", [])):
+                    visit(kid, inherited)
+            else:
+                page = dict(inherited)
+                page.update(node)
+                pages.append((node_ref if isinstance(node_ref, PdfRef) else None, page))
+
+        visit(self.catalog.get("Pages"), {})
+        return pages
+
+
+_INHERITABLE_PAGE_ATTRIBUTES = ("Resources", "MediaBox", "CropBox", "Rotate")
+
+
+# Dictionary keys that are left out of page fingerprints. /Parent and /P are
+# back-references (from pages and annotations, respectively) that would pull
+# in the entire document, and they do not affect rendering.
+_FINGERPRINT_IGNORED_KEYS = frozenset(("Parent", "P"))
+
+# Stream dictionary keys that only describe the encoding of the stream data,
+# which are left out when the decoded data is fingerprinted
+_STREAM_ENCODING_KEYS = frozenset(("Length", "Filter", "DecodeParms"))
+
+
+class _PageFingerprinter:
+    def __init__(self, reader: PdfReader) -> None:
+        self.reader = reader
+        self.pages = reader.get_pages()
+
+        # References to other pages (e.g. link destinations) are fingerprinted
+        # by page number, such that a page's fingerprint does not depend on the
+        # content of the pages it links to
+        self._page_nums = {
+            page_ref: page_num
+            for page_num, (page_ref, _page) in enumerate(self.pages, start=1)
+            if page_ref is not None
+        }
+
+        self._digests: dict[PdfRef, bytes] = {}
+        self._visiting: set[PdfRef] = set()
+
+        # Document-level state that affects how pages are rendered
+        self._catalog_digest = self._digest(
+            {
+                key: value
+                for key, value in reader.catalog.items()
+                if key == "OCProperties"
+            }
+        )
+
+    def _digest(self, obj: Any) -> bytes:
+        hasher = hashlib.sha256()
+
+        if isinstance(obj, PdfRef):
+            page_num = self._page_nums.get(obj)
+            if page_num is not None:
+                hasher.update(b"page %d" % page_num)
+            elif obj in self._digests:
+                return self._digests[obj]
+            elif obj in self._visiting:
+                hasher.update(b"cycle")
+            else:
+                self._visiting.add(obj)
+                try:
+                    digest = self._digest(self.reader.get_object(obj.num))
+                finally:
+                    self._visiting.discard(obj)
+
+                self._digests[obj] = digest
+                return digest
+        elif isinstance(obj, PdfStream):
+            data = decode_pdf_stream(obj)
+            stream_dict = obj.dictionary
+            if data is None:
+                data = obj.raw_data
+            else:
+                stream_dict = {
+                    key: value
+                    for key, value in stream_dict.items()
+                    if key not in _STREAM_ENCODING_KEYS
+                }
+
+            hasher.update(b"stream")
+            hasher.update(self._digest(stream_dict))
+            hasher.update(data)
+        elif isinstance(obj, dict):
+            hasher.update(b"dict")
+            for key in sorted(obj):
+                if key in _FINGERPRINT_IGNORED_KEYS:
+                    continue
+                hasher.update(b"/%s" % key.encode("latin-1"))
+                hasher.update(self._digest(obj[key]))
+        elif isinstance(obj, list):
+            hasher.update(b"array")
+            for item in obj:
+                hasher.update(self._digest(item))
+        else:
+            hasher.update(
+                b"%s %s" % (type(obj).__name__.encode(), repr(obj).encode("latin-1"))
+            )
+
+        return hasher.digest()
+
+    def get_page_fingerprint(self, page_num: int) -> bytes:
+        _page_ref, page = self.pages[page_num - 1]
+        return hashlib.sha256(self._catalog_digest + self._digest(page)).digest()
+
+
+def find_pages_with_equal_fingerprints(
+    pdf_path_first: str, pdf_path_second: str, page_nums: Sequence[int]
+) -> frozenset[int]:
+    """Determine which of the given pages have equal fingerprints in both PDF
+    files. A page fingerprint covers the decoded content streams of the page,
+    and all resources (fonts, images, form XObjects, etc.) and annotations
+    that the page refers to, so pages with equal fingerprints are guaranteed to
+    render identically. If either PDF cannot be parsed, no pages are reported.
+    """
+    try:
+        first = _PageFingerprinter(PdfReader.from_file(pdf_path_first))
+        second = _PageFingerprinter(PdfReader.from_file(pdf_path_second))
+
+        return frozenset(
+            page_num
+            for page_num in page_nums
+            if page_num <= len(first.pages)
+            and page_num <= len(second.pages)
+            and first.get_page_fingerprint(page_num)
+            == second.get_page_fingerprint(page_num)
+        )
+    except (
+        PdfParseError,
+        KeyError,
+        IndexError,
+        TypeError,
+        ValueError,
+        RecursionError,
+        zlib.error,
+    ):
+        # Not being able to fingerprint pages just means that all pages have to
+        # be compared
+        return frozenset()
+
+
+def _read_num_pages(pdf_path: str) -> int:
+    return PdfReader.from_file(pdf_path).num_pages
+
+
+class NativePdfDocInfoProvider:
+    """PDF document info provider that reads the page count from the page tree
+    in-process, without spawning any external programs. Falls back to another
+    provider (typically pdfinfo) for files that cannot be parsed. Results are
+    memoized by file modification time and size, so unchanged files (such as
+    prototype PDFs) are only parsed once.
+    """
+
+    def __init__(self, fallback: IPdfDocInfoProvider | None = None) -> None:
+        self.fallback = fallback
+
+        # Maps PDF path -> (mtime_ns, size, doc info)
+        self._doc_infos: dict[str, tuple[int, int, IPdfDocInfo]] = {}
+
+    async def get_pdf_info_async(self, pdf_path: str) -> IPdfDocInfo:
+        stat = os.stat(pdf_path)
+
+        memoized = self._doc_infos.get(pdf_path)
+        if memoized is not None and memoized[:2] == (stat.st_mtime_ns, stat.st_size):
+            return memoized[2]
+
+        doc_info: IPdfDocInfo
+        try:
+            # Parsing a large PDF takes a while, so do it off the event loop
+            num_pages = await asyncio.get_running_loop().run_in_executor(
+                None, _read_num_pages, pdf_path
+            )
+        except (PdfParseError, KeyError, IndexError, TypeError, ValueError, zlib.error):
+            if self.fallback is None:
+                raise
+
+            doc_info = await self.fallback.get_pdf_info_async(pdf_path)
+        else:
+            doc_info = PdfDocInfo(path=pdf_path, num_physical_pages=num_pages)
+
+        self._doc_infos[pdf_path] = (stat.st_mtime_ns, stat.st_size, doc_info)
+        return doc_info
+
+
+if TYPE_CHECKING:
+    _: type[IPdfDocInfoProvider] = NativePdfDocInfoProvider
@@ -0,0 +1,488 @@
+import asyncio
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from .abc import ImageDimensions, IPngImageComparer, IPngImageDimensionsInspector
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Number of samples per pixel for each supported PNG color type
+# (0: grayscale, 2: RGB, 4: grayscale + alpha, 6: RGB + alpha)
+_SAMPLES_PER_PIXEL = {0: 1, 2: 3, 4: 2, 6: 4}
+
+# Translation table that maps each non-zero byte to 1
+_NONZERO_TO_ONE = bytes([0] + [1] * 255)
+
+
+class PngFormatError(Exception):
+    """An error that is thrown if a file is not a PNG image, or if it uses
+    PNG features that are not supported by the in-process PNG tools.
+    """
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class _PngImage:
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+
+    filtered_data: bytes
+    """The decompressed image data, i.e. one filter type byte followed by the
+    filtered scanline bytes, for each scanline.
+    """
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        return _SAMPLES_PER_PIXEL[self.color_type] * self.bit_depth // 8
+
+    @property
+    def stride(self) -> int:
+        return self.width * self.bytes_per_pixel
+
+
+def _iter_png_chunks(content: bytes):
+    if content[: len(PNG_SIGNATURE)] != PNG_SIGNATURE:
+        raise PngFormatError("Missing PNG signature")
+
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(content):
+        length, chunk_type = struct.unpack_from(">I4s", content, pos)
+        chunk_data = content[pos + 8 : pos + 8 + length]
+        if len(chunk_data) != length:
+            raise PngFormatError("Truncated PNG chunk")
+
+        yield chunk_type, chunk_data
+
+        if chunk_type == b"IEND":
+            return
+
+        # Skip length, type, data and CRC
+        pos += 12 + length
+
+    raise PngFormatError("Missing IEND chunk")
+
+
+def _read_png_image(png_path: str) -> _PngImage:
+    with open(png_path, "rb") as fp:
+        content = fp.read()
+
+    ihdr: tuple[int, ...] | None = None
+    idat_chunks: list[bytes] = []
+
+    for chunk_type, chunk_data in _iter_png_chunks(content):
+        if chunk_type == b"IHDR":
+            ihdr = struct.unpack(">IIBBBBB", chunk_data)
+        elif chunk_type == b"IDAT":
+            idat_chunks.append(chunk_data)
+
+    if ihdr is None:
+        raise PngFormatError(f"Missing IHDR chunk in {png_path}")
+
+    width, height, bit_depth, color_type, _compression, _filter, interlace = ihdr
+
+    if color_type not in _SAMPLES_PER_PIXEL or bit_depth not in (8, 16):
+        raise PngFormatError(
+            f"Unsupported PNG color type {color_type} with bit depth {bit_depth} in {png_path}"
+        )
+
+    if interlace != 0:
+        raise PngFormatError(f"Interlaced PNG images are not supported ({png_path})")
+
+    image = _PngImage(
+        width=width,
+        height=height,
+        bit_depth=bit_depth,
+        color_type=color_type,
+        filtered_data=zlib.decompress(b"".join(idat_chunks)),
+    )
+
+    if len(image.filtered_data) != height * (image.stride + 1):
+        raise PngFormatError(f"Unexpected amount of image data in {png_path}")
+
+    return image
+
+
+def read_png_image_dimensions(png_path: str) -> ImageDimensions:
+    """Read the dimensions of a PNG image from its IHDR chunk, which is
+    required to be the first chunk, directly following the PNG signature.
+    """
+    with open(png_path, "rb") as fp:
+        header = fp.read(len(PNG_SIGNATURE) + 16)
+
+    if len(header) != len(PNG_SIGNATURE) + 16:
+        raise PngFormatError(f"Truncated PNG header in {png_path}")
+
+    if header[: len(PNG_SIGNATURE)] != PNG_SIGNATURE:
+        raise PngFormatError(f"Missing PNG signature in {png_path}")
+
+    _length, chunk_type, width, height = struct.unpack_from(
+        ">I4sII", header, len(PNG_SIGNATURE)
+    )
+    if chunk_type != b"IHDR":
+        raise PngFormatError(f"Missing IHDR chunk in {png_path}")
+
+    return ImageDimensions(width, height)
+
+
+def _add_mod_256(x: int, y: int, masks: tuple[int, int]) -> int:
+    """Bytewise addition modulo 256 of two scanlines, as big-endian integers,
+    computed on the whole scanline at once using arbitrary-precision integers.
+    """
+    low_bits_mask, high_bit_mask = masks
+
+    # The sum of the lower 7 bits of each byte never carries into the next byte,
+    # and the high bit of each byte sum is the XOR of the operands' high bits and
+    # the carry from the lower 7 bits.
+    return ((x & low_bits_mask) + (y & low_bits_mask)) ^ ((x ^ y) & high_bit_mask)
+
+
+def _add_bytes_mod_256(first: bytes, second: bytes, masks: tuple[int, int]) -> bytes:
+    """Bytewise addition modulo 256 of two equally long byte strings."""
+    x = int.from_bytes(first, "big")
+    y = int.from_bytes(second, "big")
+    return _add_mod_256(x, y, masks).to_bytes(len(first), "big")
+
+
+def _unfilter_sub(filtered: bytes, bpp: int, masks: tuple[int, int]) -> bytes:
+    """Reverse the Sub filter, i.e. take the running sum (modulo 256) of the
+    bytes of each sample, in log2(number of pixels) whole-scanline additions.
+    """
+    x = int.from_bytes(filtered, "big")
+
+    # After each step, each byte is the sum of the twice as many preceding
+    # bytes of the same sample (shifting right moves bytes to later pixels)
+    shift = bpp
+    while shift < len(filtered):
+        x = _add_mod_256(x, x >> (8 * shift), masks)
+        shift *= 2
+
+    return x.to_bytes(len(filtered), "big")
+
+
+def _repeat_field(value: int, num_fields: int) -> int:
+    """Return an integer that consists of num_fields 16-bit fields with the
+    given value.
+    """
+    return int.from_bytes(value.to_bytes(2, "little") * num_fields, "little")
+
+
+def _unfilter_diagonals(image: _PngImage, filter_types: bytes) -> list[bytes]:
+    """Reverse the filters of all scanlines, one anti-diagonal of pixels at a
+    time.
+
+    The Average and Paeth filters predict each byte from the reconstructed
+    bytes to the left of, above and above-left of it, so the bytes of a
+    scanline can not be reconstructed independently. The pixels on an
+    anti-diagonal (x + y = t) only depend on the two previous anti-diagonals
+    though. Each anti-diagonal is reconstructed at once, with each byte in a
+    16-bit field of an arbitrary-precision integer (pixel by pixel, starting
+    at the topmost pixel), which leaves room for the signed intermediate values
+    of the Paeth predictor.
+    """
+    width = image.width
+    height = image.height
+    stride = image.stride
+    bpp = image.bytes_per_pixel
+    data = image.filtered_data
+
+    pixel_bits = 16 * bpp
+    pixel_bytes = 2 * bpp
+
+    num_fields = min(width, height) * bpp
+    ones = _repeat_field(0x0001, num_fields)
+    low_byte = _repeat_field(0x00FF, num_fields)
+    bias_8 = _repeat_field(0x0100, num_fields)
+    bias_10 = _repeat_field(0x0400, num_fields)
+    abs_8_offset = _repeat_field(0x00FF, num_fields)
+    abs_9_offset = _repeat_field(0x01FF, num_fields)
+
+    # Masks that select the pixels of each scanline with the given filter type
+    pixel_selected = b"\xff\xff" * bpp
+    pixel_unselected = bytes(pixel_bytes)
+    sub_masks, up_masks, average_masks, paeth_masks = (
+        b"".join(
+            pixel_selected if filter_type == selected_filter_type else pixel_unselected
+            for filter_type in filter_types
+        )
+        for selected_filter_type in (1, 2, 3, 4)
+    )
+    has_average = 3 in filter_types
+    has_paeth = 4 in filter_types
+
+    def absolute(biased: int, bias_bit: int, offset: int) -> int:
+        # Biased values are non-negative if the bias bit is set. Negative
+        # values are negated by inverting the bits up to and including the
+        # bias bit, which the offset compensates for.
+        nonnegative = (biased >> bias_bit) & ones
+        negative = nonnegative ^ ones
+        inverted = biased ^ ((negative << (bias_bit + 1)) - negative)
+        return inverted - (offset + nonnegative)
+
+    def less_or_equal(x: int, y: int) -> int:
+        return (((y | bias_10) - x) >> 10) & ones
+
+    out = bytearray(height * stride)
+    in_step = stride + 1 - bpp
+    out_step = max(stride - bpp, 1)
+
+    # The two previous anti-diagonals, and their topmost scanlines
+    prev, prev_y = 0, 0
+    prev2, prev2_y = 0, 0
+
+    for t in range(width + height - 1):
+        y = max(0, t - width + 1)
+        n = min(t, height - 1) - y + 1
+        in_pos = y * (stride + 1) + 1 + (t - y) * bpp
+        out_pos = y * stride + (t - y) * bpp
+
+        buf = bytearray(pixel_bytes * n)
+        for i in range(bpp):
+            buf[2 * i :: pixel_bytes] = data[
+                in_pos + i : in_pos + i + (n - 1) * in_step + 1 : in_step
+            ]
+        filtered = int.from_bytes(buf, "little")
+
+        a = prev >> (pixel_bits * (y - prev_y))
+        b = (prev << pixel_bits) >> (pixel_bits * (y - prev_y))
+        c = (prev2 << pixel_bits) >> (pixel_bits * (y - prev2_y))
+
+        masks = slice(pixel_bytes * y, pixel_bytes * (y + n))
+        predictor = (a & int.from_bytes(sub_masks[masks], "little")) | (
+            b & int.from_bytes(up_masks[masks], "little")
+        )
+
+        if has_average:
+            average = ((a + b) >> 1) & low_byte
+            predictor |= average & int.from_bytes(average_masks[masks], "little")
+
+        if has_paeth:
+            b_minus_c = (b | bias_8) - c
+            a_minus_c = (a | bias_8) - c
+            pa = absolute(b_minus_c, 8, abs_8_offset)
+            pb = absolute(a_minus_c, 8, abs_8_offset)
+            pc = absolute(b_minus_c + a_minus_c, 9, abs_9_offset)
+
+            use_a = less_or_equal(pa, pb) & less_or_equal(pa, pc)
+            use_b = less_or_equal(pb, pc) & ~use_a
+            use_c = ones & ~(use_a | use_b)
+            paeth = (a & use_a * 0xFFFF) | (b & use_b * 0xFFFF) | (c & use_c * 0xFFFF)
+            predictor |= paeth & int.from_bytes(paeth_masks[masks], "little")
+
+        # Bytes outside of the image are zero
+        value = (filtered + predictor) & low_byte & ((1 << (pixel_bits * n)) - 1)
+
+        prev2, prev2_y = prev, prev_y
+        prev, prev_y = value, y
+
+        value_bytes = value.to_bytes(pixel_bytes * n, "little")
+        for i in range(bpp):
+            out[out_pos + i : out_pos + i + (n - 1) * out_step + 1 : out_step] = (
+                value_bytes[2 * i :: pixel_bytes]
+            )
+
+    return [bytes(out[pos : pos + stride]) for pos in range(0, len(out), stride)]
+
+
+def _unfilter_scanlines(image: _PngImage) -> list[bytes]:
+    stride = image.stride
+    bpp = image.bytes_per_pixel
+    data = image.filtered_data
+
+    filter_types = data[:: stride + 1]
+    if filter_types and max(filter_types) > 4:
+        raise PngFormatError(f"Invalid PNG filter type {max(filter_types)}")
+
+    # The Average and Paeth filters can not be reversed with whole-scanline
+    # operations
+    if 3 in filter_types or 4 in filter_types:
+        return _unfilter_diagonals(image, filter_types)
+
+    masks = (
+        int.from_bytes(b"\x7f" * stride, "big"),
+        int.from_bytes(b"\x80" * stride, "big"),
+    )
+
+    rows: list[bytes] = []
+    prev = bytes(stride)
+
+    for y in range(image.height):
+        pos = y * (stride + 1)
+        filter_type = data[pos]
+        filtered = data[pos + 1 : pos + 1 + stride]
+
+        if filter_type == 0:
+            row = filtered
+        elif filter_type == 1:
+            row = _unfilter_sub(filtered, bpp, masks)
+        else:
+            row = _add_bytes_mod_256(filtered, prev, masks)
+
+        rows.append(row)
+        prev = row
+
+    return rows
+
+
+def _find_differing_pixels(first_row: bytes, second_row: bytes, bpp: int) -> list[int]:
+    """Return the x coordinates of the pixels that differ between two
+    scanlines, without comparing the scanlines pixel by pixel.
+    """
+    xor = int.from_bytes(first_row, "big") ^ int.from_bytes(second_row, "big")
+    differing_bytes = xor.to_bytes(len(first_row), "big").translate(_NONZERO_TO_ONE)
+
+    xs: list[int] = []
+    pos = differing_bytes.find(1)
+    while pos >= 0:
+        x = pos // bpp
+        xs.append(x)
+        pos = differing_bytes.find(1, (x + 1) * bpp)
+
+    return xs
+
+
+def _scanline_to_rgb8(row: bytes, image: _PngImage) -> bytearray:
+    samples = row[::2] if image.bit_depth == 16 else row
+    num_pixels = image.width
+
+    out = bytearray(3 * num_pixels)
+    if image.color_type in (0, 4):
+        gray = samples[:: _SAMPLES_PER_PIXEL[image.color_type]]
+        out[0::3] = gray
+        out[1::3] = gray
+        out[2::3] = gray
+    else:
+        step = _SAMPLES_PER_PIXEL[image.color_type]
+        out[0::3] = samples[0::step]
+        out[1::3] = samples[1::step]
+        out[2::3] = samples[2::step]
+
+    return out
+
+
+def _png_chunk(chunk_type: bytes, chunk_data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(chunk_data))
+        + chunk_type
+        + chunk_data
+        + struct.pack(">I", zlib.crc32(chunk_type + chunk_data))
+    )
+
+
+def write_rgb8_png_image(
+    png_path: str, width: int, height: int, rows: list[bytes] | list[bytearray]
+) -> None:
+    """Write an 8-bit RGB PNG image, given its unfiltered scanlines."""
+    assert len(rows) == height
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    idat = zlib.compress(b"".join(b"\x00" + bytes(row) for row in rows))
+
+    with open(png_path, "wb") as fp:
+        fp.write(PNG_SIGNATURE)
+        fp.write(_png_chunk(b"IHDR", ihdr))
+        fp.write(_png_chunk(b"IDAT", idat))
+        fp.write(_png_chunk(b"IEND", b""))
+
+
+def compare_png_images(
+    png_path_first: str, png_path_second: str, output_diff_path: str
+) -> int:
+    """Compare two PNG images pixel by pixel, and return the number of pixels
+    that differ (the same as the 'ae' metric of ImageMagick's compare). If any
+    pixels differ, a diff image is written to output_diff_path, in which the
+    differing pixels are painted red on top of the first image.
+    """
+    first = _read_png_image(png_path_first)
+    second = _read_png_image(png_path_second)
+
+    if (first.width, first.height) != (second.width, second.height):
+        raise ValueError(
+            f"Image dimensions differ ({png_path_first}: {first.width}x{first.height}, "
+            f"{png_path_second}: {second.width}x{second.height})"
+        )
+
+    if (first.color_type, first.bit_depth) != (second.color_type, second.bit_depth):
+        raise PngFormatError(
+            f"Image formats differ ({png_path_first}, {png_path_second})"
+        )
+
+    # Fast path: identically filtered image data means identical pixels, and
+    # there is no need to reconstruct any scanline
+    if first.filtered_data == second.filtered_data:
+        return 0
+
+    first_rows = _unfilter_scanlines(first)
+    second_rows = _unfilter_scanlines(second)
+
+    bpp = first.bytes_per_pixel
+    differing_pixels: dict[int, list[int]] = {}
+
+    for y, (first_row, second_row) in enumerate(zip(first_rows, second_rows)):
+        if first_row == second_row:
+            continue
+
+        differing_pixels[y] = _find_differing_pixels(first_row, second_row, bpp)
+
+    num_differing_pixels = sum(len(xs) for xs in differing_pixels.values())
+
+    if num_differing_pixels > 0:
+        diff_rows = [_scanline_to_rgb8(row, first) for row in first_rows]
+        for y, xs in differing_pixels.items():
+            for x in xs:
+                diff_rows[y][3 * x : 3 * x + 3] = b"\xff\x00\x00"
+
+        write_rgb8_png_image(output_diff_path, first.width, first.height, diff_rows)
+
+    return num_differing_pixels
+
+
+class NativePngImageComparer:
+    """PNG image comparer that decodes and compares the images in-process,
+    without spawning any external programs. Images with equal image data are
+    equal without reconstructing any pixels. Images that cannot be decoded are
+    compared by another comparer (typically ImageMagick's compare), if given.
+    """
+
+    def __init__(self, fallback: IPngImageComparer | None = None) -> None:
+        self.fallback = fallback
+
+    async def compare_png_images_async(
+        self, png_path_first: str, png_path_second: str, output_diff_path: str
+    ) -> bool:
+        loop = asyncio.get_running_loop()
+
+        try:
+            ae_diff = await loop.run_in_executor(
+                None,
+                compare_png_images,
+                png_path_first,
+                png_path_second,
+                output_diff_path,
+            )
+        except (PngFormatError, zlib.error):
+            if self.fallback is None:
+                raise
+
+            return await self.fallback.compare_png_images_async(
+                png_path_first, png_path_second, output_diff_path
+            )
+
+        # (0 means equal)
+        return ae_diff == 0
+
+
+class NativePngImageDimensionsInspector:
+    """PNG image dimensions inspector that reads the dimensions directly from
+    the PNG header, without spawning any external programs.
+    """
+
+    async def get_png_image_dimensions_async(self, png_path: str) -> ImageDimensions:
+        return read_png_image_dimensions(png_path)
+
+
+if TYPE_CHECKING:
+    _: type[IPngImageComparer] = NativePngImageComparer  # type: ignore[no-redef]
+    _: type[IPngImageDimensionsInspector] = NativePngImageDimensionsInspector  # type: ignore[no-redef]
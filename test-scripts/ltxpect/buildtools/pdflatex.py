@@ -0,0 +1,323 @@
+import asyncio
+import hashlib
+import os
+import re
+from collections.abc import Mapping, Sequence
+from typing import Self, Type, TYPE_CHECKING
+
+from ltxpect import asyncpopen
+from ltxpect.coreabc import IExternalProgramLocator, IPathUtil
+from ltxpect.testdependencyindex import read_latex_recorder_files
+from .abc import (
+    ILatexDocumentBuildTool,
+    IPreambleFormatProvider,
+    LatexBuildResult,
+)
+
+_BIBTEX_AUX_LINE_PATTERN = re.compile(rb"^\\(?:citation|bibdata|bibstyle)\{.*$", re.M)
+
+# \@newglossary{<name>}{<log ext>}{<output ext>}{<input ext>}
+_NEWGLOSSARY_PATTERN = re.compile(
+    rb"\\@newglossary\{[^}]*\}\{[^}]*\}\{[^}]*\}\{([^}]*)\}"
+)
+
+# The files written by makeglossaries (and read by LaTeX) have the <output ext>
+_NEWGLOSSARY_INPUT_EXT_PATTERN = re.compile(
+    rb"\\@newglossary\{[^}]*\}\{[^}]*\}\{([^}]*)\}\{[^}]*\}"
+)
+
+
+class PdflatexPassLoopTestBuilder:
+    """Builds a test document by running pdflatex, bibtex and makeglossaries
+    directly, rather than letting latexmk decide how many passes to run.
+
+    After each pdflatex pass, the auxiliary files are hashed, i.e. the files
+    that the pass wrote (as recorded in the .fls file), and the files that
+    bibtex and makeglossaries wrote. The build stops as soon as a pass leaves
+    the auxiliary files that it read back unchanged, and writes no new ones
+    (i.e. when the cross-references, lists of figures, listings, etc. have
+    converged). The build fails if they have not converged after MAX_PASSES
+    passes.
+    """
+
+    MAX_PASSES = 6
+
+    # Only the last lines of output (of all steps together) are kept, which is
+    # where LaTeX reports the error that stopped the build
+    MAX_CAPTURED_LINES = 500
+
+    def __init__(
+        self,
+        path_util: IPathUtil,
+        pdflatex_cmd: str,
+        bibtex_cmd: str,
+        makeglossaries_cmd: str,
+        env: Mapping[str, str] | None = None,
+        preamble_format_provider: IPreambleFormatProvider | None = None,
+    ) -> None:
+        self.path_util = path_util
+        self.pdflatex_cmd = pdflatex_cmd
+        self.bibtex_cmd = bibtex_cmd
+        self.makeglossaries_cmd = makeglossaries_cmd
+
+        # Extra environment variables for the build
+        self.env = dict(env or {})
+
+        self.preamble_format_provider = preamble_format_provider
+
+    @staticmethod
+    def _read_file(path: str) -> bytes | None:
+        try:
+            with open(path, "rb") as fp:
+                return fp.read()
+        except FileNotFoundError:
+            return None
+
+    def _hash_files(self, paths: Sequence[str]) -> bytes:
+        files_hash = hashlib.sha256()
+        for path in paths:
+            content = self._read_file(path)
+            files_hash.update(b"-" if content is None else b"+")
+            files_hash.update(hashlib.sha256(content or b"").digest())
+
+        return files_hash.digest()
+
+    def _hash_existing_files(self, paths: Sequence[str]) -> dict[str, bytes]:
+        hashes: dict[str, bytes] = {}
+        for path in paths:
+            content = self._read_file(path)
+            if content is not None:
+                hashes[os.path.normpath(os.path.abspath(path))] = hashlib.sha256(
+                    content
+                ).digest()
+
+        return hashes
+
+    async def build_latex_document_async(
+        self,
+        base_dir: str,
+        texfile_parent_dir_subpath: str,
+        texfile_filename: str,
+        latex_build_dir_subpath: str,
+        latex_jobname: str,
+        timeout: float = 0,
+    ) -> LatexBuildResult:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout > 0 else None
+
+        # Absolute path to the directory that contains the tex file
+        texfile_parent_dir_path = self.path_util.path_join(
+            base_dir, texfile_parent_dir_subpath
+        )
+
+        latex_build_dir_path = self.path_util.path_join(
+            base_dir, latex_build_dir_subpath
+        )
+
+        latex_build_dir_relative_to_texfile_parent_dir = self.path_util.path_relpath(
+            latex_build_dir_path, texfile_parent_dir_path
+        )
+
+        def build_file_path(ext: str) -> str:
+            return self.path_util.path_join(
+                latex_build_dir_path, "{}{}".format(latex_jobname, ext)
+            )
+
+        env = {**os.environ, **self.env}
+
+        # bibtex and makeglossaries run from within the build directory, but
+        # need to find .bib and style files next to the tex file
+        tool_env = dict(env)
+        for var in ("BIBINPUTS", "BSTINPUTS"):
+            tool_env[var] = os.pathsep.join(
+                (os.path.abspath(texfile_parent_dir_path), env.get(var, ""))
+            )
+
+        stdout: tuple[bytes, ...] = ()
+        stderr: tuple[bytes, ...] = ()
+
+        async def run_async(args: list[str], cwd: str, env: Mapping[str, str]) -> int:
+            nonlocal stdout, stderr
+
+            step_timeout: float = 0
+            if deadline is not None:
+                step_timeout = deadline - loop.time()
+                if step_timeout <= 0:
+                    raise asyncpopen.AsyncPopenTimeoutError(-1, stdout, stderr)
+
+            max_lines = self.MAX_CAPTURED_LINES
+
+            try:
+                returncode, step_stdout, step_stderr = await asyncpopen.popen_async(
+                    loop,
+                    args,
+                    timeout=step_timeout,
+                    cwd=cwd,
+                    env=env,
+                    max_captured_lines=max_lines,
+                )
+            except asyncpopen.AsyncPopenTimeoutError as err:
+                raise asyncpopen.AsyncPopenTimeoutError(
+                    err.returncode,
+                    (stdout + err.stdout)[-max_lines:],
+                    (stderr + err.stderr)[-max_lines:],
+                    err.termination_stage,
+                    err.resource_usage,
+                )
+
+            stdout = (stdout + step_stdout)[-max_lines:]
+            stderr = (stderr + step_stderr)[-max_lines:]
+
+            return returncode
+
+        pdflatex_fmt_args: list[str] = []
+        if self.preamble_format_provider is not None:
+            fmt_path = (
+                await self.preamble_format_provider.get_preamble_format_path_async(
+                    texfile_parent_dir_path,
+                    texfile_filename,
+                    timeout=(
+                        max(deadline - loop.time(), 1) if deadline is not None else 0
+                    ),
+                )
+            )
+
+            if fmt_path is not None:
+                # Let pdflatex find the format by name (the trailing separator
+                # makes kpathsea append the default search path)
+                fmt_dir, fmt_filename = os.path.split(fmt_path)
+                env["TEXFORMATS"] = os.pathsep.join(
+                    (fmt_dir, env.get("TEXFORMATS", ""))
+                )
+                pdflatex_fmt_args = [
+                    "-fmt={}".format(os.path.splitext(fmt_filename)[0])
+                ]
+
+        pdflatex_args = [
+            self.pdflatex_cmd,
+            *pdflatex_fmt_args,
+            "-shell-escape",
+            "-recorder",
+            "-jobname={}".format(latex_jobname),
+            "-output-directory={}".format(
+                latex_build_dir_relative_to_texfile_parent_dir
+            ),
+            "-interaction=nonstopmode",
+            "-halt-on-error",
+            texfile_filename,
+        ]
+
+        # Maps each auxiliary file (that exists) -> hash of its content
+        aux_hashes: dict[str, bytes] = {}
+
+        bibtex_input_hash: bytes | None = None
+        makeglossaries_input_hash: bytes | None = None
+
+        num_passes = 0
+        while True:
+            returncode = await run_async(pdflatex_args, texfile_parent_dir_path, env)
+            num_passes += 1
+
+            if returncode != 0:
+                return LatexBuildResult(returncode, stdout, stderr, num_passes)
+
+            aux_content = self._read_file(build_file_path(".aux")) or b""
+
+            # Run bibtex when the citations or bibliography databases change
+            if b"\\bibdata" in aux_content:
+                new_bibtex_input_hash = hashlib.sha256(
+                    b"\n".join(_BIBTEX_AUX_LINE_PATTERN.findall(aux_content))
+                ).digest()
+
+                if new_bibtex_input_hash != bibtex_input_hash:
+                    bibtex_input_hash = new_bibtex_input_hash
+
+                    returncode = await run_async(
+                        [self.bibtex_cmd, latex_jobname], latex_build_dir_path, tool_env
+                    )
+
+                    # NOTE: bibtex exits with 1 if there were only warnings
+                    if returncode > 1:
+                        return LatexBuildResult(returncode, stdout, stderr, num_passes)
+
+            # Run makeglossaries when any of the glossary input files change
+            glossary_input_exts = _NEWGLOSSARY_PATTERN.findall(aux_content)
+            if glossary_input_exts:
+                new_makeglossaries_input_hash = self._hash_files(
+                    [
+                        build_file_path("." + x.decode("utf-8", errors="replace"))
+                        for x in sorted(set(glossary_input_exts))
+                    ]
+                )
+
+                if new_makeglossaries_input_hash != makeglossaries_input_hash:
+                    makeglossaries_input_hash = new_makeglossaries_input_hash
+
+                    # Not using the -d option of makeglossaries, due to
+                    # incompatibility with some systems
+                    returncode = await run_async(
+                        [self.makeglossaries_cmd, "-q", latex_jobname],
+                        latex_build_dir_path,
+                        tool_env,
+                    )
+                    if returncode != 0:
+                        return LatexBuildResult(returncode, stdout, stderr, num_passes)
+
+            read_paths, written_paths = read_latex_recorder_files(
+                build_file_path(".fls")
+            )
+            tool_written_paths = [build_file_path(".bbl")] + [
+                build_file_path("." + x.decode("utf-8", errors="replace"))
+                for x in _NEWGLOSSARY_INPUT_EXT_PATTERN.findall(aux_content)
+            ]
+
+            new_aux_hashes = self._hash_existing_files(
+                written_paths + tool_written_paths
+            )
+            read_back_paths = set(read_paths).intersection(new_aux_hashes)
+
+            # The .log and .pdf files (for example) are not read back, but an
+            # auxiliary file that is new may be read by the next pass
+            if all(
+                (
+                    new_aux_hashes[x] == aux_hashes[x]
+                    if x in read_back_paths
+                    else x in aux_hashes
+                )
+                for x in new_aux_hashes
+            ):
+                return LatexBuildResult(0, stdout, stderr, num_passes)
+
+            if num_passes >= self.MAX_PASSES:
+                stderr += (
+                    "The auxiliary files did not converge after {} passes".format(
+                        num_passes
+                    ).encode("utf-8"),
+                )
+                return LatexBuildResult(1, stdout, stderr, num_passes)
+
+            aux_hashes = new_aux_hashes
+
+    @classmethod
+    def create(
+        cls: Type[Self],
+        locator: IExternalProgramLocator,
+        path_util: IPathUtil,
+        env: Mapping[str, str] | None = None,
+        preamble_format_provider: IPreambleFormatProvider | None = None,
+    ) -> Self:
+        pdflatex_cmd = locator.find_program("pdflatex", ["pdflatex"])
+        bibtex_cmd = locator.find_program("bibtex", ["bibtex"])
+        makeglossaries_cmd = locator.find_program("makeglossaries", ["makeglossaries"])
+        return cls(
+            path_util,
+            pdflatex_cmd,
+            bibtex_cmd,
+            makeglossaries_cmd,
+            env,
+            preamble_format_provider,
+        )
+
+
+if TYPE_CHECKING:
+    _: type[ILatexDocumentBuildTool] = PdflatexPassLoopTestBuilder
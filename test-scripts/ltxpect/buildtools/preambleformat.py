@@ -0,0 +1,245 @@
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections.abc import Mapping, Sequence
+from typing import Self, Type, TYPE_CHECKING
+
+from ltxpect import asyncpopen
+from ltxpect.coreabc import IExternalProgramLocator
+from ltxpect.testdependencyindex import read_latex_recorder_inputs
+from .abc import IPreambleFormatProvider
+
+# The format is dumped under a job name of its own, so preambles that expand
+# \jobname (directly, or through tikz externalization or minted, which name
+# their auxiliary files after the job) would get the wrong name baked in
+_JOBNAME_DEPENDENT_PREAMBLE_PATTERN = re.compile(
+    rb"\\jobname|\\tikzexternalize|\\usetikzlibrary\s*\{[^}]*\bexternal\b"
+    rb"|\\usepackage\s*(?:\[[^]]*\]\s*)?\{[^}]*"
+    rb"\b(?:minted|ult-tikz-externalize-jobname-fix)\b"
+)
+
+
+class MyLatexFormatPreambleFormatProvider:
+    """Dumps the preamble of a document to a LaTeX format file, using the
+    mylatexformat package, such that the document can be compiled without
+    loading the packages in its preamble on every pass.
+
+    Format files are cached on disk, keyed on the pdflatex version, the content
+    of the ult-base .sty files and the preamble itself. Documents with equal
+    preambles therefore share one format file. Along with each format file, the
+    modification times and sizes of the files that were read when generating it
+    (e.g. the packages in the TeX distribution) are recorded, and the format
+    file is generated again if any of them have changed.
+    """
+
+    def __init__(
+        self,
+        pdflatex_cmd: str,
+        cache_dir: str,
+        sty_dir: str,
+        env: Mapping[str, str] | None = None,
+    ) -> None:
+        self.pdflatex_cmd = pdflatex_cmd
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.sty_dir = sty_dir
+
+        # Extra environment variables for the format generation
+        self.env = dict(env or {})
+
+        self._base_key: bytes | None = None
+        self._key_locks: dict[str, asyncio.Lock] = {}
+
+        # Keys for which the format generation failed during this test run
+        self._failed_keys: set[str] = set()
+
+        # Keys for which the format file is known to be up to date during this
+        # test run
+        self._up_to_date_keys: set[str] = set()
+
+    @staticmethod
+    def _get_preamble(content: bytes) -> bytes | None:
+        # A format can not be used for documents that select a format or
+        # program options themselves on the first line
+        if content.startswith(b"%&"):
+            return None
+
+        preamble, sep, _ = content.partition(b"\\begin{document}")
+        if not sep:
+            return None
+
+        # Glossaries open files for writing in the preamble, and open files
+        # can not be dumped to a format
+        if b"\\makeglossaries" in preamble:
+            return None
+
+        if _JOBNAME_DEPENDENT_PREAMBLE_PATTERN.search(preamble):
+            return None
+
+        return preamble
+
+    @staticmethod
+    def _get_inputs_path(fmt_path: str) -> str:
+        return "{}.inputs.json".format(os.path.splitext(fmt_path)[0])
+
+    @staticmethod
+    def _get_inputs_state(input_paths: Sequence[str]) -> dict[str, list[int] | None]:
+        """Return the modification time and size of each input file, or None
+        for input files that no longer exist.
+        """
+        state: dict[str, list[int] | None] = {}
+        for path in input_paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                state[path] = None
+            else:
+                state[path] = [stat.st_mtime_ns, stat.st_size]
+
+        return state
+
+    def _format_is_up_to_date(self, fmt_path: str) -> bool:
+        if not os.path.isfile(fmt_path):
+            return False
+
+        try:
+            with open(self._get_inputs_path(fmt_path), "r", encoding="utf-8") as fp:
+                inputs_state = json.load(fp)
+        except (FileNotFoundError, ValueError):
+            return False
+
+        return inputs_state == self._get_inputs_state(list(inputs_state))
+
+    async def _get_base_key_async(self) -> bytes:
+        if self._base_key is not None:
+            return self._base_key
+
+        _returncode, version_stdout, _stderr = await asyncpopen.popen_async(
+            asyncio.get_running_loop(),
+            [self.pdflatex_cmd, "--version"],
+            timeout=60,
+            env={**os.environ, **self.env},
+        )
+
+        base_hash = hashlib.sha256()
+        base_hash.update(b"\n".join(version_stdout))
+        for sty_path in sorted(glob.glob(os.path.join(self.sty_dir, "*.sty"))):
+            with open(sty_path, "rb") as fp:
+                sty_hash = hashlib.file_digest(fp, "sha256").hexdigest()
+
+            base_hash.update(
+                "\0{}\0{}".format(os.path.basename(sty_path), sty_hash).encode("utf-8")
+            )
+
+        self._base_key = base_hash.digest()
+        return self._base_key
+
+    async def get_preamble_format_path_async(
+        self, texfile_parent_dir_path: str, texfile_filename: str, timeout: float = 0
+    ) -> str | None:
+        """Return the path to a LaTeX format file with the preamble of the
+        specified document preloaded, generating the format file if needed.
+        Returns None if the document cannot be compiled against a preamble
+        format.
+        """
+        with open(os.path.join(texfile_parent_dir_path, texfile_filename), "rb") as fp:
+            preamble = self._get_preamble(fp.read())
+
+        if preamble is None:
+            return None
+
+        key = hashlib.sha256(await self._get_base_key_async() + preamble).hexdigest()
+
+        # NOTE: the key is also used as the job name, so keep it reasonably short
+        fmt_name = "ltxpect-{}".format(key[:32])
+        fmt_path = os.path.join(self.cache_dir, "{}.fmt".format(fmt_name))
+
+        async with self._key_locks.setdefault(key, asyncio.Lock()):
+            if key in self._up_to_date_keys or self._format_is_up_to_date(fmt_path):
+                self._up_to_date_keys.add(key)
+                return fmt_path
+
+            if key in self._failed_keys:
+                return None
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            with tempfile.TemporaryDirectory(
+                prefix=".fmt-", dir=self.cache_dir
+            ) as staging_dir:
+                cmd = [
+                    self.pdflatex_cmd,
+                    "-ini",
+                    "-shell-escape",
+                    "-interaction=nonstopmode",
+                    "-halt-on-error",
+                    "-recorder",
+                    "-jobname={}".format(fmt_name),
+                    "-output-directory={}".format(staging_dir),
+                    "&pdflatex",
+                    "mylatexformat.ltx",
+                    texfile_filename,
+                ]
+
+                try:
+                    returncode, _stdout, _stderr = await asyncpopen.popen_async(
+                        asyncio.get_running_loop(),
+                        cmd,
+                        timeout=timeout,
+                        cwd=texfile_parent_dir_path,
+                        env={**os.environ, **self.env},
+                        max_captured_lines=0,
+                    )
+                except asyncpopen.AsyncPopenTimeoutError:
+                    returncode = -1
+
+                staging_fmt_path = os.path.join(staging_dir, "{}.fmt".format(fmt_name))
+                if returncode == 0 and os.path.isfile(staging_fmt_path):
+                    os.replace(staging_fmt_path, fmt_path)
+                    self._up_to_date_keys.add(key)
+
+                    # The document itself is left out, since only its preamble
+                    # (which is part of the key) is dumped to the format
+                    texfile_path = os.path.normpath(
+                        os.path.join(
+                            os.path.abspath(texfile_parent_dir_path), texfile_filename
+                        )
+                    )
+                    input_paths = [
+                        x
+                        for x in read_latex_recorder_inputs(
+                            os.path.join(staging_dir, "{}.fls".format(fmt_name))
+                        )
+                        if x != texfile_path
+                    ]
+
+                    # NOTE: recorded after the format file has been replaced,
+                    # such that an old format file is never taken to be up to
+                    # date with the inputs of the new one
+                    with open(
+                        self._get_inputs_path(fmt_path), "w", encoding="utf-8"
+                    ) as fp:
+                        json.dump(self._get_inputs_state(input_paths), fp, indent=1)
+
+                    return fmt_path
+
+            self._failed_keys.add(key)
+            return None
+
+    @classmethod
+    def create(
+        cls: Type[Self],
+        locator: IExternalProgramLocator,
+        cache_dir: str,
+        sty_dir: str,
+        env: Mapping[str, str] | None = None,
+    ) -> Self:
+        pdflatex_cmd = locator.find_program("pdflatex", ["pdflatex"])
+        return cls(pdflatex_cmd, cache_dir, sty_dir, env)
+
+
+if TYPE_CHECKING:
+    _: type[IPreambleFormatProvider] = MyLatexFormatPreambleFormatProvider
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import unittest.mock as mock
+from typing import Mapping
+
+from ltxpect import asyncpopen
+from ltxpect.buildtools.ghostscript import GhostScriptPdfPageRasterizer
+
+
+class GhostScriptPdfPageRasterizerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        if sys.platform == "win32":
+            self.loop = asyncio.ProactorEventLoop()
+        else:
+            self.loop = asyncio.SelectorEventLoop()
+        self.addCleanup(self.loop.close)
+
+        patcher = mock.patch.object(
+            asyncpopen, "popen_async", new_callable=mock.AsyncMock
+        )
+        self.popen_async_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.gs_cmd_args: list[list[str]] = []
+
+        # Fake GhostScript: write one output file per rendered page, numbered
+        # sequentially from 1, where the file content is the index of the file
+        async def popen_async(
+            loop: asyncio.AbstractEventLoop,
+            args: list[str],
+            timeout: float = 0,
+            env: Mapping[str, str] | None = None,
+            max_captured_lines: int | None = None,
+        ) -> asyncpopen.AsyncPopenResult:
+            self.gs_cmd_args.append(args)
+
+            output_path_template = args[args.index("-o") + 1]
+
+            page_selection = [
+                x for x in args if x.startswith(("-dFirstPage", "-dLastPage", "-sPage"))
+            ]
+            if page_selection[0].startswith("-sPageList="):
+                num_pages = len(page_selection[0].split("=")[1].split(","))
+            else:
+                first_page = int(page_selection[0].split("=")[1])
+                last_page = int(page_selection[1].split("=")[1])
+                num_pages = last_page - first_page + 1
+
+            for output_index in range(1, num_pages + 1):
+                with open(output_path_template % output_index, "w") as fp:
+                    fp.write(str(output_index))
+
+            return asyncpopen.AsyncPopenResult(returncode=0, stdout=(), stderr=())
+
+        self.popen_async_mock.side_effect = popen_async
+
+    def _read_output_file(self, page_num: int) -> str:
+        with open(os.path.join(self.tmpdir, f"page_{page_num}.png")) as fp:
+            return fp.read()
+
+    def test_convert_pdf_pages_to_png__contiguous_pages__uses_page_range(self):
+        # Arrange
+
+        rasterizer = GhostScriptPdfPageRasterizer("gs")
+        output_template = os.path.join(self.tmpdir, "page_%d.png")
+
+        # Act
+
+        try:
+            self.loop.run_until_complete(
+                rasterizer.convert_pdf_pages_to_png_async(
+                    "doc.pdf", [3, 2, 4], output_template
+                )
+            )
+        finally:
+            self.loop.close()
+
+        # Assert
+
+        self.assertEqual(len(self.gs_cmd_args), 1)
+        self.assertIn("-dFirstPage=2", self.gs_cmd_args[0])
+        self.assertIn("-dLastPage=4", self.gs_cmd_args[0])
+
+        self.assertEqual(self._read_output_file(2), "1")
+        self.assertEqual(self._read_output_file(3), "2")
+        self.assertEqual(self._read_output_file(4), "3")
+
+        # Staging directory should have been removed
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir)),
+            ["page_2.png", "page_3.png", "page_4.png"],
+        )
+
+    def test_convert_pdf_pages_to_png__non_contiguous_pages__uses_page_list(self):
+        # Arrange
+
+        rasterizer = GhostScriptPdfPageRasterizer("gs")
+        output_template = os.path.join(self.tmpdir, "page_%d.png")
+
+        # Act
+
+        try:
+            self.loop.run_until_complete(
+                rasterizer.convert_pdf_pages_to_png_async(
+                    "doc.pdf", [5, 1, 2], output_template
+                )
+            )
+        finally:
+            self.loop.close()
+
+        # Assert
+
+        self.assertEqual(len(self.gs_cmd_args), 1)
+        self.assertIn("-sPageList=1,2,5", self.gs_cmd_args[0])
+
+        self.assertEqual(self._read_output_file(1), "1")
+        self.assertEqual(self._read_output_file(2), "2")
+        self.assertEqual(self._read_output_file(5), "3")
+
+    def test_create__rasterizer_settings_include_version(self):
+        # Arrange
+
+        locator = mock.Mock()
+        locator.find_program.return_value = "gs"
+
+        # Act
+
+        with mock.patch.object(
+            subprocess,
+            "run",
+            return_value=subprocess.CompletedProcess(["gs"], 0, stdout=b"10.02.1\n"),
+        ) as run_mock:
+            rasterizer = GhostScriptPdfPageRasterizer.create(locator)
+
+        # Assert
+
+        self.assertEqual(run_mock.call_args.args[0], ["gs", "--version"])
+        self.assertEqual(rasterizer.gs_version, "10.02.1")
+        self.assertTrue(rasterizer.rasterizer_settings.startswith("gs 10.02.1 "))
+        self.assertNotEqual(
+            rasterizer.rasterizer_settings,
+            GhostScriptPdfPageRasterizer("gs", "9.56.1").rasterizer_settings,
+        )
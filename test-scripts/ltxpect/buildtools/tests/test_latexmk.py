@@ -0,0 +1,189 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock as mock
+from typing import Mapping
+
+from ltxpect import asyncpopen
+from ltxpect.buildtools.abc import LatexBuildResult
+from ltxpect.buildtools.latexmk import LatexmkTestBuilder
+from ltxpect.paths import SystemPathUtil
+
+
+class LatexmkTestBuilderTests(unittest.TestCase):
+    def setUp(self) -> None:
+        if sys.platform == "win32":
+            self.loop = asyncio.ProactorEventLoop()
+        else:
+            self.loop = asyncio.SelectorEventLoop()
+
+        patcher = mock.patch.object(
+            asyncpopen, "popen_async", new_callable=mock.AsyncMock
+        )
+        self.popen_async_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        os.makedirs(os.path.join(self.tmpdir, "tests"))
+
+        self.calls: list[tuple[list[str], str | None]] = []
+        self.failing_cmd: str | None = None
+
+        async def popen_async(
+            loop: asyncio.AbstractEventLoop,
+            args: list[str],
+            timeout: float = 0,
+            cwd: str | None = None,
+            env: Mapping[str, str] | None = None,
+            max_captured_lines: int | None = None,
+        ) -> asyncpopen.AsyncPopenResult:
+            self.calls.append((args, cwd))
+
+            returncode = 1 if args[0] == self.failing_cmd else 0
+            return asyncpopen.AsyncPopenResult(
+                returncode=returncode, stdout=(args[0].encode(),), stderr=()
+            )
+
+        self.popen_async_mock.side_effect = popen_async
+
+        self.builder = LatexmkTestBuilder(
+            SystemPathUtil(), "latexmk", "pdflatex", "makeglossaries"
+        )
+
+    def _write_texfile(self, content: bytes) -> None:
+        with open(os.path.join(self.tmpdir, "tests", "test.tex"), "wb") as fp:
+            fp.write(content)
+
+    def _build(self) -> LatexBuildResult:
+        try:
+            return self.loop.run_until_complete(
+                self.builder.build_latex_document_async(
+                    base_dir=self.tmpdir,
+                    texfile_parent_dir_subpath="tests",
+                    texfile_filename="test.tex",
+                    latex_build_dir_subpath=".build/test",
+                    latex_jobname="output",
+                    timeout=60,
+                )
+            )
+        finally:
+            self.loop.close()
+
+    def test_build__no_glossaries__only_runs_latexmk(self):
+        # Arrange
+
+        self._write_texfile(b"\\documentclass{ntnuthesis}")
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(len(self.calls), 1)
+
+        args, cwd = self.calls[0]
+        self.assertEqual(args[0], "latexmk")
+        self.assertEqual(cwd, os.path.join(self.tmpdir, "tests"))
+        self.assertIn("-pdflatex=pdflatex %O %S", args)
+        self.assertIn("-output-directory=../.build/test", args)
+        self.assertIn("-jobname=output", args)
+        self.assertNotIn("-e", args)
+        self.assertEqual(args[-1], "test.tex")
+        self.assertEqual(
+            self.popen_async_mock.await_args.kwargs["max_captured_lines"],
+            LatexmkTestBuilder.MAX_CAPTURED_LINES,
+        )
+
+    def test_build__pdflatex_path_with_spaces__is_quoted(self):
+        # Arrange
+
+        self._write_texfile(b"\\documentclass{ntnuthesis}")
+
+        pdflatex_cmd = os.path.join(self.tmpdir, "Program Files", "pdflatex")
+        self.builder.pdflatex_cmd = pdflatex_cmd
+
+        # Act
+
+        self._build()
+
+        # Assert
+
+        args, _cwd = self.calls[0]
+        quoted_pdflatex_cmd = (
+            '"{}"'.format(pdflatex_cmd)
+            if os.name == "nt"
+            else "'{}'".format(pdflatex_cmd)
+        )
+        self.assertIn("-pdflatex={} %O %S".format(quoted_pdflatex_cmd), args)
+
+    def test_build__glossaries__latexmk_runs_makeglossaries(self):
+        # Arrange
+
+        self._write_texfile(b"\\makeglossaries")
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(len(self.calls), 1)
+
+        args, _cwd = self.calls[0]
+        self.assertEqual(args[0], "latexmk")
+
+        custom_dependency_code = args[args.index("-e") + 1]
+        self.assertIn("add_cus_dep('glo', 'gls'", custom_dependency_code)
+        self.assertIn("add_cus_dep('acn', 'acr'", custom_dependency_code)
+        self.assertIn("system('makeglossaries', '-q'", custom_dependency_code)
+
+    def test_build__build_fails__returns_returncode(self):
+        # Arrange
+
+        self._write_texfile(b"\\documentclass{ntnuthesis}")
+        self.failing_cmd = "latexmk"
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stdout, (b"latexmk",))
+
+    def test_build__preamble_format__compiles_against_format(self):
+        # Arrange
+
+        self._write_texfile(b"\\documentclass{ntnuthesis}")
+
+        fmt_path = os.path.join(self.tmpdir, "formats", "ltxpect-0123.fmt")
+        preamble_format_provider = mock.Mock()
+        preamble_format_provider.get_preamble_format_path_async = mock.AsyncMock(
+            return_value=fmt_path
+        )
+        self.builder.preamble_format_provider = preamble_format_provider
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertEqual(result.returncode, 0)
+
+        args, _cwd = self.calls[0]
+        self.assertIn("-pdflatex=pdflatex -fmt=ltxpect-0123 %O %S", args)
+
+        env = self.popen_async_mock.await_args.kwargs["env"]
+        self.assertTrue(
+            env["TEXFORMATS"].startswith(os.path.join(self.tmpdir, "formats"))
+        )
@@ -0,0 +1,310 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import unittest.mock as mock
+import zlib
+
+from ltxpect.buildtools import nativepdf
+from ltxpect.buildtools.nativepdf import (
+    find_pages_with_equal_fingerprints,
+    NativePdfDocInfoProvider,
+    normalize_pdf_bytes,
+    pdf_files_are_equal_after_normalization,
+    PdfReader,
+)
+from ltxpect.buildtools.pdfinfo import PdfDocInfo
+
+
+def _make_pdf(
+    creation_date: bytes, file_id: bytes, banner: bytes, page_content: bytes
+) -> bytes:
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(page_content), page_content),
+        b"<< /Producer (pdfTeX-1.40.27) /CreationDate (%s) /ModDate (%s)\n"
+        b"/Trapped /False\n/PTEX.Fullbanner (%s) >>"
+        % (creation_date, creation_date, banner),
+    ]
+
+    content = b"%PDF-1.5\n"
+    offsets = []
+    for obj_num, obj in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += b"%d 0 obj\n%s\nendobj\n" % (obj_num, obj)
+
+    xref_offset = len(content)
+    content += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        content += b"%010d 00000 n \n" % offset
+
+    content += (
+        b"trailer\n<< /Size %d\n/Root 1 0 R\n/Info 5 0 R\n/ID [<%s> <%s>] >>\n"
+        b"startxref\n%d\n%%%%EOF\n" % (len(objects) + 1, file_id, file_id, xref_offset)
+    )
+
+    return content
+
+
+class PdfNormalizationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.first_pdf = os.path.join(self.tmpdir, "first.pdf")
+        self.second_pdf = os.path.join(self.tmpdir, "second.pdf")
+
+    def _write_file(self, path: str, content: bytes) -> None:
+        with open(path, "wb") as fp:
+            fp.write(content)
+
+    def test_normalize_pdf_bytes__removes_volatile_metadata(self):
+        pdf = _make_pdf(
+            b"D:20250521090153Z",
+            b"6BAE1AD241DAEF729723A089673E30BC",
+            b"This is pdfTeX",
+            b"BT (Hello) Tj ET",
+        )
+
+        normalized = normalize_pdf_bytes(pdf)
+
+        self.assertNotIn(b"20250521090153", normalized)
+        self.assertNotIn(b"6BAE1AD241DAEF729723A089673E30BC", normalized)
+        self.assertNotIn(b"This is pdfTeX", normalized)
+        self.assertNotIn(b"65535 f", normalized)
+        self.assertIn(b"BT (Hello) Tj ET", normalized)
+
+    def test_only_metadata_differs__returns_true(self):
+        self._write_file(
+            self.first_pdf,
+            _make_pdf(
+                b"D:20250521090153Z",
+                b"6BAE1AD241DAEF729723A089673E30BC",
+                b"This is MiKTeX-pdfTeX 4.21.0 (1.40.27)",
+                b"BT (Hello) Tj ET",
+            ),
+        )
+        self._write_file(
+            self.second_pdf,
+            _make_pdf(
+                b"D:20261017120000+02'00'",
+                b"0123456789ABCDEF0123456789ABCDEF",
+                b"This is pdfTeX, Version 3.141592653-2.6-1.40.28 (TeX Live 2026)",
+                b"BT (Hello) Tj ET",
+            ),
+        )
+
+        self.assertTrue(
+            pdf_files_are_equal_after_normalization(self.first_pdf, self.second_pdf)
+        )
+
+    def test_content_differs__returns_false(self):
+        self._write_file(
+            self.first_pdf,
+            _make_pdf(
+                b"D:20250521090153Z",
+                b"6BAE1AD241DAEF729723A089673E30BC",
+                b"This is pdfTeX",
+                b"BT (Hello) Tj ET",
+            ),
+        )
+        self._write_file(
+            self.second_pdf,
+            _make_pdf(
+                b"D:20250521090153Z",
+                b"6BAE1AD241DAEF729723A089673E30BC",
+                b"This is pdfTeX",
+                b"BT (Hellp) Tj ET",
+            ),
+        )
+
+        self.assertFalse(
+            pdf_files_are_equal_after_normalization(self.first_pdf, self.second_pdf)
+        )
+
+
+def _make_multi_page_pdf(
+    page_contents: list[bytes], font_data: bytes = b"FONT", compress: bool = False
+) -> bytes:
+    def stream(data: bytes) -> bytes:
+        if compress:
+            data = zlib.compress(data)
+            return b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (
+                len(data),
+                data,
+            )
+        return b"<< /Length %d >>\nstream\n%s\nendstream" % (len(data), data)
+
+    num_pages = len(page_contents)
+    first_page_obj = 5
+    page_objs = [first_page_obj + 2 * i for i in range(num_pages)]
+
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [%s] /Count %d /Resources 3 0 R >>"
+        % (b" ".join(b"%d 0 R" % x for x in page_objs), num_pages),
+        3: b"<< /Font << /F1 4 0 R >> >>",
+        4: stream(font_data),
+    }
+    for i, (page_obj, content) in enumerate(zip(page_objs, page_contents)):
+        # Each page links to the next page
+        link_target = page_objs[(i + 1) % num_pages]
+        objects[page_obj] = (
+            b"<< /Type /Page /Parent 2 0 R /Contents %d 0 R "
+            b"/Annots [<< /Type /Annot /Subtype /Link /Dest [%d 0 R /Fit] >>] >>"
+            % (page_obj + 1, link_target)
+        )
+        objects[page_obj + 1] = stream(content)
+
+    content = b"%PDF-1.5\n"
+    offsets = {}
+    for obj_num in sorted(objects):
+        offsets[obj_num] = len(content)
+        content += b"%d 0 obj\n%s\nendobj\n" % (obj_num, objects[obj_num])
+
+    xref_offset = len(content)
+    size = max(objects) + 1
+    content += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for obj_num in range(1, size):
+        content += b"%010d 00000 n \n" % offsets[obj_num]
+
+    content += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        size,
+        xref_offset,
+    )
+
+    return content
+
+
+class PageFingerprintTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.first_pdf = os.path.join(self.tmpdir, "first.pdf")
+        self.second_pdf = os.path.join(self.tmpdir, "second.pdf")
+
+        self.page_contents = [b"BT (page %d) Tj ET" % i for i in range(1, 4)]
+
+    def _write_file(self, path: str, content: bytes) -> None:
+        with open(path, "wb") as fp:
+            fp.write(content)
+
+    def test_pdf_reader__reads_pages(self):
+        reader = PdfReader(_make_multi_page_pdf(self.page_contents))
+
+        self.assertEqual(reader.num_pages, 3)
+        self.assertEqual(len(reader.get_pages()), 3)
+
+        # /Resources is inherited from the page tree root
+        self.assertIn("Resources", reader.get_pages()[0][1])
+
+    def test_only_one_page_changed__other_pages_are_equal(self):
+        changed_page_contents = list(self.page_contents)
+        changed_page_contents[1] = b"BT (changed) Tj ET"
+
+        self._write_file(self.first_pdf, _make_multi_page_pdf(self.page_contents))
+        self._write_file(self.second_pdf, _make_multi_page_pdf(changed_page_contents))
+
+        self.assertEqual(
+            find_pages_with_equal_fingerprints(
+                self.first_pdf, self.second_pdf, [1, 2, 3]
+            ),
+            {1, 3},
+        )
+
+    def test_different_compression__pages_are_equal(self):
+        self._write_file(self.first_pdf, _make_multi_page_pdf(self.page_contents))
+        self._write_file(
+            self.second_pdf, _make_multi_page_pdf(self.page_contents, compress=True)
+        )
+
+        self.assertEqual(
+            find_pages_with_equal_fingerprints(
+                self.first_pdf, self.second_pdf, [1, 2, 3]
+            ),
+            {1, 2, 3},
+        )
+
+    def test_shared_font_changed__no_pages_are_equal(self):
+        self._write_file(self.first_pdf, _make_multi_page_pdf(self.page_contents))
+        self._write_file(
+            self.second_pdf,
+            _make_multi_page_pdf(self.page_contents, font_data=b"OTHER FONT"),
+        )
+
+        self.assertEqual(
+            find_pages_with_equal_fingerprints(
+                self.first_pdf, self.second_pdf, [1, 2, 3]
+            ),
+            frozenset(),
+        )
+
+    def test_unparseable_pdf__no_pages_are_equal(self):
+        self._write_file(self.first_pdf, b"%PDF-1.5 garbage")
+        self._write_file(self.second_pdf, b"%PDF-1.5 garbage")
+
+        self.assertEqual(
+            find_pages_with_equal_fingerprints(
+                self.first_pdf, self.second_pdf, [1, 2, 3]
+            ),
+            frozenset(),
+        )
+
+
+class NativePdfDocInfoProviderTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.pdf_path = os.path.join(self.tmpdir, "doc.pdf")
+
+    def _write_file(self, path: str, content: bytes) -> None:
+        with open(path, "wb") as fp:
+            fp.write(content)
+
+    def test_get_pdf_info__returns_page_count(self):
+        self._write_file(self.pdf_path, _make_multi_page_pdf([b"", b"", b""]))
+
+        doc_info = asyncio.run(
+            NativePdfDocInfoProvider().get_pdf_info_async(self.pdf_path)
+        )
+
+        self.assertEqual(doc_info.path, self.pdf_path)
+        self.assertEqual(doc_info.num_physical_pages, 3)
+
+    def test_get_pdf_info__unchanged_file__is_only_parsed_once(self):
+        self._write_file(self.pdf_path, _make_multi_page_pdf([b"", b""]))
+        provider = NativePdfDocInfoProvider()
+
+        async def test_async():
+            with mock.patch.object(
+                nativepdf.PdfReader, "from_file", wraps=nativepdf.PdfReader.from_file
+            ) as from_file_mock:
+                first = await provider.get_pdf_info_async(self.pdf_path)
+                second = await provider.get_pdf_info_async(self.pdf_path)
+
+            self.assertEqual(from_file_mock.call_count, 1)
+            self.assertEqual(first, second)
+
+        asyncio.run(test_async())
+
+    def test_get_pdf_info__unparseable_file__uses_fallback(self):
+        self._write_file(self.pdf_path, b"%PDF-1.5 garbage")
+
+        fallback = mock.Mock()
+        fallback.get_pdf_info_async = mock.AsyncMock(
+            return_value=PdfDocInfo(path=self.pdf_path, num_physical_pages=7)
+        )
+
+        doc_info = asyncio.run(
+            NativePdfDocInfoProvider(fallback).get_pdf_info_async(self.pdf_path)
+        )
+
+        fallback.get_pdf_info_async.assert_awaited_once_with(self.pdf_path)
+        self.assertEqual(doc_info.num_physical_pages, 7)
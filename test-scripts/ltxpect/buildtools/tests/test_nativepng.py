@@ -0,0 +1,266 @@
+import asyncio
+import os
+import struct
+import random
+import tempfile
+import unittest
+import unittest.mock as mock
+import zlib
+
+from ltxpect.buildtools.abc import ImageDimensions
+from ltxpect.buildtools.nativepng import (
+    compare_png_images,
+    NativePngImageComparer,
+    NativePngImageDimensionsInspector,
+    PNG_SIGNATURE,
+    PngFormatError,
+)
+
+
+def _paeth_predictor(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    if pb <= pc:
+        return b
+    return c
+
+
+def _filter_scanline(filter_type: int, row: bytes, prev: bytes, bpp: int) -> bytes:
+    out = bytearray(len(row))
+    for i, value in enumerate(row):
+        a = row[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        c = prev[i - bpp] if i >= bpp else 0
+
+        predictor = (
+            0,
+            a,
+            b,
+            (a + b) >> 1,
+            _paeth_predictor(a, b, c),
+        )[filter_type]
+
+        out[i] = (value - predictor) & 0xFF
+
+    return bytes([filter_type]) + bytes(out)
+
+
+def _write_rgb8_png(
+    png_path: str, width: int, rows: list[bytes], filter_types: list[int]
+) -> None:
+    def chunk(chunk_type: bytes, chunk_data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(chunk_data))
+            + chunk_type
+            + chunk_data
+            + struct.pack(">I", zlib.crc32(chunk_type + chunk_data))
+        )
+
+    filtered = b""
+    prev = bytes(3 * width)
+    for row, filter_type in zip(rows, filter_types):
+        filtered += _filter_scanline(filter_type, row, prev, 3)
+        prev = row
+
+    with open(png_path, "wb") as fp:
+        fp.write(PNG_SIGNATURE)
+        fp.write(
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, len(rows), 8, 2, 0, 0, 0))
+        )
+        fp.write(chunk(b"IDAT", zlib.compress(filtered)))
+        fp.write(chunk(b"IEND", b""))
+
+
+# 4x5 RGB image with some structure, so that all filter types are exercised
+_WIDTH = 4
+_ROWS = [
+    bytes((x * 40 + y * 7 + c * 3) & 0xFF for x in range(4) for c in range(3))
+    for y in range(5)
+]
+
+
+class NativePngImageComparerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.first_png = os.path.join(self.tmpdir, "first.png")
+        self.second_png = os.path.join(self.tmpdir, "second.png")
+        self.diff_png = os.path.join(self.tmpdir, "diff.png")
+
+    def test_identical_images__returns_true_and_writes_no_diff(self):
+        # Arrange
+        _write_rgb8_png(self.first_png, _WIDTH, _ROWS, [0, 1, 2, 3, 4])
+        _write_rgb8_png(self.second_png, _WIDTH, _ROWS, [0, 1, 2, 3, 4])
+
+        # Act
+        result = asyncio.run(
+            NativePngImageComparer().compare_png_images_async(
+                self.first_png, self.second_png, self.diff_png
+            )
+        )
+
+        # Assert
+        self.assertTrue(result)
+        self.assertFalse(os.path.exists(self.diff_png))
+
+    def test_same_pixels_with_different_filters__returns_true(self):
+        # Arrange
+        _write_rgb8_png(self.first_png, _WIDTH, _ROWS, [0, 1, 2, 3, 4])
+        _write_rgb8_png(self.second_png, _WIDTH, _ROWS, [4, 3, 2, 1, 0])
+
+        # Act
+        ae_diff = compare_png_images(self.first_png, self.second_png, self.diff_png)
+
+        # Assert
+        self.assertEqual(ae_diff, 0)
+        self.assertFalse(os.path.exists(self.diff_png))
+
+    def test_images_with_diff__counts_differing_pixels_and_writes_diff(self):
+        # Arrange
+        changed_rows = list(_ROWS)
+        changed_rows[1] = changed_rows[1][:3] + b"\x00\x00\x00" + changed_rows[1][6:]
+        changed_rows[3] = changed_rows[3][:9] + b"\x01\x02\x03"
+
+        _write_rgb8_png(self.first_png, _WIDTH, _ROWS, [0, 1, 2, 3, 4])
+        _write_rgb8_png(self.second_png, _WIDTH, changed_rows, [4, 4, 4, 4, 4])
+
+        # Act
+        ae_diff = compare_png_images(self.first_png, self.second_png, self.diff_png)
+
+        # Assert
+        self.assertEqual(ae_diff, 2)
+        self.assertTrue(os.path.exists(self.diff_png))
+
+        # The diff image should itself be a valid PNG image with the same size
+        self.assertEqual(
+            compare_png_images(self.diff_png, self.diff_png, self.diff_png), 0
+        )
+
+    def test_wide_images_with_all_filters__counts_differing_pixels(self):
+        # Arrange
+        rng = random.Random(1234)
+        width = 101
+        rows = [rng.randbytes(3 * width) for _ in range(10)]
+
+        changed_rows = list(rows)
+        changed_rows[2] = bytes(3) + rows[2][3:-6] + bytes(6)
+
+        _write_rgb8_png(self.first_png, width, rows, [1, 1, 2, 3, 4] * 2)
+        _write_rgb8_png(self.second_png, width, changed_rows, [4, 3, 2, 1, 0] * 2)
+
+        # Act
+        ae_diff = compare_png_images(self.first_png, self.second_png, self.diff_png)
+
+        # Assert
+        self.assertEqual(ae_diff, 3)
+
+    def test_tall_images_with_all_filters__counts_differing_pixels(self):
+        # Arrange
+        rng = random.Random(4321)
+        width = 7
+        rows = [rng.randbytes(3 * width) for _ in range(60)]
+
+        changed_rows = list(rows)
+        changed_rows[41] = rows[41][:-3] + bytes(3)
+
+        _write_rgb8_png(self.first_png, width, rows, [3, 4, 0, 4, 1, 2] * 10)
+        _write_rgb8_png(self.second_png, width, changed_rows, [4] * 60)
+
+        # Act
+        ae_diff = compare_png_images(self.first_png, self.second_png, self.diff_png)
+
+        # Assert
+        self.assertEqual(ae_diff, 1)
+
+    def test_with_fallback__different_image_data__fallback_not_used(self):
+        # Arrange
+        _write_rgb8_png(self.first_png, _WIDTH, _ROWS, [0, 1, 2, 3, 4])
+        _write_rgb8_png(self.second_png, _WIDTH, _ROWS, [4, 3, 2, 1, 0])
+
+        fallback = mock.Mock()
+        fallback.compare_png_images_async = mock.AsyncMock(return_value=False)
+
+        # Act
+        result = asyncio.run(
+            NativePngImageComparer(fallback=fallback).compare_png_images_async(
+                self.first_png, self.second_png, self.diff_png
+            )
+        )
+
+        # Assert
+        self.assertTrue(result)
+        fallback.compare_png_images_async.assert_not_called()
+
+    def test_with_fallback__image_cannot_be_decoded__compared_by_fallback(self):
+        # Arrange
+        with open(self.first_png, "wb") as fp:
+            fp.write(b"not a png")
+
+        _write_rgb8_png(self.second_png, _WIDTH, _ROWS, [0, 0, 0, 0, 0])
+
+        fallback = mock.Mock()
+        fallback.compare_png_images_async = mock.AsyncMock(return_value=False)
+
+        # Act
+        result = asyncio.run(
+            NativePngImageComparer(fallback=fallback).compare_png_images_async(
+                self.first_png, self.second_png, self.diff_png
+            )
+        )
+
+        # Assert
+        self.assertFalse(result)
+        fallback.compare_png_images_async.assert_awaited_once_with(
+            self.first_png, self.second_png, self.diff_png
+        )
+
+    def test_not_a_png__raises(self):
+        # Arrange
+        with open(self.first_png, "wb") as fp:
+            fp.write(b"not a png")
+
+        _write_rgb8_png(self.second_png, _WIDTH, _ROWS, [0, 0, 0, 0, 0])
+
+        # Act / Assert
+        with self.assertRaises(PngFormatError):
+            compare_png_images(self.first_png, self.second_png, self.diff_png)
+
+
+class NativePngImageDimensionsInspectorTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.png_path = os.path.join(self.tmpdir, "image.png")
+
+    def test_get_png_image_dimensions__returns_width_and_height(self):
+        # Arrange
+        _write_rgb8_png(self.png_path, _WIDTH, _ROWS, [0, 0, 0, 0, 0])
+
+        # Act
+        dimensions = asyncio.run(
+            NativePngImageDimensionsInspector().get_png_image_dimensions_async(
+                self.png_path
+            )
+        )
+
+        # Assert
+        self.assertEqual(dimensions, ImageDimensions(width=4, height=5))
+
+    def test_get_png_image_dimensions__truncated_file__raises(self):
+        # Arrange
+        with open(self.png_path, "wb") as fp:
+            fp.write(PNG_SIGNATURE + b"\x00\x00\x00\x0dIHDR")
+
+        # Act / Assert
+        with self.assertRaises(PngFormatError):
+            asyncio.run(
+                NativePngImageDimensionsInspector().get_png_image_dimensions_async(
+                    self.png_path
+                )
+            )
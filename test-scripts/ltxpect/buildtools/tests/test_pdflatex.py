@@ -0,0 +1,246 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock as mock
+from typing import Mapping
+
+from ltxpect import asyncpopen
+from ltxpect.buildtools.pdflatex import PdflatexPassLoopTestBuilder
+from ltxpect.paths import SystemPathUtil
+
+
+class PdflatexPassLoopTestBuilderTests(unittest.TestCase):
+    def setUp(self) -> None:
+        if sys.platform == "win32":
+            self.loop = asyncio.ProactorEventLoop()
+        else:
+            self.loop = asyncio.SelectorEventLoop()
+
+        patcher = mock.patch.object(
+            asyncpopen, "popen_async", new_callable=mock.AsyncMock
+        )
+        self.popen_async_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.build_dir = os.path.join(self.tmpdir, ".build", "test")
+        os.makedirs(os.path.join(self.tmpdir, "tests"))
+        os.makedirs(self.build_dir)
+
+        # The .aux file content written by each pdflatex pass. The last entry
+        # is repeated for any further passes.
+        self.aux_contents: list[bytes] = [b"\\relax"]
+
+        # The content of other auxiliary files written by each pdflatex pass
+        # (e.g. lists of figures), by extension, like aux_contents
+        self.other_aux_contents: dict[str, list[bytes]] = {}
+        self.pdflatex_returncode = 0
+        self.pdflatex_num_output_lines = 0
+        self.commands: list[str] = []
+
+        async def popen_async(
+            loop: asyncio.AbstractEventLoop,
+            args: list[str],
+            timeout: float = 0,
+            cwd: str | None = None,
+            env: Mapping[str, str] | None = None,
+            max_captured_lines: int | None = None,
+        ) -> asyncpopen.AsyncPopenResult:
+            self.commands.append(args[0])
+
+            if args[0] == "pdflatex":
+                num_passes = self.commands.count("pdflatex")
+                aux_contents = {".aux": self.aux_contents, **self.other_aux_contents}
+
+                # Auxiliary files that exist are read back, and then rewritten
+                fls_lines = ["PWD {}".format(cwd), "INPUT test.tex"]
+                for ext in (".aux", ".bbl", ".gls", *self.other_aux_contents):
+                    if os.path.exists(os.path.join(self.build_dir, "output" + ext)):
+                        fls_lines.append("INPUT ../.build/test/output" + ext)
+
+                for ext, contents in aux_contents.items():
+                    content = contents[min(num_passes, len(contents)) - 1]
+                    self._write_build_file(ext, content)
+                    fls_lines.append("OUTPUT ../.build/test/output" + ext)
+
+                # The log file is not read back, and changes with each pass
+                self._write_build_file(".log", b"pass %d" % num_passes)
+                fls_lines.append("OUTPUT ../.build/test/output.log")
+
+                self._write_build_file(
+                    ".fls", "".join(x + "\n" for x in fls_lines).encode("utf-8")
+                )
+
+                stdout = tuple(
+                    b"pass %d line %d" % (num_passes, i)
+                    for i in range(self.pdflatex_num_output_lines)
+                )
+                return asyncpopen.AsyncPopenResult(
+                    returncode=self.pdflatex_returncode,
+                    stdout=(
+                        stdout[-max_captured_lines:] if max_captured_lines else stdout
+                    ),
+                    stderr=(),
+                )
+
+            if args[0] == "makeglossaries":
+                self._write_build_file(".gls", b"glossary")
+
+            return asyncpopen.AsyncPopenResult(returncode=0, stdout=(), stderr=())
+
+        self.popen_async_mock.side_effect = popen_async
+
+        self.builder = PdflatexPassLoopTestBuilder(
+            SystemPathUtil(), "pdflatex", "bibtex", "makeglossaries"
+        )
+
+    def _write_build_file(self, ext: str, content: bytes) -> None:
+        with open(os.path.join(self.build_dir, "output" + ext), "wb") as fp:
+            fp.write(content)
+
+    def _build(self):
+        try:
+            return self.loop.run_until_complete(
+                self.builder.build_latex_document_async(
+                    base_dir=self.tmpdir,
+                    texfile_parent_dir_subpath="tests",
+                    texfile_filename="test.tex",
+                    latex_build_dir_subpath=".build/test",
+                    latex_jobname="output",
+                    timeout=60,
+                )
+            )
+        finally:
+            self.loop.close()
+
+    def test_build__aux_converges__stops_after_unchanged_pass(self):
+        # Arrange
+
+        self.aux_contents = [
+            b"\\relax",
+            b"\\newlabel{sec}{{1}{1}}",
+            b"\\newlabel{sec}{{1}{2}}",
+        ]
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.num_passes, 4)
+        self.assertEqual(self.commands, ["pdflatex"] * 4)
+
+    def test_build__list_of_listings_converges__stops_after_unchanged_pass(self):
+        # Arrange
+
+        self.other_aux_contents = {
+            # \listof{codesnippet}
+            ".locs": [b"", b"\\contentsline {codesnippet}{1}{1}"],
+        }
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.num_passes, 3)
+
+    def test_build__aux_never_converges__fails_at_max_passes(self):
+        # Arrange
+
+        self.aux_contents = [b"%d" % i for i in range(20)]
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertNotEqual(result.returncode, 0)
+        self.assertEqual(result.num_passes, PdflatexPassLoopTestBuilder.MAX_PASSES)
+        self.assertEqual(
+            result.stderr,
+            (
+                b"The auxiliary files did not converge after %d passes"
+                % PdflatexPassLoopTestBuilder.MAX_PASSES,
+            ),
+        )
+
+    def test_build__aux_converges_at_max_passes__succeeds(self):
+        # Arrange
+
+        max_passes = PdflatexPassLoopTestBuilder.MAX_PASSES
+        self.aux_contents = [b"%d" % i for i in range(max_passes - 1)]
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(result.num_passes, max_passes)
+
+    def test_build__lots_of_output__keeps_last_lines(self):
+        # Arrange
+
+        self.aux_contents = [b"\\relax", b"\\newlabel{sec}{{1}{1}}"]
+        self.pdflatex_num_output_lines = 400
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        max_lines = PdflatexPassLoopTestBuilder.MAX_CAPTURED_LINES
+        self.assertEqual(result.num_passes, 3)
+        self.assertEqual(len(result.stdout), max_lines)
+        self.assertEqual(result.stdout[-1], b"pass 3 line 399")
+        self.assertEqual(
+            self.popen_async_mock.await_args.kwargs["max_captured_lines"], max_lines
+        )
+
+    def test_build__pass_fails__returns_returncode_and_passes(self):
+        # Arrange
+
+        self.pdflatex_returncode = 1
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.num_passes, 1)
+
+    def test_build__citations_and_glossaries__runs_tools_once_per_change(self):
+        # Arrange
+
+        self.aux_contents = [
+            b"\\citation{knuth}\n\\bibdata{refs}\n"
+            b"\\@newglossary{main}{glg}{gls}{glo}",
+        ]
+
+        # Act
+
+        result = self._build()
+
+        # Assert
+
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(
+            self.commands,
+            ["pdflatex", "bibtex", "makeglossaries", "pdflatex"],
+        )
+        self.assertEqual(result.num_passes, 2)
@@ -0,0 +1,309 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock as mock
+from typing import Mapping
+
+from ltxpect import asyncpopen
+from ltxpect.buildtools.preambleformat import MyLatexFormatPreambleFormatProvider
+
+
+class MyLatexFormatPreambleFormatProviderTests(unittest.TestCase):
+    def setUp(self) -> None:
+        if sys.platform == "win32":
+            self.loop = asyncio.ProactorEventLoop()
+        else:
+            self.loop = asyncio.SelectorEventLoop()
+
+        patcher = mock.patch.object(
+            asyncpopen, "popen_async", new_callable=mock.AsyncMock
+        )
+        self.popen_async_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.tests_dir = os.path.join(self.tmpdir, "tests")
+        self.sty_dir = os.path.join(self.tmpdir, "ult-base")
+        self.cache_dir = os.path.join(self.tmpdir, "cache")
+        os.makedirs(self.tests_dir)
+        os.makedirs(self.sty_dir)
+
+        self._write_file(os.path.join(self.sty_dir, "ult-upsc.sty"), b"v1")
+
+        # A package file in the TeX distribution
+        self.texmf_dir = os.path.join(self.tmpdir, "texmf")
+        self.texmf_sty_path = os.path.join(self.texmf_dir, "book.cls")
+        os.makedirs(self.texmf_dir)
+        self._write_file(self.texmf_sty_path, b"v1")
+
+        self.ini_cmd_args: list[list[str]] = []
+        self.ini_returncode = 0
+
+        # Fake pdflatex: dump an empty format file into the output directory,
+        # and record the document and a package file as inputs
+        async def popen_async(
+            loop: asyncio.AbstractEventLoop,
+            args: list[str],
+            timeout: float = 0,
+            cwd: str | None = None,
+            env: Mapping[str, str] | None = None,
+            max_captured_lines: int | None = None,
+        ) -> asyncpopen.AsyncPopenResult:
+            if "--version" in args:
+                return asyncpopen.AsyncPopenResult(
+                    returncode=0, stdout=(b"pdfTeX (TeX Live 2025)",), stderr=()
+                )
+
+            self.ini_cmd_args.append(args)
+
+            jobname = next(x for x in args if x.startswith("-jobname=")).split("=")[1]
+            output_dir = next(
+                x for x in args if x.startswith("-output-directory=")
+            ).split("=")[1]
+
+            if self.ini_returncode == 0:
+                self._write_file(os.path.join(output_dir, jobname + ".fmt"), b"")
+                self._write_file(
+                    os.path.join(output_dir, jobname + ".fls"),
+                    "PWD {}\nINPUT {}\nINPUT {}\nOUTPUT {}.fmt\n".format(
+                        cwd,
+                        args[-1],
+                        self.texmf_sty_path,
+                        os.path.join(output_dir, jobname),
+                    ).encode("utf-8"),
+                )
+
+            return asyncpopen.AsyncPopenResult(
+                returncode=self.ini_returncode, stdout=(), stderr=()
+            )
+
+        self.popen_async_mock.side_effect = popen_async
+
+    def tearDown(self) -> None:
+        self.loop.close()
+
+    def _write_file(self, path: str, content: bytes) -> None:
+        with open(path, "wb") as fp:
+            fp.write(content)
+
+    def _get_format_path(
+        self, provider: MyLatexFormatPreambleFormatProvider, texfile_filename: str
+    ) -> str | None:
+        return self.loop.run_until_complete(
+            provider.get_preamble_format_path_async(self.tests_dir, texfile_filename)
+        )
+
+    def test_get_format__equal_preambles__format_is_generated_once(self):
+        # Arrange
+
+        preamble = b"\\documentclass{book}\n\\usepackage{ult-upsc}\n"
+        self._write_file(
+            os.path.join(self.tests_dir, "test_a.tex"),
+            preamble + b"\\begin{document}A\\end{document}",
+        )
+        self._write_file(
+            os.path.join(self.tests_dir, "test_b.tex"),
+            preamble + b"\\begin{document}B\\end{document}",
+        )
+
+        provider = MyLatexFormatPreambleFormatProvider(
+            "pdflatex", self.cache_dir, self.sty_dir
+        )
+
+        # Act
+
+        fmt_path_a = self._get_format_path(provider, "test_a.tex")
+        fmt_path_b = self._get_format_path(provider, "test_b.tex")
+
+        # Assert
+
+        self.assertIsNotNone(fmt_path_a)
+        self.assertEqual(fmt_path_a, fmt_path_b)
+        self.assertTrue(os.path.isfile(fmt_path_a))
+
+        self.assertEqual(len(self.ini_cmd_args), 1)
+        self.assertIn("mylatexformat.ltx", self.ini_cmd_args[0])
+        self.assertEqual(self.ini_cmd_args[0][-1], "test_a.tex")
+
+    def test_get_format__sty_file_changed__generates_new_format(self):
+        # Arrange
+
+        self._write_file(
+            os.path.join(self.tests_dir, "test.tex"),
+            b"\\documentclass{book}\\begin{document}\\end{document}",
+        )
+
+        fmt_path_before = self._get_format_path(
+            MyLatexFormatPreambleFormatProvider(
+                "pdflatex", self.cache_dir, self.sty_dir
+            ),
+            "test.tex",
+        )
+
+        # Act
+
+        self._write_file(os.path.join(self.sty_dir, "ult-upsc.sty"), b"v2")
+
+        fmt_path_after = self._get_format_path(
+            MyLatexFormatPreambleFormatProvider(
+                "pdflatex", self.cache_dir, self.sty_dir
+            ),
+            "test.tex",
+        )
+
+        # Assert
+
+        self.assertNotEqual(fmt_path_before, fmt_path_after)
+        self.assertEqual(len(self.ini_cmd_args), 2)
+
+    def test_get_format__package_file_changed__generates_format_again(self):
+        # Arrange
+
+        self._write_file(
+            os.path.join(self.tests_dir, "test.tex"),
+            b"\\documentclass{book}\\begin{document}\\end{document}",
+        )
+
+        fmt_path_before = self._get_format_path(
+            MyLatexFormatPreambleFormatProvider(
+                "pdflatex", self.cache_dir, self.sty_dir
+            ),
+            "test.tex",
+        )
+
+        # Act
+
+        self._write_file(self.texmf_sty_path, b"v22")
+
+        fmt_path_after = self._get_format_path(
+            MyLatexFormatPreambleFormatProvider(
+                "pdflatex", self.cache_dir, self.sty_dir
+            ),
+            "test.tex",
+        )
+
+        # Assert
+
+        self.assertEqual(fmt_path_before, fmt_path_after)
+        self.assertEqual(len(self.ini_cmd_args), 2)
+
+    def test_get_format__document_body_changed__reuses_format(self):
+        # Arrange
+
+        texfile_path = os.path.join(self.tests_dir, "test.tex")
+        self._write_file(
+            texfile_path, b"\\documentclass{book}\\begin{document}A\\end{document}"
+        )
+
+        fmt_path_before = self._get_format_path(
+            MyLatexFormatPreambleFormatProvider(
+                "pdflatex", self.cache_dir, self.sty_dir
+            ),
+            "test.tex",
+        )
+
+        # Act
+
+        self._write_file(
+            texfile_path, b"\\documentclass{book}\\begin{document}BB\\end{document}"
+        )
+
+        fmt_path_after = self._get_format_path(
+            MyLatexFormatPreambleFormatProvider(
+                "pdflatex", self.cache_dir, self.sty_dir
+            ),
+            "test.tex",
+        )
+
+        # Assert
+
+        self.assertEqual(fmt_path_before, fmt_path_after)
+        self.assertEqual(len(self.ini_cmd_args), 1)
+
+    def test_get_format__unsupported_documents__returns_none(self):
+        # Arrange
+
+        self._write_file(
+            os.path.join(self.tests_dir, "test_glossaries.tex"),
+            b"\\documentclass{book}\\makeglossaries\\begin{document}\\end{document}",
+        )
+        self._write_file(
+            os.path.join(self.tests_dir, "test_format_line.tex"),
+            b"%& -recorder\n\\documentclass{book}\\begin{document}\\end{document}",
+        )
+
+        provider = MyLatexFormatPreambleFormatProvider(
+            "pdflatex", self.cache_dir, self.sty_dir
+        )
+
+        # Act & assert
+
+        self.assertIsNone(self._get_format_path(provider, "test_glossaries.tex"))
+        self.assertIsNone(self._get_format_path(provider, "test_format_line.tex"))
+        self.assertEqual(self.ini_cmd_args, [])
+
+    def test_get_format__preambles_depending_on_job_name__returns_none(self):
+        # Arrange
+
+        preambles = {
+            "test_jobname.tex": b"\\documentclass{book}\\input{\\jobname.cfg}",
+            "test_tikz_externalize.tex": (
+                b"\\documentclass{book}\\usepackage{tikz}"
+                b"\\usetikzlibrary{calc, external}"
+            ),
+            "test_tikz_externalize_fix.tex": (
+                b"\\documentclass{book}"
+                b"\\usepackage{tikz,ult-tikz-externalize-jobname-fix}"
+            ),
+            "test_minted.tex": (
+                b"\\documentclass{book}\\usepackage[outputdir=out]{minted}"
+            ),
+        }
+        for filename, preamble in preambles.items():
+            self._write_file(
+                os.path.join(self.tests_dir, filename),
+                preamble + b"\\begin{document}\\end{document}",
+            )
+
+        self._write_file(
+            os.path.join(self.tests_dir, "test_tikz.tex"),
+            b"\\documentclass{book}\\usepackage{tikz}\\usetikzlibrary{calc}"
+            b"\\begin{document}\\jobname\\end{document}",
+        )
+
+        provider = MyLatexFormatPreambleFormatProvider(
+            "pdflatex", self.cache_dir, self.sty_dir
+        )
+
+        # Act & assert
+
+        for filename in preambles:
+            self.assertIsNone(self._get_format_path(provider, filename), filename)
+
+        self.assertIsNotNone(self._get_format_path(provider, "test_tikz.tex"))
+        self.assertEqual(len(self.ini_cmd_args), 1)
+
+    def test_get_format__generation_fails__returns_none_without_retrying(self):
+        # Arrange
+
+        self._write_file(
+            os.path.join(self.tests_dir, "test.tex"),
+            b"\\documentclass{book}\\begin{document}\\end{document}",
+        )
+        self.ini_returncode = 1
+
+        provider = MyLatexFormatPreambleFormatProvider(
+            "pdflatex", self.cache_dir, self.sty_dir
+        )
+
+        # Act & assert
+
+        self.assertIsNone(self._get_format_path(provider, "test.tex"))
+        self.assertIsNone(self._get_format_path(provider, "test.tex"))
+        self.assertEqual(len(self.ini_cmd_args), 1)
+        self.assertEqual(os.listdir(self.cache_dir), [])
@@ -0,0 +1,146 @@
+import asyncio
+import heapq
+from typing import TYPE_CHECKING
+
+from .coreabc import ITestReporter
+from .testresult import TestResult, TestStage
+from .tracing import TraceRecorder
+
+
+class ChromeTraceReporter:
+    """Writes a trace of the test run in the Trace Event Format, which can be
+    opened in a timeline viewer such as https://ui.perfetto.dev or
+    chrome://tracing.
+
+    The trace has a lane for each process pool slot, showing the child
+    processes run in the slot, nested in the test and tool that held the slot
+    (see tracing.record_trace(), which must be active during the test run).
+    The trace also has lanes with the stages of each test, including the time
+    spent waiting for a build slot.
+    """
+
+    TESTS_LANE_GROUP = 2
+
+    # Stages that occur once per page are shown as a single slice
+    STAGE_SLICE_NAMES = {
+        TestStage.DIMENSIONS: "compare",
+        TestStage.COMPARE: "compare",
+    }
+
+    def __init__(self, trace_path: str, trace_recorder: TraceRecorder) -> None:
+        self.trace_path = trace_path
+        self.trace_recorder = trace_recorder
+
+        self.test_result_lock = asyncio.Lock()
+
+        # (start time, end time, test name, stage slices) of each test, where
+        # each stage slice is (start time, end time, name, count)
+        self.test_slices: list[
+            tuple[float, float, str, list[tuple[float, float, str, int]]]
+        ] = []
+
+    async def report_warmup_compile_started_async(self) -> None:
+        """Report that the warmup compile step has started."""
+
+    async def report_warmup_compile_progress_async(self, test_name: str) -> None:
+        """Report that the warmup compile step has finished processing the
+        specified test.
+        """
+
+    async def report_warmup_compile_ended_async(self) -> None:
+        """Report that the warmup compile step has ended."""
+
+    async def report_test_run_started_async(self) -> None:
+        """Report that the test run has started."""
+
+    async def report_test_result_async(
+        self, test_name: str, test_passed: bool, test_result: TestResult
+    ) -> None:
+        """Report the result of a single test case after having been run."""
+
+        _ = test_passed
+
+        if not test_result.stage_timings:
+            return
+
+        stage_slices: dict[str, tuple[float, float, str, int]] = {}
+        for timing in test_result.stage_timings:
+            name = self.STAGE_SLICE_NAMES.get(timing.stage, timing.stage.value)
+            start_time, end_time, _, count = stage_slices.get(
+                name, (timing.start_time, timing.end_time, name, 0)
+            )
+            stage_slices[name] = (
+                min(start_time, timing.start_time),
+                max(end_time, timing.end_time),
+                name,
+                count + 1,
+            )
+
+        async with self.test_result_lock:
+            self.test_slices.append(
+                (
+                    min(x.start_time for x in test_result.stage_timings),
+                    max(x.end_time for x in test_result.stage_timings),
+                    test_name,
+                    list(stage_slices.values()),
+                )
+            )
+
+    async def report_test_run_result_async(self) -> None:
+        """Report the result of the overall test run. The reporter is expected
+        to aggregate the information it has received about the result from
+        each individual test case.
+        """
+
+        recorder = self.trace_recorder
+
+        async with self.test_result_lock:
+            recorder.lane_group_names[self.TESTS_LANE_GROUP] = "Tests"
+
+            # Put each test on the first lane that is free when the test starts
+            # (lane end time, lane)
+            free_lanes: list[tuple[float, int]] = []
+            num_lanes = 0
+
+            for start_time, end_time, test_name, stage_slices in sorted(
+                self.test_slices
+            ):
+                if free_lanes and free_lanes[0][0] <= start_time:
+                    _, lane = heapq.heappop(free_lanes)
+                else:
+                    lane = num_lanes
+                    num_lanes += 1
+                    recorder.lane_names[(self.TESTS_LANE_GROUP, lane)] = (
+                        "Tests {}".format(lane)
+                    )
+                heapq.heappush(free_lanes, (end_time, lane))
+
+                recorder.add_slice(
+                    name=test_name,
+                    category="test",
+                    lane_group=self.TESTS_LANE_GROUP,
+                    lane=lane,
+                    start_time=start_time,
+                    end_time=end_time,
+                )
+                for (
+                    stage_start_time,
+                    stage_end_time,
+                    stage_name,
+                    count,
+                ) in stage_slices:
+                    recorder.add_slice(
+                        name=stage_name,
+                        category="stage",
+                        lane_group=self.TESTS_LANE_GROUP,
+                        lane=lane,
+                        start_time=stage_start_time,
+                        end_time=stage_end_time,
+                        args={"test": test_name, "count": count},
+                    )
+
+            recorder.write(self.trace_path)
+
+
+if TYPE_CHECKING:
+    _: type[ITestReporter] = ChromeTraceReporter
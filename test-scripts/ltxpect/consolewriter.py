@@ -0,0 +1,75 @@
+import asyncio
+import sys
+from typing import TextIO
+
+RESET = "\033[0m"
+
+
+class ConsoleWriter:
+    """Writes (optionally colored) text to a console stream from within the
+    event loop, without blocking it.
+
+    Text is buffered, and written by a worker thread shortly after it was
+    buffered, such that text that is written in quick succession (e.g. progress
+    dots) is coalesced into a single write. ANSI color codes are only written
+    if the stream is a terminal, unless specified otherwise.
+    """
+
+    # How long to wait for more text before writing the buffered text
+    FLUSH_DELAY = 0.1
+
+    def __init__(self, stream: TextIO | None = None, use_color: bool | None = None):
+        self.stream = stream if stream is not None else sys.stdout
+
+        if use_color is None:
+            use_color = self.stream.isatty()
+        self.use_color = use_color
+
+        self._buffer: list[str] = []
+        self._write_lock = asyncio.Lock()
+        self._flush_timer: asyncio.Task[None] | None = None
+
+    def write(self, text: str, color: str | None = None) -> None:
+        """Buffer the text, to be written in the specified ANSI color."""
+
+        if not text:
+            return
+
+        if color is not None and self.use_color:
+            text = color + text + RESET
+
+        self._buffer.append(text)
+
+        if self._flush_timer is None:
+            self._flush_timer = asyncio.ensure_future(self._flush_later_async())
+
+    async def flush_async(self) -> None:
+        """Write all buffered text to the stream."""
+
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        await self._write_buffer_async()
+
+    async def _flush_later_async(self) -> None:
+        await asyncio.sleep(self.FLUSH_DELAY)
+
+        # NOTE: the timer is no longer cancelled by flush_async() from here on,
+        # such that a write to the stream is never interrupted
+        self._flush_timer = None
+        await self._write_buffer_async()
+
+    async def _write_buffer_async(self) -> None:
+        async with self._write_lock:
+            if not self._buffer:
+                return
+
+            text = "".join(self._buffer)
+            self._buffer.clear()
+
+            await asyncio.to_thread(self._write_to_stream, text)
+
+    def _write_to_stream(self, text: str) -> None:
+        self.stream.write(text)
+        self.stream.flush()
@@ -43,6 +43,91 @@ class IFileSystem(Protocol):
     def copy_file(self, oldpath: str, newpath: str) -> None: ...
 
 
+@runtime_checkable
+class IRasterizedPageCache(Protocol):
+    """Persistent cache of PNG images rasterized from PDF pages, keyed by the
+    content of the PDF, the page number and the rasterizer settings.
+    """
+
+    def get_pages_async(
+        self,
+        pdf_path: str,
+        page_nums: Sequence[int],
+        rasterizer_settings: str,
+        output_png_path_template: str,
+    ) -> Awaitable[list[int]]:
+        """Copy the cached PNG images for the specified PDF pages that exist in
+        the cache to output_png_path_template (with %d replaced by the page
+        number). Returns the numbers of the pages that were found in the cache.
+        """
+
+    def put_pages_async(
+        self,
+        pdf_path: str,
+        page_nums: Sequence[int],
+        rasterizer_settings: str,
+        png_path_template: str,
+    ) -> Awaitable[None]:
+        """Add the PNG images rasterized from the specified PDF pages (at
+        png_path_template, with %d replaced by the page number) to the cache.
+        """
+
+
+class ITestDependencyIndex(Protocol):
+    """Persistent index of the input files that each test read when it was last
+    run successfully, together with the content hashes of those files.
+    """
+
+    def has_changed_inputs(self, test_name: str) -> bool:
+        """Return whether any of the recorded input files of the specified test
+        have changed since the test last passed. Tests without a recorded entry
+        are considered to have changed.
+        """
+
+    def record_test_inputs(self, test_name: str, input_paths: Sequence[str]) -> None:
+        """Record the input files of a test that passed."""
+
+    def forget_test(self, test_name: str) -> None:
+        """Remove the recorded entry for a test (e.g. because it failed)."""
+
+    def save(self) -> None:
+        """Write the index to persistent storage."""
+
+
+class ITestDurationHistory(Protocol):
+    """Persistent record of how long each test took to run in previous test
+    runs.
+    """
+
+    def get_duration(self, test_name: str) -> float | None:
+        """Return the expected duration (in seconds) of the specified test, or
+        None if the test has not been run before.
+        """
+
+    def record_duration(self, test_name: str, duration: float) -> None:
+        """Record the duration (in seconds) of a test that was just run."""
+
+    def save(self) -> None:
+        """Write the durations to persistent storage."""
+
+
+class IWarmupCache(Protocol):
+    """Persistent record of the warmup keys for which a warmup compile has
+    already been done, such that the fonts and formats needed by tests with
+    those keys have already been generated.
+    """
+
+    def is_warm(self, warmup_key: str) -> bool:
+        """Return whether a warmup compile has already been done for the
+        specified warmup key.
+        """
+
+    def mark_warm(self, warmup_key: str) -> None:
+        """Record that a warmup compile has been done for the specified warmup
+        key.
+        """
+
+
 @runtime_checkable
 class ITestRunContext(Protocol):
     """Context object that is used by a test engine to represent a distinct
@@ -64,16 +149,29 @@ class ITestEngine(Protocol):
         before run_test_async() is invoked for each test.
         """
 
+    def get_warmup_compile_key(self, ctx: ITestRunContext, test_name: str) -> str:
+        """Return a key for the set of fonts and formats that the specified
+        test is expected to need. A warmup compile of one test warms up all
+        tests with the same key.
+        """
+
     def run_warmup_compile_for_test_async(
         self, ctx: ITestRunContext, test_name: str
-    ) -> Awaitable[None]:
-        """Run a pre-test warmup compile step."""
+    ) -> Awaitable[bool]:
+        """Run a pre-test warmup compile step. Warmup compiles for different
+        tests may run concurrently. Returns whether the compile succeeded.
+        """
 
     def run_test_async(
         self, ctx: ITestRunContext, test_name: str
     ) -> Awaitable[TestResult]:
         """Execute the specified test case."""
 
+    def finish_test_run_async(self, ctx: ITestRunContext) -> Awaitable[None]:
+        """Finish a test run. Called once at the end of the test run, after
+        run_test_async() has completed for each test.
+        """
+
 
 @runtime_checkable
 class ITestReporter(Protocol):
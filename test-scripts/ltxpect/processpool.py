@@ -0,0 +1,182 @@
+import asyncio
+import collections
+import contextlib
+import heapq
+from collections.abc import AsyncIterator, Callable
+
+from . import asyncpopen, tracing
+
+
+def read_available_memory(meminfo_path: str = "/proc/meminfo") -> int | None:
+    """Return the amount of memory (in bytes) that is available for starting
+    new processes without swapping, or None if it cannot be determined (e.g.
+    on systems other than Linux).
+    """
+    try:
+        with open(meminfo_path, "r", encoding="ascii") as fp:
+            for line in fp:
+                key, _, value = line.partition(":")
+                if key == "MemAvailable":
+                    amount, _, unit = value.strip().partition(" ")
+                    return int(amount) * (1024 if unit == "kB" else 1)
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+class MemoryAwareProcessPool:
+    """Admits jobs that run external processes based on both a number of slots
+    (i.e. a CPU budget) and a memory budget.
+
+    The memory needed by a job is estimated from the largest maximum resident
+    set size of the processes in the recent jobs for the same tool. A job is
+    admitted if there is a free slot, and its estimate fits within both the
+    memory budget (minus the estimates of the running jobs) and the memory that
+    is currently available on the system. A job is always admitted if no other
+    jobs are running, such that a job that is larger than the budget can still
+    run, by itself.
+
+    Jobs are admitted in order, except that a job that fits may go ahead of a
+    waiting job that does not, a limited number of times.
+
+    Each running job is assigned one of the slots, numbered from 0, such that
+    a trace of the test run can show the jobs that ran in each slot.
+    """
+
+    DEFAULT_RSS_ESTIMATE = 256 * 1024 * 1024
+    NUM_RSS_SAMPLES = 16
+
+    # Fraction of the available memory at startup to use as the memory budget,
+    # if no budget is specified
+    DEFAULT_MEMORY_BUDGET_FRACTION = 0.8
+
+    def __init__(
+        self,
+        num_slots: int,
+        memory_budget: int | None = None,
+        get_available_memory: Callable[[], int | None] = read_available_memory,
+    ) -> None:
+        assert num_slots >= 1
+
+        self.num_slots = num_slots
+        self._get_available_memory = get_available_memory
+
+        if memory_budget is None:
+            available_memory = get_available_memory()
+            if available_memory is not None:
+                memory_budget = int(
+                    available_memory * self.DEFAULT_MEMORY_BUDGET_FRACTION
+                )
+
+        # None if memory is not taken into account
+        self.memory_budget = memory_budget
+
+        self._rss_samples: dict[str, collections.deque[int]] = {}
+
+        self._num_running = 0
+        self._reserved_memory = 0
+        self._free_slots = list(range(num_slots))
+        self._waiters: collections.deque[tuple[int, asyncio.Future[int]]] = (
+            collections.deque()
+        )
+        self._num_bypasses = 0
+
+    def get_rss_estimate(self, tool: str) -> int:
+        """Return the estimated memory needed by a job for the specified tool."""
+        samples = self._rss_samples.get(tool)
+        if not samples:
+            return self.DEFAULT_RSS_ESTIMATE
+
+        return max(samples)
+
+    def _fits(self, estimate: int) -> bool:
+        if self._num_running >= self.num_slots:
+            return False
+
+        if self._num_running == 0 or self.memory_budget is None:
+            return True
+
+        if self._reserved_memory + estimate > self.memory_budget:
+            return False
+
+        # The memory used by other programs on the system may have grown
+        available_memory = self._get_available_memory()
+        return available_memory is None or estimate <= available_memory
+
+    def _admit_waiters(self) -> None:
+        while self._waiters:
+            # Drop waiters that have been cancelled
+            estimate, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+
+            if self._fits(estimate):
+                self._waiters.popleft()
+                self._num_bypasses = 0
+                future.set_result(self._start(estimate))
+                continue
+
+            # Let smaller jobs behind the first waiter go ahead, but not so many
+            # times that the first waiter is starved
+            if self._num_bypasses >= self.num_slots:
+                return
+
+            for waiter in list(self._waiters)[1:]:
+                estimate, future = waiter
+                if not future.done() and self._fits(estimate):
+                    self._waiters.remove(waiter)
+                    self._num_bypasses += 1
+                    future.set_result(self._start(estimate))
+                    break
+            else:
+                return
+
+    def _start(self, estimate: int) -> int:
+        self._num_running += 1
+        self._reserved_memory += estimate
+        return heapq.heappop(self._free_slots)
+
+    def _finish(self, estimate: int, slot: int) -> None:
+        self._num_running -= 1
+        self._reserved_memory -= estimate
+        heapq.heappush(self._free_slots, slot)
+        self._admit_waiters()
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, tool: str) -> AsyncIterator[int]:
+        """Wait until a job for the specified tool can be admitted, and hold
+        its slot and memory for the duration of the block. The block is given
+        the number of the slot. The resource usage of the processes run within
+        the block is used to update the memory estimate for the tool.
+        """
+        estimate = self.get_rss_estimate(tool)
+
+        if not self._waiters and self._fits(estimate):
+            slot = self._start(estimate)
+        else:
+            future: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+            self._waiters.append((estimate, future))
+            try:
+                slot = await future
+            except asyncio.CancelledError:
+                # The job may have been admitted right before being cancelled
+                if future.done() and not future.cancelled():
+                    self._finish(estimate, future.result())
+                else:
+                    self._admit_waiters()
+                raise
+
+        try:
+            with asyncpopen.record_resource_usage() as resource_usage:
+                with tracing.trace_pool_slot(slot, tool):
+                    yield slot
+        finally:
+            total = resource_usage.total
+            if total is not None and total.max_rss is not None:
+                self._rss_samples.setdefault(
+                    tool, collections.deque(maxlen=self.NUM_RSS_SAMPLES)
+                ).append(total.max_rss)
+
+            self._finish(estimate, slot)
@@ -0,0 +1,200 @@
+import asyncio
+import collections
+import contextlib
+import hashlib
+import os
+import shutil
+import threading
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+from .coreabc import IRasterizedPageCache
+
+
+class FileSystemRasterizedPageCache:
+    """Rasterized page cache that stores PNG images in a directory on disk.
+    The total size of the cached images is bounded, and when the bound is
+    exceeded, the least recently used images are evicted.
+    """
+
+    DEFAULT_MAX_SIZE_BYTES = 1024 * 1024 * 1024
+
+    def __init__(
+        self, cache_dir: str, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+
+        # Maps cache entry file name -> file size, ordered from least to most
+        # recently used. Loaded lazily from the cache directory.
+        self._entries: collections.OrderedDict[str, int] | None = None
+        self._total_size_bytes = 0
+
+        # Maps PDF path -> (mtime_ns, size, content hash)
+        self._pdf_hashes: dict[str, tuple[int, int, str]] = {}
+
+        # The cache is accessed from executor threads
+        self._lock = threading.Lock()
+
+    def _load_entries(self) -> collections.OrderedDict[str, int]:
+        if self._entries is not None:
+            return self._entries
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        entries: list[tuple[float, str, int]] = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+        entries.sort()
+
+        self._entries = collections.OrderedDict(
+            (name, size) for _mtime, name, size in entries
+        )
+        self._total_size_bytes = sum(self._entries.values())
+
+        return self._entries
+
+    def _get_pdf_hash(self, pdf_path: str) -> str:
+        stat = os.stat(pdf_path)
+
+        cached = self._pdf_hashes.get(pdf_path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        with open(pdf_path, "rb") as fp:
+            pdf_hash = hashlib.file_digest(fp, "sha256").hexdigest()
+
+        self._pdf_hashes[pdf_path] = (stat.st_mtime_ns, stat.st_size, pdf_hash)
+        return pdf_hash
+
+    def _get_entry_name(
+        self, pdf_hash: str, page_num: int, rasterizer_settings: str
+    ) -> str:
+        key = "\0".join((pdf_hash, str(page_num), rasterizer_settings))
+        return hashlib.sha256(key.encode("utf-8")).hexdigest() + ".png"
+
+    def _evict(self, entries: collections.OrderedDict[str, int]) -> None:
+        while self._total_size_bytes > self.max_size_bytes and entries:
+            name, size = entries.popitem(last=False)
+            self._total_size_bytes -= size
+
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def _get_page(self, name: str, output_png_path: str) -> bool:
+        entries = self._load_entries()
+        if name not in entries:
+            return False
+
+        entry_path = os.path.join(self.cache_dir, name)
+
+        try:
+            shutil.copyfile(entry_path, output_png_path)
+        except FileNotFoundError:
+            # Evicted behind our back (e.g. by another test run sharing the cache)
+            self._total_size_bytes -= entries.pop(name)
+            return False
+
+        # Record the access, both in memory and on disk (for future runs)
+        entries.move_to_end(name)
+        with contextlib.suppress(OSError):
+            os.utime(entry_path)
+
+        return True
+
+    def _get_pages(
+        self,
+        pdf_path: str,
+        page_nums: Sequence[int],
+        rasterizer_settings: str,
+        output_png_path_template: str,
+    ) -> list[int]:
+        pdf_hash = self._get_pdf_hash(pdf_path)
+
+        with self._lock:
+            return [
+                page_num
+                for page_num in page_nums
+                if self._get_page(
+                    self._get_entry_name(pdf_hash, page_num, rasterizer_settings),
+                    output_png_path_template.replace("%d", str(page_num)),
+                )
+            ]
+
+    def _put_pages(
+        self,
+        pdf_path: str,
+        page_nums: Sequence[int],
+        rasterizer_settings: str,
+        png_path_template: str,
+    ) -> None:
+        pdf_hash = self._get_pdf_hash(pdf_path)
+
+        with self._lock:
+            entries = self._load_entries()
+
+            for page_num in page_nums:
+                name = self._get_entry_name(pdf_hash, page_num, rasterizer_settings)
+                entry_path = os.path.join(self.cache_dir, name)
+                tmp_entry_path = "{}.{}.tmp".format(entry_path, os.getpid())
+
+                # Copy to a temporary file first, so that a concurrent reader
+                # never sees a partially written entry
+                shutil.copyfile(
+                    png_path_template.replace("%d", str(page_num)), tmp_entry_path
+                )
+                os.replace(tmp_entry_path, entry_path)
+
+                self._total_size_bytes -= entries.pop(name, 0)
+                size = os.path.getsize(entry_path)
+                entries[name] = size
+                self._total_size_bytes += size
+
+            self._evict(entries)
+
+    async def get_pages_async(
+        self,
+        pdf_path: str,
+        page_nums: Sequence[int],
+        rasterizer_settings: str,
+        output_png_path_template: str,
+    ) -> list[int]:
+        """Copy the cached PNG images for the specified PDF pages that exist in
+        the cache to output_png_path_template (with %d replaced by the page
+        number). Returns the numbers of the pages that were found in the cache.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            self._get_pages,
+            pdf_path,
+            page_nums,
+            rasterizer_settings,
+            output_png_path_template,
+        )
+
+    async def put_pages_async(
+        self,
+        pdf_path: str,
+        page_nums: Sequence[int],
+        rasterizer_settings: str,
+        png_path_template: str,
+    ) -> None:
+        """Add the PNG images rasterized from the specified PDF pages (at
+        png_path_template, with %d replaced by the page number) to the cache.
+        """
+        await asyncio.get_running_loop().run_in_executor(
+            None,
+            self._put_pages,
+            pdf_path,
+            page_nums,
+            rasterizer_settings,
+            png_path_template,
+        )
+
+
+if TYPE_CHECKING:
+    _: type[IRasterizedPageCache] = FileSystemRasterizedPageCache
@@ -6,3 +6,9 @@ class TestConfig:
     test_base_dir: str
     proto_dir: str
     num_concurrent_processes: int = 8
+    num_concurrent_builds: int = 1
+    max_pending_comparisons: int = 16
+
+    # The memory (in bytes) that the processes run by the tests may use. If
+    # None, a budget is derived from the available memory on the system.
+    process_memory_budget: int | None = None
@@ -0,0 +1,147 @@
+import contextlib
+import hashlib
+import json
+import os
+from collections.abc import Sequence
+from typing import Any, TYPE_CHECKING
+
+from .coreabc import ITestDependencyIndex
+
+
+def read_latex_recorder_files(fls_path: str) -> tuple[list[str], list[str]]:
+    """Read the input and output files from a recorder (.fls) file written by a
+    LaTeX run with the -recorder option, in the order in which they were first
+    recorded. Relative paths are resolved against the working directory of the
+    run.
+    """
+    cwd = os.path.dirname(os.path.abspath(fls_path))
+    inputs: list[str] = []
+    outputs: list[str] = []
+
+    with open(fls_path, "r", encoding="utf-8", errors="replace") as fp:
+        for line in fp:
+            kind, _, path = line.rstrip("\r\n").partition(" ")
+            if kind == "PWD":
+                cwd = path
+            elif kind in ("INPUT", "OUTPUT") and path:
+                path = os.path.normpath(os.path.join(cwd, path))
+                if kind == "INPUT":
+                    inputs.append(path)
+                else:
+                    outputs.append(path)
+
+    return list(dict.fromkeys(inputs)), list(dict.fromkeys(outputs))
+
+
+def read_latex_recorder_inputs(fls_path: str) -> list[str]:
+    """Read the input files from a recorder (.fls) file written by a LaTeX run
+    with the -recorder option. Files that were also written by the LaTeX run
+    (e.g. .aux and .toc files) are left out, and relative paths are resolved
+    against the working directory of the run.
+    """
+    inputs, outputs = read_latex_recorder_files(fls_path)
+    written = set(outputs)
+    return [x for x in inputs if x not in written]
+
+
+class FileSystemTestDependencyIndex:
+    """Test dependency index that is stored as a JSON file on disk."""
+
+    INDEX_VERSION = 1
+
+    def __init__(self, index_path: str) -> None:
+        self.index_path = index_path
+
+        # Maps test name -> (input path -> content hash). Loaded lazily.
+        self._tests: dict[str, dict[str, str]] | None = None
+
+        # Maps input path -> (mtime_ns, size, content hash)
+        self._file_hashes: dict[str, tuple[int, int, str]] = {}
+
+    def _load_tests(self) -> dict[str, dict[str, str]]:
+        if self._tests is not None:
+            return self._tests
+
+        self._tests = {}
+
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as fp:
+                data: dict[str, Any] = json.load(fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return self._tests
+
+        if data.get("version") == self.INDEX_VERSION:
+            self._tests = data["tests"]
+
+        return self._tests
+
+    def _get_file_hash(self, path: str) -> str | None:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        cached = self._file_hashes.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        with open(path, "rb") as fp:
+            file_hash = hashlib.file_digest(fp, "sha256").hexdigest()
+
+        self._file_hashes[path] = (stat.st_mtime_ns, stat.st_size, file_hash)
+        return file_hash
+
+    def has_changed_inputs(self, test_name: str) -> bool:
+        """Return whether any of the recorded input files of the specified test
+        have changed since the test last passed. Tests without a recorded entry
+        are considered to have changed.
+        """
+        inputs = self._load_tests().get(test_name)
+        if inputs is None:
+            return True
+
+        return any(
+            self._get_file_hash(path) != file_hash for path, file_hash in inputs.items()
+        )
+
+    def record_test_inputs(self, test_name: str, input_paths: Sequence[str]) -> None:
+        """Record the input files of a test that passed."""
+        inputs: dict[str, str] = {}
+        for path in input_paths:
+            file_hash = self._get_file_hash(path)
+            if file_hash is not None:
+                inputs[path] = file_hash
+
+        self._load_tests()[test_name] = inputs
+
+    def forget_test(self, test_name: str) -> None:
+        """Remove the recorded entry for a test (e.g. because it failed)."""
+        self._load_tests().pop(test_name, None)
+
+    def save(self) -> None:
+        """Write the index to persistent storage."""
+        if self._tests is None:
+            return
+
+        index_dir = os.path.dirname(self.index_path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+
+        tmp_index_path = "{}.{}.tmp".format(self.index_path, os.getpid())
+
+        try:
+            with open(tmp_index_path, "w", encoding="utf-8") as fp:
+                json.dump(
+                    {"version": self.INDEX_VERSION, "tests": self._tests},
+                    fp,
+                    indent=1,
+                    sort_keys=True,
+                )
+            os.replace(tmp_index_path, self.index_path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_index_path)
+
+
+if TYPE_CHECKING:
+    _: type[ITestDependencyIndex] = FileSystemTestDependencyIndex
@@ -0,0 +1,88 @@
+import contextlib
+import json
+import os
+from typing import Any, TYPE_CHECKING
+
+from .coreabc import ITestDurationHistory
+
+
+class FileSystemTestDurationHistory:
+    """Test duration history that is stored as a JSON file on disk. The
+    expected duration of each test is an exponentially weighted moving average
+    of its durations in previous test runs.
+    """
+
+    HISTORY_VERSION = 1
+
+    # Weight of the most recent duration in the moving average
+    SMOOTHING_FACTOR = 0.5
+
+    def __init__(self, history_path: str) -> None:
+        self.history_path = history_path
+
+        # Maps test name -> expected duration. Loaded lazily.
+        self._durations: dict[str, float] | None = None
+
+    def _load_durations(self) -> dict[str, float]:
+        if self._durations is not None:
+            return self._durations
+
+        self._durations = {}
+
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as fp:
+                data: dict[str, Any] = json.load(fp)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return self._durations
+
+        if data.get("version") == self.HISTORY_VERSION:
+            self._durations = data["durations"]
+
+        return self._durations
+
+    def get_duration(self, test_name: str) -> float | None:
+        """Return the expected duration (in seconds) of the specified test, or
+        None if the test has not been run before.
+        """
+        return self._load_durations().get(test_name)
+
+    def record_duration(self, test_name: str, duration: float) -> None:
+        """Record the duration (in seconds) of a test that was just run."""
+        durations = self._load_durations()
+
+        previous_duration = durations.get(test_name)
+        if previous_duration is not None:
+            duration = (
+                self.SMOOTHING_FACTOR * duration
+                + (1 - self.SMOOTHING_FACTOR) * previous_duration
+            )
+
+        durations[test_name] = duration
+
+    def save(self) -> None:
+        """Write the durations to persistent storage."""
+        if self._durations is None:
+            return
+
+        history_dir = os.path.dirname(self.history_path)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+
+        tmp_history_path = "{}.{}.tmp".format(self.history_path, os.getpid())
+
+        try:
+            with open(tmp_history_path, "w", encoding="utf-8") as fp:
+                json.dump(
+                    {"version": self.HISTORY_VERSION, "durations": self._durations},
+                    fp,
+                    indent=1,
+                    sort_keys=True,
+                )
+            os.replace(tmp_history_path, self.history_path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_history_path)
+
+
+if TYPE_CHECKING:
+    _: type[ITestDurationHistory] = FileSystemTestDurationHistory
@@ -1,11 +1,16 @@
 import asyncio
+import contextlib
+import dataclasses
 import os
 import re
 import sys
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
 from types import TracebackType
 from typing import cast, Sequence, Type, TYPE_CHECKING
 
-from . import asyncpopen
+from . import asyncpopen, tracing
 from .buildtools.abc import (
     ILatexDocumentBuildTool,
     IPdfDocInfo,
@@ -14,9 +19,22 @@ from .buildtools.abc import (
     IPngImageComparer,
     IPngImageDimensionsInspector,
 )
-from .coreabc import IFileSystem, IPathUtil, ITestEngine, ITestRunContext
+from .buildtools.nativepdf import (
+    find_pages_with_equal_fingerprints,
+    pdf_files_are_equal_after_normalization,
+)
+from .coreabc import (
+    IFileSystem,
+    IPathUtil,
+    IRasterizedPageCache,
+    ITestDependencyIndex,
+    ITestEngine,
+    ITestRunContext,
+)
+from .processpool import MemoryAwareProcessPool
 from .testconfig import TestConfig
-from .testresult import TestResult
+from .testdependencyindex import read_latex_recorder_inputs
+from .testresult import TestResult, TestStage, TestStageTiming
 
 
 class TestEngineContext:
@@ -29,6 +47,7 @@ class TestEngineContext:
         pdf_page_rasterizer: IPdfPageRasterizer,
         png_dimensions_inspector: IPngImageDimensionsInspector,
         png_comparer: IPngImageComparer,
+        rasterized_page_cache: IRasterizedPageCache | None = None,
     ) -> None:
         self.config = config
         self.path_util = path_util
@@ -37,6 +56,7 @@ class TestEngineContext:
         self.pdf_page_rasterizer = pdf_page_rasterizer
         self.png_dimensions_inspector = png_dimensions_inspector
         self.png_comparer = png_comparer
+        self.rasterized_page_cache = rasterized_page_cache
 
         test_base_dir = path_util.path_relpath(fs.resolve_path(config.test_base_dir))
         assert fs.is_directory(test_base_dir)
@@ -49,92 +69,215 @@ class TestEngineContext:
         self.TMPDIR = path_util.path_join(test_base_dir, "tmp")
         self.DIFFDIR = path_util.path_join(test_base_dir, "diffs")
 
-        self.make_task_semaphore = asyncio.BoundedSemaphore(1)
-        self.process_pool_semaphore = asyncio.BoundedSemaphore(
-            config.num_concurrent_processes
+        self.make_task_semaphore = asyncio.BoundedSemaphore(
+            config.num_concurrent_builds
+        )
+        self.process_pool = MemoryAwareProcessPool(
+            config.num_concurrent_processes, config.process_memory_budget
+        )
+
+        # Built test PDFs that are waiting to be compared. The queue is bounded,
+        # such that builds wait for the comparison workers to catch up.
+        self.comparison_queue: asyncio.Queue[ComparisonJob] = asyncio.Queue(
+            maxsize=config.max_pending_comparisons
         )
+        self.comparison_workers: list[asyncio.Task[None]] = []
 
         self.latex_build_timeout = 3 * 60
 
+    def ensure_comparison_workers_started(self) -> None:
+        if self.comparison_workers:
+            return
+
+        # NOTE: each comparison also acquires the process pool for any
+        # processes it spawns, so there is no point in having more workers
+        # than process pool slots
+        self.comparison_workers = [
+            asyncio.ensure_future(comparison_worker_async(self))
+            for _ in range(self.config.num_concurrent_processes)
+        ]
+
+    async def stop_comparison_workers_async(self) -> None:
+        workers = self.comparison_workers
+        self.comparison_workers = []
+
+        for worker in workers:
+            worker.cancel()
+
+        if workers:
+            await asyncio.wait(workers)
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class PdfPairComparisonResult:
+    failed_pages: tuple[int, ...]
+
+    # Resource usage of the processes run to rasterize and compare the pages,
+    # or None if no pages needed to be rasterized and compared
+    rasterize_resource_usage: asyncpopen.AsyncPopenResourceUsage | None = None
+    compare_resource_usage: asyncpopen.AsyncPopenResourceUsage | None = None
+
+    stage_timings: tuple[TestStageTiming, ...] = ()
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class ComparisonJob:
+    test_name: str
+    test_pdf_path: str
+    proto_pdf_path: str
+    result_future: asyncio.Future[PdfPairComparisonResult]
+
+    # When the job was queued, as returned by time.monotonic()
+    queued_time: float
+
+
+@contextlib.contextmanager
+def record_stage_timing(
+    stage_timings: list[TestStageTiming],
+    stage: TestStage,
+    num_pages: int | None = None,
+) -> Iterator[None]:
+    """Append the timing of the stage that runs within the block to the
+    specified list, also if the stage fails.
+    """
+    start_time = time.monotonic()
+    try:
+        yield
+    finally:
+        stage_timings.append(
+            TestStageTiming(
+                stage=stage,
+                start_time=start_time,
+                end_time=time.monotonic(),
+                num_pages=num_pages,
+            )
+        )
+
 
 async def test_pdf_page_pair_async(
     ctx: TestEngineContext,
-    test_pdf_info: IPdfDocInfo,
-    proto_pdf_info: IPdfDocInfo,
     page_num: int,
-    test_name: str,
+    test_png_page_path: str,
+    proto_png_page_path: str,
+    diff_path: str,
+    stage_timings: list[TestStageTiming],
 ) -> tuple[int, bool]:
-    assert page_num >= 1
-    assert page_num <= test_pdf_info.num_physical_pages
-    assert page_num <= proto_pdf_info.num_physical_pages
-
-    path_util = ctx.path_util
     fs = ctx.fs
-    pdf_page_rasterizer = ctx.pdf_page_rasterizer
     png_dimensions_inspector = ctx.png_dimensions_inspector
     png_comparer = ctx.png_comparer
 
-    png_relpath = "{}_{}.png".format(test_name, page_num)
-    test_png_page_path = path_util.path_join(ctx.TMPDIR, "tests", png_relpath)
-    proto_png_page_path = path_util.path_join(ctx.TMPDIR, "proto", png_relpath)
-    diff_path = path_util.path_join(ctx.DIFFDIR, png_relpath)
-
-    fs.mkdirp(os.path.dirname(test_png_page_path))
-    fs.mkdirp(os.path.dirname(proto_png_page_path))
     fs.mkdirp(os.path.dirname(diff_path))
 
-    # Start processes for generating PNGs
-    async with ctx.process_pool_semaphore:
-        test_pdf_future = asyncio.ensure_future(
-            pdf_page_rasterizer.convert_pdf_page_to_png_async(
-                test_pdf_info.path, page_num, test_png_page_path
+    async with ctx.process_pool.acquire("compare"):
+        # FIXME: should probably have chained each png task to each png size task, but getting the image sizes should be quick...
+        with record_stage_timing(stage_timings, TestStage.DIMENSIONS, num_pages=1):
+            test_png_dim = (
+                await png_dimensions_inspector.get_png_image_dimensions_async(
+                    test_png_page_path
+                )
             )
-        )
-        proto_pdf_future = asyncio.ensure_future(
-            pdf_page_rasterizer.convert_pdf_page_to_png_async(
-                proto_pdf_info.path, page_num, proto_png_page_path
+            proto_png_dim = (
+                await png_dimensions_inspector.get_png_image_dimensions_async(
+                    proto_png_page_path
+                )
             )
-        )
 
-        done_futures, pending_futures = await asyncio.wait(
-            [test_pdf_future, proto_pdf_future]
-        )
-        assert len(pending_futures) == 0
+        if test_png_dim != proto_png_dim:
+            return page_num, False
 
-        gen_test_png_future, gen_proto_png_future = done_futures
+        with record_stage_timing(stage_timings, TestStage.COMPARE, num_pages=1):
+            pngs_are_equal = await png_comparer.compare_png_images_async(
+                test_png_page_path, proto_png_page_path, diff_path
+            )
 
-        try:
-            await gen_test_png_future
-            await gen_proto_png_future
-        except:
-            # Observe all exceptions to suppress "Task exception was never retrieved" error
-            # (we are only interested in the first exception)
-            _ = [x.exception() for x in done_futures]
+        if pngs_are_equal:
+            fs.remove_file(test_png_page_path)
+            fs.remove_file(proto_png_page_path)
+            fs.force_remove_file(diff_path)
 
-            # Re-raise just the first exception
-            raise
+    return (page_num, pngs_are_equal)
 
-        # FIXME: should probably have chained each png task to each png size task, but getting the image sizes should be quick...
-        test_png_dim = await png_dimensions_inspector.get_png_image_dimensions_async(
-            test_png_page_path
-        )
-        proto_png_dim = await png_dimensions_inspector.get_png_image_dimensions_async(
-            proto_png_page_path
+
+async def rasterize_pdf_pair_pages_async(
+    ctx: TestEngineContext,
+    test_pdf_info: IPdfDocInfo,
+    proto_pdf_info: IPdfDocInfo,
+    page_nums: Sequence[int],
+    test_png_path_template: str,
+    proto_png_path_template: str,
+) -> None:
+    for page_num in page_nums:
+        assert page_num >= 1
+        assert page_num <= test_pdf_info.num_physical_pages
+        assert page_num <= proto_pdf_info.num_physical_pages
+
+    fs = ctx.fs
+    pdf_page_rasterizer = ctx.pdf_page_rasterizer
+    rasterized_page_cache = ctx.rasterized_page_cache
+
+    fs.mkdirp(os.path.dirname(test_png_path_template))
+    fs.mkdirp(os.path.dirname(proto_png_path_template))
+
+    # Prototype PDFs rarely change, so their rasterized pages can be reused
+    # across test runs
+    proto_page_nums = list(page_nums)
+    if rasterized_page_cache is not None:
+        rasterizer_settings = pdf_page_rasterizer.rasterizer_settings
+        cached_page_nums = await rasterized_page_cache.get_pages_async(
+            proto_pdf_info.path,
+            page_nums,
+            rasterizer_settings,
+            proto_png_path_template,
         )
+        proto_page_nums = [x for x in page_nums if x not in cached_page_nums]
 
-        if test_png_dim != proto_png_dim:
-            return page_num, False
+    async def convert_pdf_pages_to_png_async(
+        pdf_path: str, page_nums: Sequence[int], png_path_template: str
+    ) -> None:
+        async with ctx.process_pool.acquire("rasterize"):
+            await pdf_page_rasterizer.convert_pdf_pages_to_png_async(
+                pdf_path, page_nums, png_path_template
+            )
 
-        pngs_are_equal = await png_comparer.compare_png_images_async(
-            test_png_page_path, proto_png_page_path, diff_path
+    # Start processes for generating PNGs (one process for all pages of each
+    # PDF, each holding its own slot in the process pool)
+    rasterize_futures = [
+        asyncio.ensure_future(
+            convert_pdf_pages_to_png_async(
+                test_pdf_info.path, page_nums, test_png_path_template
+            )
+        )
+    ]
+    if proto_page_nums:
+        rasterize_futures.append(
+            asyncio.ensure_future(
+                convert_pdf_pages_to_png_async(
+                    proto_pdf_info.path, proto_page_nums, proto_png_path_template
+                )
+            )
         )
 
-        if pngs_are_equal:
-            fs.remove_file(test_png_page_path)
-            fs.remove_file(proto_png_page_path)
-            fs.remove_file(diff_path)
+    done_futures, pending_futures = await asyncio.wait(rasterize_futures)
+    assert len(pending_futures) == 0
 
-    return (page_num, pngs_are_equal)
+    try:
+        for future in done_futures:
+            await future
+    except:
+        # Observe all exceptions to suppress "Task exception was never retrieved" error
+        # (we are only interested in the first exception)
+        _ = [x.exception() for x in done_futures]
+
+        # Re-raise just the first exception
+        raise
+
+    if rasterized_page_cache is not None and proto_page_nums:
+        await rasterized_page_cache.put_pages_async(
+            proto_pdf_info.path,
+            proto_page_nums,
+            rasterizer_settings,
+            proto_png_path_template,
+        )
 
 
 # Use file name of PDF to determine which pages we want to test
@@ -178,14 +321,28 @@ def determine_list_of_pages_to_test(pdf_info: IPdfDocInfo) -> tuple[int, ...]:
 
 async def test_pdf_pair_async(
     ctx: TestEngineContext, test_name: str, test_pdf_path: str, proto_pdf_path: str
-) -> tuple[str, tuple[int, ...]]:
-    async with ctx.process_pool_semaphore:
-        test_pdf_info = await ctx.pdf_doc_info_provider.get_pdf_info_async(
-            test_pdf_path
-        )
-        proto_pdf_info = await ctx.pdf_doc_info_provider.get_pdf_info_async(
-            proto_pdf_path
-        )
+) -> PdfPairComparisonResult:
+    # If the PDFs only differ in metadata such as timestamps, they render
+    # identically, and there is no need to rasterize and compare any pages
+    loop = asyncio.get_running_loop()
+
+    # NOTE: the PDFs are read and normalized in an executor, so as not to
+    # block the event loop on large PDFs
+    if await loop.run_in_executor(
+        None, pdf_files_are_equal_after_normalization, test_pdf_path, proto_pdf_path
+    ):
+        return PdfPairComparisonResult(failed_pages=())
+
+    stage_timings: list[TestStageTiming] = []
+
+    async with ctx.process_pool.acquire("pdfinfo"):
+        with record_stage_timing(stage_timings, TestStage.PDFINFO):
+            test_pdf_info = await ctx.pdf_doc_info_provider.get_pdf_info_async(
+                test_pdf_path
+            )
+            proto_pdf_info = await ctx.pdf_doc_info_provider.get_pdf_info_async(
+                proto_pdf_path
+            )
 
     test_page_list = determine_list_of_pages_to_test(test_pdf_info)
     proto_page_list = determine_list_of_pages_to_test(proto_pdf_info)
@@ -193,19 +350,70 @@ async def test_pdf_pair_async(
     page_list = set(test_page_list + proto_page_list)
 
     failed_pages: list[int] = []
+    pages_to_compare: list[int] = []
 
-    test_futures: list[asyncio.Future[tuple[int, bool]]] = []
-    for page_num in page_list:
+    for page_num in sorted(page_list):
         if page_num not in test_page_list or page_num not in proto_page_list:
             failed_pages.append(page_num)
             continue
 
-        test_pdf_pair_future = asyncio.ensure_future(
-            test_pdf_page_pair_async(
-                ctx, test_pdf_info, proto_pdf_info, page_num, test_name
-            )
+        pages_to_compare.append(page_num)
+
+    # Pages with unchanged content (and resources) render identically, so only
+    # the pages that have changed need to be rasterized and compared
+    unchanged_pages = await loop.run_in_executor(
+        None,
+        find_pages_with_equal_fingerprints,
+        test_pdf_path,
+        proto_pdf_path,
+        pages_to_compare,
+    )
+    pages_to_compare = [x for x in pages_to_compare if x not in unchanged_pages]
+
+    if not pages_to_compare:
+        failed_pages.sort()
+        return PdfPairComparisonResult(
+            failed_pages=tuple(failed_pages), stage_timings=tuple(stage_timings)
         )
-        test_futures.append(test_pdf_pair_future)
+
+    png_relpath_template = "{}_%d.png".format(test_name)
+    test_png_path_template = ctx.path_util.path_join(
+        ctx.TMPDIR, "tests", png_relpath_template
+    )
+    proto_png_path_template = ctx.path_util.path_join(
+        ctx.TMPDIR, "proto", png_relpath_template
+    )
+    diff_path_template = ctx.path_util.path_join(ctx.DIFFDIR, png_relpath_template)
+
+    with asyncpopen.record_resource_usage() as rasterize_resource_usage:
+        with record_stage_timing(
+            stage_timings, TestStage.RASTERIZE, num_pages=len(pages_to_compare)
+        ):
+            await rasterize_pdf_pair_pages_async(
+                ctx,
+                test_pdf_info,
+                proto_pdf_info,
+                pages_to_compare,
+                test_png_path_template,
+                proto_png_path_template,
+            )
+
+    # NOTE: the futures must be created within the block, for their processes
+    # to be recorded
+    with asyncpopen.record_resource_usage() as compare_resource_usage:
+        test_futures: list[asyncio.Future[tuple[int, bool]]] = []
+        for page_num in pages_to_compare:
+            test_pdf_pair_future = asyncio.ensure_future(
+                test_pdf_page_pair_async(
+                    ctx,
+                    page_num,
+                    test_png_path_template.replace("%d", str(page_num)),
+                    proto_png_path_template.replace("%d", str(page_num)),
+                    diff_path_template.replace("%d", str(page_num)),
+                    stage_timings,
+                )
+            )
+            test_futures.append(test_pdf_pair_future)
 
     done_futures, pending_futures = await asyncio.wait(test_futures)
     assert len(pending_futures) == 0
@@ -226,8 +434,54 @@ async def test_pdf_pair_async(
 
     failed_pages.sort()
 
-    # Result is on the form (testname, list of failed pages)
-    return (test_name, tuple(failed_pages))
+    return PdfPairComparisonResult(
+        failed_pages=tuple(failed_pages),
+        rasterize_resource_usage=rasterize_resource_usage.total,
+        compare_resource_usage=compare_resource_usage.total,
+        stage_timings=tuple(stage_timings),
+    )
+
+
+_PACKAGE_LOAD_PATTERN = re.compile(
+    rb"\\(documentclass|usepackage|RequirePackage)\s*(\[[^\]]*\])?\s*(\{[^}]*\})"
+)
+
+
+async def comparison_worker_async(ctx: TestEngineContext) -> None:
+    while True:
+        job = await ctx.comparison_queue.get()
+
+        try:
+            if job.result_future.cancelled():
+                continue
+
+            queue_timing = TestStageTiming(
+                stage=TestStage.COMPARISON_QUEUE,
+                start_time=job.queued_time,
+                end_time=time.monotonic(),
+            )
+
+            with tracing.trace_test(job.test_name):
+                result = await test_pdf_pair_async(
+                    ctx,
+                    job.test_name,
+                    test_pdf_path=job.test_pdf_path,
+                    proto_pdf_path=job.proto_pdf_path,
+                )
+            result = dataclasses.replace(
+                result, stage_timings=(queue_timing,) + result.stage_timings
+            )
+        except asyncio.CancelledError:
+            job.result_future.cancel()
+            raise
+        except BaseException as e:
+            if not job.result_future.cancelled():
+                job.result_future.set_exception(e)
+        else:
+            if not job.result_future.cancelled():
+                job.result_future.set_result(result)
+        finally:
+            ctx.comparison_queue.task_done()
 
 
 class TestEngine:
@@ -241,6 +495,8 @@ class TestEngine:
         pdf_page_rasterizer: IPdfPageRasterizer,
         png_dimensions_inspector: IPngImageDimensionsInspector,
         png_comparer: IPngImageComparer,
+        rasterized_page_cache: IRasterizedPageCache | None = None,
+        test_dependency_index: ITestDependencyIndex | None = None,
     ) -> None:
         self.config = config
         self.path_util = path_util
@@ -250,6 +506,8 @@ class TestEngine:
         self.pdf_page_rasterizer = pdf_page_rasterizer
         self.png_dimensions_inspector = png_dimensions_inspector
         self.png_comparer = png_comparer
+        self.rasterized_page_cache = rasterized_page_cache
+        self.test_dependency_index = test_dependency_index
 
     def create_test_run_context(self) -> ITestRunContext:
         """Create a test run context for a new test run."""
@@ -261,6 +519,7 @@ class TestEngine:
             self.pdf_page_rasterizer,
             self.png_dimensions_inspector,
             self.png_comparer,
+            self.rasterized_page_cache,
         )
 
     async def prepare_test_run_async(
@@ -270,10 +529,52 @@ class TestEngine:
         before run_test_async() is invoked for each test.
         """
 
+    async def finish_test_run_async(self, ctx: ITestRunContext) -> None:
+        """Finish a test run. Called once at the end of the test run, after
+        run_test_async() has completed for each test.
+        """
+
+        assert isinstance(ctx, TestEngineContext)
+
+        await ctx.stop_comparison_workers_async()
+
+        if self.test_dependency_index is not None:
+            self.test_dependency_index.save()
+
+    def get_warmup_compile_key(self, ctx: ITestRunContext, test_name: str) -> str:
+        """Return a key for the set of fonts and formats that the specified
+        test is expected to need. A warmup compile of one test warms up all
+        tests with the same key.
+        """
+
+        assert isinstance(ctx, TestEngineContext)
+
+        texfile_path = self.path_util.path_join(
+            ctx.TESTSDIR, "{}.tex".format(test_name)
+        )
+        with open(texfile_path, "rb") as fp:
+            content = fp.read()
+
+        # Only consider the preamble, without comments
+        preamble = content.split(b"\\begin{document}", 1)[0]
+        preamble = re.sub(rb"(?<!\\)%[^\n]*", b"", preamble)
+
+        # The document class, the loaded packages and their options determine
+        # which fonts and formats are needed
+        package_loads = {
+            b"".join(re.sub(rb"\s+", b"", x) for x in m.groups(b""))
+            for m in _PACKAGE_LOAD_PATTERN.finditer(preamble)
+        }
+
+        return b"\n".join(sorted(package_loads)).decode("utf-8", errors="replace")
+
     async def run_warmup_compile_for_test_async(
         self, ctx: ITestRunContext, test_name: str
-    ) -> None:
-        """Run a pre-test warmup compile step."""
+    ) -> bool:
+        """Run a pre-test warmup compile step. Warmup compiles for different
+        tests may run concurrently, bounded by the process pool. Returns whether
+        the compile succeeded.
+        """
 
         assert isinstance(ctx, TestEngineContext)
 
@@ -315,23 +616,36 @@ class TestEngine:
         latex_build_dir_relative_to_base_dir = self.path_util.path_relpath(
             latex_build_dir, ctx.TEST_BASE_DIR
         )
-        for _ in range(2):
-            try:
-                _ = await self.latex_doc_buildtool.build_latex_document_async(
-                    base_dir=ctx.TEST_BASE_DIR,
-                    texfile_parent_dir_subpath=texfile_parent_dir_relative_to_base_dir,
-                    texfile_filename=texfile_filename,
-                    latex_build_dir_subpath=latex_build_dir_relative_to_base_dir,
-                    latex_jobname=latex_jobname,
-                    timeout=ctx.latex_build_timeout,
-                )
-            except asyncio.CancelledError:
-                raise
-            except:
-                pass
+
+        succeeded = False
+
+        with tracing.trace_test(test_name):
+            async with ctx.process_pool.acquire("latex"):
+                # The first compile may fail while fonts and formats are being
+                # generated, in which case a second compile is attempted
+                for _ in range(2):
+                    try:
+                        build_result = await self.latex_doc_buildtool.build_latex_document_async(
+                            base_dir=ctx.TEST_BASE_DIR,
+                            texfile_parent_dir_subpath=texfile_parent_dir_relative_to_base_dir,
+                            texfile_filename=texfile_filename,
+                            latex_build_dir_subpath=latex_build_dir_relative_to_base_dir,
+                            latex_jobname=latex_jobname,
+                            timeout=ctx.latex_build_timeout,
+                        )
+                    except asyncio.CancelledError:
+                        raise
+                    except:
+                        pass
+                    else:
+                        succeeded = build_result.returncode == 0
+                        if succeeded:
+                            break
 
         self.fs.force_remove_tree(latex_build_dir)
 
+        return succeeded
+
     async def run_test_async(self, ctx: ITestRunContext, test_name: str) -> TestResult:
         """Execute the specified test case."""
 
@@ -346,6 +660,10 @@ class TestEngine:
 
         assert self.fs.is_file(proto_pdf_path)
 
+        # The test is recorded in the dependency index again if it passes
+        if self.test_dependency_index is not None:
+            self.test_dependency_index.forget_test(test_name)
+
         latex_jobname = "output"
 
         # Path to tex file, relative to ctx.TESTSDIR
@@ -378,6 +696,9 @@ class TestEngine:
             ctx.BUILDDIR, texfile_parent_dir_relpath, texfile_basename_subst
         )
 
+        stage_timings: list[TestStageTiming] = []
+        queued_time = time.monotonic()
+
         async with ctx.make_task_semaphore:
             self.fs.force_remove_tree(latex_out_dir)
 
@@ -395,16 +716,26 @@ class TestEngine:
             )
 
             try:
-                returncode, stdout, stderr = (
-                    await self.latex_doc_buildtool.build_latex_document_async(
-                        base_dir=ctx.TEST_BASE_DIR,
-                        texfile_parent_dir_subpath=texfile_parent_dir_relative_to_base_dir,
-                        texfile_filename=texfile_filename,
-                        latex_build_dir_subpath=latex_build_dir_relative_to_base_dir,
-                        latex_jobname=latex_jobname,
-                        timeout=ctx.latex_build_timeout,
-                    )
-                )
+                with asyncpopen.record_resource_usage() as build_resource_usage:
+                    with tracing.trace_test(test_name):
+                        async with ctx.process_pool.acquire("latex"):
+                            stage_timings.append(
+                                TestStageTiming(
+                                    stage=TestStage.BUILD_QUEUE,
+                                    start_time=queued_time,
+                                    end_time=time.monotonic(),
+                                )
+                            )
+
+                            with record_stage_timing(stage_timings, TestStage.BUILD):
+                                build_result = await self.latex_doc_buildtool.build_latex_document_async(
+                                    base_dir=ctx.TEST_BASE_DIR,
+                                    texfile_parent_dir_subpath=texfile_parent_dir_relative_to_base_dir,
+                                    texfile_filename=texfile_filename,
+                                    latex_build_dir_subpath=latex_build_dir_relative_to_base_dir,
+                                    latex_jobname=latex_jobname,
+                                    timeout=ctx.latex_build_timeout,
+                                )
             except asyncio.CancelledError:
                 raise
             except asyncpopen.AsyncPopenTimeoutError as err:
@@ -412,9 +743,16 @@ class TestEngine:
                     test_name,
                     False,
                     build_timed_out=True,
+                    build_resource_usage=build_resource_usage.total,
+                    build_termination_stage=(
+                        err.termination_stage.value
+                        if err.termination_stage is not None
+                        else None
+                    ),
                     build_returncode=err.returncode,
                     build_stdout=err.stdout,
                     build_stderr=err.stderr,
+                    stage_timings=tuple(stage_timings),
                 )
             except:
                 exc_info = cast(
@@ -422,45 +760,102 @@ class TestEngine:
                     sys.exc_info(),
                 )
 
-                return TestResult(test_name, False, exc_info=exc_info)
+                return TestResult(
+                    test_name,
+                    False,
+                    exc_info=exc_info,
+                    stage_timings=tuple(stage_timings),
+                )
             finally:
                 self.fs.move_directory(latex_build_dir, latex_out_dir)
 
-            if returncode != 0:
+            if build_result.returncode != 0:
                 return TestResult(
                     test_name,
                     False,
-                    build_returncode=returncode,
-                    build_stdout=stdout,
-                    build_stderr=stderr,
+                    build_returncode=build_result.returncode,
+                    build_stdout=build_result.stdout,
+                    build_stderr=build_result.stderr,
+                    build_num_passes=build_result.num_passes,
+                    build_resource_usage=build_resource_usage.total,
+                    stage_timings=tuple(stage_timings),
                 )
 
             latex_build_outdir_pdf_path = self.path_util.path_join(
                 latex_out_dir, "{}.pdf".format(latex_jobname)
             )
 
+            # Collect the files that were read by the build, from the recorder
+            # file written by LaTeX
+            test_input_paths: list[str] | None = None
+            if self.test_dependency_index is not None:
+                fls_path = self.path_util.path_join(
+                    latex_out_dir, "{}.fls".format(latex_jobname)
+                )
+                if self.fs.is_file(fls_path):
+                    test_input_paths = read_latex_recorder_inputs(fls_path)
+                    test_input_paths.append(os.path.abspath(proto_pdf_path))
+
             # If we got here, then build was successful. Move PDF into pdf directory, and remove latex output directory.
             self.fs.move_file(latex_build_outdir_pdf_path, test_pdf_path)
             self.fs.force_remove_tree(latex_out_dir)
 
-        try:
-            _, failed_pages = await test_pdf_pair_async(
-                ctx,
-                test_name,
-                test_pdf_path=test_pdf_path,
-                proto_pdf_path=proto_pdf_path,
+            # Hand the PDF over to the comparison workers. Note that this is done
+            # while still holding the build slot, so that builds are held back
+            # when the comparison queue is full.
+            ctx.ensure_comparison_workers_started()
+
+            comparison_future: asyncio.Future[PdfPairComparisonResult] = (
+                asyncio.get_running_loop().create_future()
+            )
+            await ctx.comparison_queue.put(
+                ComparisonJob(
+                    test_name=test_name,
+                    test_pdf_path=test_pdf_path,
+                    proto_pdf_path=proto_pdf_path,
+                    result_future=comparison_future,
+                    queued_time=time.monotonic(),
+                )
             )
+
+        try:
+            comparison_result = await comparison_future
+        except asyncio.CancelledError:
+            comparison_future.cancel()
+            raise
         except:
             exc_info = cast(
                 tuple[Type[BaseException], BaseException, TracebackType], sys.exc_info()
             )
 
-            return TestResult(test_name, True, exc_info=exc_info)
+            return TestResult(
+                test_name,
+                True,
+                exc_info=exc_info,
+                build_num_passes=build_result.num_passes,
+                build_resource_usage=build_resource_usage.total,
+                stage_timings=tuple(stage_timings),
+            )
 
+        failed_pages = comparison_result.failed_pages
         if not failed_pages:
             self.fs.remove_file(test_pdf_path)
 
-        return TestResult(test_name, True, failed_pages=failed_pages)
+            if self.test_dependency_index is not None and test_input_paths is not None:
+                self.test_dependency_index.record_test_inputs(
+                    test_name, test_input_paths
+                )
+
+        return TestResult(
+            test_name,
+            True,
+            failed_pages=failed_pages,
+            build_num_passes=build_result.num_passes,
+            build_resource_usage=build_resource_usage.total,
+            rasterize_resource_usage=comparison_result.rasterize_resource_usage,
+            compare_resource_usage=comparison_result.compare_resource_usage,
+            stage_timings=tuple(stage_timings) + comparison_result.stage_timings,
+        )
 
 
 if TYPE_CHECKING:
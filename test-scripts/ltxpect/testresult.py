@@ -1,7 +1,58 @@
+import enum
 from dataclasses import dataclass
 from types import TracebackType
 from typing import Optional, Type
 
+from .asyncpopen import AsyncPopenResourceUsage
+
+
+class TestStage(enum.Enum):
+    """A stage in the execution of a test."""
+
+    BUILD_QUEUE = "build_queue"
+    """Waiting for a build slot, and for the process pool to admit the build."""
+
+    BUILD = "build"
+    """Building the test document with LaTeX."""
+
+    COMPARISON_QUEUE = "comparison_queue"
+    """Waiting for a comparison worker to pick up the built PDF."""
+
+    PDFINFO = "pdfinfo"
+    """Getting the number of pages of the test and prototype PDFs."""
+
+    RASTERIZE = "rasterize"
+    """Rasterizing the pages of the test and prototype PDFs that need to be
+    compared.
+    """
+
+    DIMENSIONS = "dimensions"
+    """Checking that a test page and prototype page have the same dimensions."""
+
+    COMPARE = "compare"
+    """Comparing a rasterized test page with the prototype page."""
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class TestStageTiming:
+    stage: TestStage
+    """The stage."""
+
+    start_time: float
+    """When the stage started, as returned by time.monotonic()."""
+
+    end_time: float
+    """When the stage ended, as returned by time.monotonic()."""
+
+    num_pages: Optional[int] = None
+    """The number of pages processed by the stage, for stages that process
+    pages.
+    """
+
+    @property
+    def duration(self) -> float:
+        return self.end_time - self.start_time
+
 
 @dataclass(frozen=True, slots=True)
 class TestResult:
@@ -16,6 +67,12 @@ class TestResult:
     should imply build_succeeded == False.
     """
 
+    build_termination_stage: Optional[str] = None
+    """How far the termination of the test's build step had to be escalated
+    after it timed out ("terminated" or "killed"). Only set if
+    build_timed_out == True.
+    """
+
     exc_info: Optional[tuple[Type[BaseException], BaseException, TracebackType]] = None
     """Exception info that is set if there was an exception during any part of
     the test execution.
@@ -42,7 +99,33 @@ class TestResult:
     build_succeeded == False, and the log file exists.
     """
 
+    build_num_passes: Optional[int] = None
+    """The number of LaTeX passes run by the test's build step, if reported by
+    the build tool. Set both if the build step succeeded and if it failed.
+    """
+
     failed_pages: tuple[int, ...] = ()
     """The page numbers of all pages in the test document that failed the
     comparison check. Only set if the test's build step completed successfully.
     """
+
+    build_resource_usage: Optional[AsyncPopenResourceUsage] = None
+    """The combined resource usage of the processes run by the test's build
+    step. Set both if the build step succeeded and if it failed.
+    """
+
+    rasterize_resource_usage: Optional[AsyncPopenResourceUsage] = None
+    """The combined resource usage of the processes that rasterized the pages
+    of the test and prototype PDFs. Only set if any pages were rasterized.
+    """
+
+    compare_resource_usage: Optional[AsyncPopenResourceUsage] = None
+    """The combined resource usage of the processes that compared the
+    rasterized pages. Only set if any pages were compared.
+    """
+
+    stage_timings: tuple[TestStageTiming, ...] = ()
+    """The timings of the stages that the test went through, in the order in
+    which they ended. Stages that process a single page (e.g. comparisons) are
+    recorded once for each page.
+    """
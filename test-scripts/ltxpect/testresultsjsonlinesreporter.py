@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+from typing import Any, IO, TYPE_CHECKING
+
+from .coreabc import ITestReporter
+from .testresult import TestResult
+from .testresultsjsonreporter import failed_test_to_json_map
+
+
+class TestResultsJsonLinesReporter:
+    """Writes test results to a JSON Lines file, one record per test as soon as
+    its result is reported, such that the results of a test run that crashed or
+    was cancelled are still available, and such that other programs can follow
+    the results while the test run is in progress.
+
+    The file starts with a "run_started" record, followed by a "test" record
+    for each test, and ends with a "summary" record when the test run has
+    completed. Use load_test_results_json_lines() to rebuild the same view of
+    the results as the one written by TestResultsJsonReporter.
+
+    Each record is flushed to the file right away, but the file is only synced
+    to disk in batches, as syncing after every test would slow down test runs
+    with many small tests.
+    """
+
+    RECORDS_VERSION = 1
+
+    # Sync the file to disk after this many records, or this many seconds
+    # after the first record that has not been synced, whichever is first
+    FSYNC_BATCH_SIZE = 32
+    FSYNC_BATCH_INTERVAL = 1.0
+
+    def __init__(self, test_result_jsonl_path: str) -> None:
+        self.test_result_jsonl_path = test_result_jsonl_path
+
+        self.test_result_lock = asyncio.Lock()
+        self.num_tests_completed: int = 0
+        self.num_tests_failed: int = 0
+
+        self._fp: IO[str] | None = None
+        self._num_unsynced_records = 0
+        self._sync_timer: asyncio.Task[None] | None = None
+
+    async def report_warmup_compile_started_async(self) -> None:
+        """Report that the warmup compile step has started."""
+
+    async def report_warmup_compile_progress_async(self, test_name: str) -> None:
+        """Report that the warmup compile step has finished processing the
+        specified test.
+        """
+
+    async def report_warmup_compile_ended_async(self) -> None:
+        """Report that the warmup compile step has ended."""
+
+    async def report_test_run_started_async(self) -> None:
+        """Report that the test run has started."""
+
+        async with self.test_result_lock:
+            if self._fp is not None:
+                self._fp.close()
+
+            self.num_tests_completed = 0
+            self.num_tests_failed = 0
+
+            self._fp = open(self.test_result_jsonl_path, "w", encoding="utf8")
+            await self._write_record_async(
+                {"type": "run_started", "version": self.RECORDS_VERSION},
+                sync=True,
+            )
+
+    async def report_test_result_async(
+        self, test_name: str, test_passed: bool, test_result: TestResult
+    ) -> None:
+        """Report the result of a single test case after having been run."""
+
+        _ = test_name
+
+        record: dict[str, Any] = {
+            "type": "test",
+            "test_name": test_result.test_name,
+            "passed": test_passed,
+        }
+
+        if test_result.build_num_passes is not None:
+            record["build_num_passes"] = test_result.build_num_passes
+
+        if not test_passed:
+            record["failure"] = failed_test_to_json_map(test_result)
+
+        async with self.test_result_lock:
+            self.num_tests_completed += 1
+            if not test_passed:
+                self.num_tests_failed += 1
+
+            await self._write_record_async(record, sync=False)
+
+    async def report_test_run_result_async(self) -> None:
+        """Report the result of the overall test run. The reporter is expected
+        to aggregate the information it has received about the result from
+        each individual test case.
+        """
+
+        async with self.test_result_lock:
+            await self._write_record_async(
+                {
+                    "type": "summary",
+                    "num_tests": self.num_tests_completed,
+                    "num_failed_tests": self.num_tests_failed,
+                },
+                sync=True,
+            )
+
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+    async def _sync_later_async(self) -> None:
+        await asyncio.sleep(self.FSYNC_BATCH_INTERVAL)
+
+        async with self.test_result_lock:
+            self._sync_timer = None
+            await self._sync_async()
+
+    async def _sync_async(self) -> None:
+        # NOTE: must be called with test_result_lock held
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+
+        if self._fp is None or self._num_unsynced_records == 0:
+            return
+
+        self._num_unsynced_records = 0
+        await asyncio.to_thread(os.fsync, self._fp.fileno())
+
+    async def _write_record_async(self, record: dict[str, Any], sync: bool) -> None:
+        if self._fp is None:
+            # The test run was not started through this reporter; open the file
+            # for appending, so as not to lose any earlier records
+            self._fp = open(self.test_result_jsonl_path, "a", encoding="utf8")
+
+        self._fp.write(json.dumps(record) + "\n")
+        self._fp.flush()
+
+        self._num_unsynced_records += 1
+
+        if sync or self._num_unsynced_records >= self.FSYNC_BATCH_SIZE:
+            await self._sync_async()
+        elif self._sync_timer is None:
+            # Don't leave the record unsynced until the next record arrives,
+            # which may take as long as the slowest test
+            self._sync_timer = asyncio.ensure_future(self._sync_later_async())
+
+
+def load_test_results_json_lines(test_result_jsonl_path: str) -> dict[str, Any]:
+    """Load the records written by TestResultsJsonLinesReporter, and return the
+    same view of the results as the one written by TestResultsJsonReporter,
+    with an additional "complete" key that tells whether the test run has
+    completed. The results of a test run that is in progress, or that crashed
+    or was cancelled, can also be loaded, in which case a record that was only
+    partially written is ignored.
+    """
+
+    num_tests = 0
+    failed_tests: list[dict[str, Any]] = []
+    build_num_passes: dict[str, int] = {}
+    complete = False
+
+    with open(test_result_jsonl_path, "r", encoding="utf8") as fp:
+        for line in fp:
+            if not line.endswith("\n"):
+                # Partially written record
+                break
+
+            record: dict[str, Any] = json.loads(line)
+
+            record_type = record.get("type")
+            if record_type == "run_started":
+                if (
+                    record.get("version")
+                    != TestResultsJsonLinesReporter.RECORDS_VERSION
+                ):
+                    raise ValueError(
+                        "Unsupported test results version: {}".format(
+                            record.get("version")
+                        )
+                    )
+            elif record_type == "test":
+                num_tests += 1
+
+                if "failure" in record:
+                    failed_tests.append(record["failure"])
+
+                if "build_num_passes" in record:
+                    build_num_passes[record["test_name"]] = record["build_num_passes"]
+            elif record_type == "summary":
+                complete = True
+
+    return {
+        "num_tests": num_tests,
+        "failed_tests": failed_tests,
+        "build_num_passes": dict(sorted(build_num_passes.items())),
+        "complete": complete,
+    }
+
+
+if TYPE_CHECKING:
+    _: type[ITestReporter] = TestResultsJsonLinesReporter
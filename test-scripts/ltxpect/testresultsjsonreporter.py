@@ -7,6 +7,53 @@ from .coreabc import ITestReporter
 from .testresult import TestResult
 
 
+def failed_test_to_json_map(test_result: TestResult) -> dict[str, Any]:
+    """Convert the result of a failed test into a JSON-serializable map that
+    describes why the test failed.
+    """
+    failed_test_map: dict[str, Any] = {}
+    failed_test_map["test_name"] = test_result.test_name
+    failed_test_map["build_succeeded"] = test_result.build_succeeded
+    failed_test_map["build_timed_out"] = test_result.build_timed_out
+    failed_test_map["exception"] = False if test_result.exc_info is None else True
+
+    if test_result.exc_info is not None:
+        exc_type, exc_val, exc_tb = test_result.exc_info
+
+        failed_test_map["exc_info"] = {}
+        failed_test_map["exc_info"]["type"] = str(exc_type)
+        failed_test_map["exc_info"]["value"] = str(exc_val)
+
+        failed_test_map["exc_info"]["traceback"] = [
+            line.rstrip("\n")
+            for frame in traceback.format_tb(exc_tb)
+            for line in frame.split("\n")
+        ]
+    elif test_result.build_timed_out or not test_result.build_succeeded:
+        failed_test_map["proc"] = {}
+        failed_test_map["proc"]["returncode"] = test_result.build_returncode
+
+        if test_result.build_termination_stage is not None:
+            failed_test_map["proc"][
+                "termination_stage"
+            ] = test_result.build_termination_stage
+
+        failed_test_map["proc"]["stdout"] = [
+            line.rstrip(b"\n").decode("utf-8") for line in test_result.build_stdout
+        ]
+
+        failed_test_map["proc"]["stderr"] = [
+            line.rstrip(b"\n").decode("utf-8") for line in test_result.build_stderr
+        ]
+
+        if test_result.build_logfile:
+            failed_test_map["log_file"] = test_result.build_logfile
+    else:
+        failed_test_map["failed_pages"] = test_result.failed_pages
+
+    return failed_test_map
+
+
 class TestResultsJsonReporter:
     """Writes test results to a JSON file."""
 
@@ -15,7 +62,8 @@ class TestResultsJsonReporter:
 
         self.test_result_lock = asyncio.Lock()
         self.num_tests_completed: int = 0
-        self.failed_tests: list[TestResult] = []
+        self.failed_tests: list[dict[str, Any]] = []
+        self.build_num_passes: dict[str, int] = {}
 
     async def report_warmup_compile_started_async(self) -> None:
         """Report that the warmup compile step has started."""
@@ -42,7 +90,14 @@ class TestResultsJsonReporter:
             self.num_tests_completed += 1
 
             if not test_passed:
-                self.failed_tests.append(test_result)
+                # Convert the result right away, such that tracebacks and build
+                # output are not kept alive for the rest of the test run
+                self.failed_tests.append(failed_test_to_json_map(test_result))
+
+            if test_result.build_num_passes is not None:
+                self.build_num_passes[test_result.test_name] = (
+                    test_result.build_num_passes
+                )
 
     async def report_test_run_result_async(self) -> None:
         """Report the result of the overall test run. The reporter is expected
@@ -54,50 +109,10 @@ class TestResultsJsonReporter:
         async with self.test_result_lock:
             result_map["num_tests"] = self.num_tests_completed
 
-            failed_tests_list: list[dict[str, Any]] = []
-            for test_result in self.failed_tests:
-                failed_test_map: dict[str, Any] = {}
-                failed_test_map["test_name"] = test_result.test_name
-                failed_test_map["build_succeeded"] = test_result.build_succeeded
-                failed_test_map["build_timed_out"] = test_result.build_timed_out
-                failed_test_map["exception"] = (
-                    False if test_result.exc_info is None else True
-                )
-
-                if test_result.exc_info is not None:
-                    exc_type, exc_val, exc_tb = test_result.exc_info
-
-                    failed_test_map["exc_info"] = {}
-                    failed_test_map["exc_info"]["type"] = str(exc_type)
-                    failed_test_map["exc_info"]["value"] = str(exc_val)
-
-                    failed_test_map["exc_info"]["traceback"] = [
-                        line.rstrip("\n")
-                        for frame in traceback.format_tb(exc_tb)
-                        for line in frame.split("\n")
-                    ]
-                elif test_result.build_timed_out or not test_result.build_succeeded:
-                    failed_test_map["proc"] = {}
-                    failed_test_map["proc"]["returncode"] = test_result.build_returncode
-
-                    failed_test_map["proc"]["stdout"] = [
-                        line.rstrip(b"\n").decode("utf-8")
-                        for line in test_result.build_stdout
-                    ]
-
-                    failed_test_map["proc"]["stderr"] = [
-                        line.rstrip(b"\n").decode("utf-8")
-                        for line in test_result.build_stderr
-                    ]
-
-                    if test_result.build_logfile:
-                        failed_test_map["log_file"] = test_result.build_logfile
-                else:
-                    failed_test_map["failed_pages"] = test_result.failed_pages
-
-                failed_tests_list.append(failed_test_map)
+            result_map["failed_tests"] = list(self.failed_tests)
 
-            result_map["failed_tests"] = failed_tests_list
+            # The number of LaTeX passes needed by each test, if known
+            result_map["build_num_passes"] = dict(sorted(self.build_num_passes.items()))
 
         with open(
             self.test_result_json_path,
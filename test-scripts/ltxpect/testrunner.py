@@ -3,7 +3,15 @@ from dataclasses import dataclass
 from collections.abc import Sequence
 from typing import TYPE_CHECKING
 
-from .coreabc import IPathUtil, ITestEngine, ITestReporter, ITestRunContext, ITestRunner
+from .coreabc import (
+    IPathUtil,
+    ITestEngine,
+    ITestReporter,
+    ITestRunContext,
+    ITestDurationHistory,
+    ITestRunner,
+    IWarmupCache,
+)
 from .testresult import TestResult
 
 
@@ -12,6 +20,26 @@ class TestRunnerConfig:
     run_warmup_compile_before_tests: bool = False
 
 
+def get_test_duration(test_result: TestResult) -> float | None:
+    """Return the time spent running the processes of a test, which, unlike
+    the time until the test completes, does not depend on how long it had to
+    wait for other tests. Returns None if no processes were run.
+    """
+    resource_usages = [
+        x
+        for x in (
+            test_result.build_resource_usage,
+            test_result.rasterize_resource_usage,
+            test_result.compare_resource_usage,
+        )
+        if x is not None
+    ]
+    if not resource_usages:
+        return None
+
+    return sum(x.wall_time for x in resource_usages)
+
+
 class TestRunner:
     def __init__(
         self,
@@ -19,35 +47,94 @@ class TestRunner:
         engine: ITestEngine,
         reporter: ITestReporter,
         path_util: IPathUtil,
+        warmup_cache: IWarmupCache | None = None,
+        duration_history: ITestDurationHistory | None = None,
     ) -> None:
         self.config = config
         self.engine = engine
         self.reporter = reporter
         self.path_util = path_util
+        self.warmup_cache = warmup_cache
+        self.duration_history = duration_history
 
     async def run_async(self, test_names: Sequence[str]) -> int:
         ctx = self.engine.create_test_run_context()
 
-        if self.config.run_warmup_compile_before_tests:
-            await self._run_warmup_compile_async(ctx, test_names)
+        try:
+            if self.config.run_warmup_compile_before_tests:
+                await self._run_warmup_compile_async(ctx, test_names)
+
+            return await self._run_tests_async(ctx, test_names)
+        finally:
+            await self.engine.finish_test_run_async(ctx)
 
-        return await self._run_tests_async(ctx, test_names)
+            if self.duration_history is not None:
+                self.duration_history.save()
 
     async def _run_warmup_compile_async(
         self, ctx: ITestRunContext, test_names: Sequence[str]
     ) -> None:
         await self.reporter.report_warmup_compile_started_async()
 
-        # NOTE: warmup compile steps run sequentially
+        # Only warm up one representative test for each distinct set of fonts
+        # and formats
+        representative_test_names: dict[str, str] = {}
         for test_name in test_names:
-            await self.engine.run_warmup_compile_for_test_async(ctx, test_name)
+            representative_test_names.setdefault(
+                self.engine.get_warmup_compile_key(ctx, test_name), test_name
+            )
+
+        # Skip the keys that have already been warmed up by a previous test run
+        if self.warmup_cache is not None:
+            representative_test_names = {
+                warmup_key: test_name
+                for warmup_key, test_name in representative_test_names.items()
+                if not self.warmup_cache.is_warm(warmup_key)
+            }
+
+        warmup_futures: list[asyncio.Future[None]] = [
+            asyncio.ensure_future(
+                self._run_warmup_compile_for_test_async(ctx, warmup_key, test_name)
+            )
+            for warmup_key, test_name in representative_test_names.items()
+        ]
+
+        if warmup_futures:
+            done_futures, pending_futures = await asyncio.wait(warmup_futures)
+            assert len(pending_futures) == 0
+
+            for future in done_futures:
+                # Await to allow a potential exception to propagate
+                try:
+                    await future
+                except:
+                    # Observe all exceptions to suppress "Task exception was never retrieved" error
+                    # (we are only interested in the first exception)
+                    _ = [x.exception() for x in done_futures]
+
+                    # Re-raise just the first exception
+                    raise
 
         await self.reporter.report_warmup_compile_ended_async()
 
+    async def _run_warmup_compile_for_test_async(
+        self, ctx: ITestRunContext, warmup_key: str, test_name: str
+    ) -> None:
+        succeeded = await self.engine.run_warmup_compile_for_test_async(ctx, test_name)
+        if succeeded and self.warmup_cache is not None:
+            self.warmup_cache.mark_warm(warmup_key)
+
+        await self.reporter.report_warmup_compile_progress_async(test_name)
+
     async def _run_test_async(self, ctx: ITestRunContext, test_name: str) -> bool:
         test_result: TestResult = await self.engine.run_test_async(ctx, test_name)
         assert test_result.test_name == test_name
 
+        if self.duration_history is not None:
+            test_duration = get_test_duration(test_result)
+            if test_duration is not None:
+                self.duration_history.record_duration(test_name, test_duration)
+
         test_passed = (
             test_result.build_succeeded
             and (test_result.exc_info is None)
@@ -60,13 +147,43 @@ class TestRunner:
 
         return test_passed
 
+    def _order_tests_longest_first(self, test_names: Sequence[str]) -> list[str]:
+        """Order the tests by their expected duration, longest first, such that
+        a slow test does not end up as the tail of the test run. Tests that
+        have not been run before are expected to take the average duration.
+        """
+        if self.duration_history is None:
+            return list(test_names)
+
+        durations = {x: self.duration_history.get_duration(x) for x in test_names}
+        known_durations = [x for x in durations.values() if x is not None]
+        if not known_durations:
+            return list(test_names)
+
+        average_duration = sum(known_durations) / len(known_durations)
+        expected_durations = {
+            test_name: duration if duration is not None else average_duration
+            for test_name, duration in durations.items()
+        }
+
+        # NOTE: the sort is stable, so tests with equal expected durations keep
+        # their order
+        return sorted(test_names, key=lambda x: -expected_durations[x])
+
     async def _run_tests_async(
         self, ctx: ITestRunContext, test_names: Sequence[str]
     ) -> int:
         await self.reporter.report_test_run_started_async()
 
+        # E.g. if no tests have changed since they last passed
+        if not test_names:
+            await self.reporter.report_test_run_result_async()
+            return 0
+
+        # NOTE: the tests wait for build slots in the order in which they are
+        # started here
         test_futures: list[asyncio.Future[bool]] = []
-        for test_name in test_names:
+        for test_name in self._order_tests_longest_first(test_names):
             test_future = asyncio.ensure_future(self._run_test_async(ctx, test_name))
             test_futures.append(test_future)
 
@@ -0,0 +1,148 @@
+import asyncio
+import unittest
+
+from ltxpect.aggregatereporter import AggregateReporter
+from ltxpect.testresult import TestResult
+
+
+class RecordingReporter:
+    def __init__(self, name: str, events: list[tuple[str, str]]) -> None:
+        self.name = name
+        self.events = events
+        self.blocked: asyncio.Event | None = None
+        self.error: Exception | None = None
+
+    async def report_warmup_compile_started_async(self) -> None:
+        self.events.append((self.name, "warmup_started"))
+
+    async def report_warmup_compile_progress_async(self, test_name: str) -> None:
+        self.events.append((self.name, "warmup_progress " + test_name))
+
+    async def report_warmup_compile_ended_async(self) -> None:
+        self.events.append((self.name, "warmup_ended"))
+
+    async def report_test_run_started_async(self) -> None:
+        self.events.append((self.name, "run_started"))
+
+    async def report_test_result_async(
+        self, test_name: str, test_passed: bool, test_result: TestResult
+    ) -> None:
+        if self.blocked is not None:
+            await self.blocked.wait()
+
+        if self.error is not None:
+            raise self.error
+
+        self.events.append((self.name, "result " + test_name))
+
+    async def report_test_run_result_async(self) -> None:
+        self.events.append((self.name, "run_result"))
+
+
+class AggregateReporterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.events: list[tuple[str, str]] = []
+        self.slow_reporter = RecordingReporter("slow", self.events)
+        self.fast_reporter = RecordingReporter("fast", self.events)
+
+    async def _report_test_results_async(
+        self, reporter: AggregateReporter, test_names: list[str]
+    ) -> None:
+        for test_name in test_names:
+            await reporter.report_test_result_async(
+                test_name, True, TestResult(test_name, True)
+            )
+
+    def test_report_test_result_async__slow_reporter_does_not_hold_up_others(self):
+        reporter = AggregateReporter([self.slow_reporter, self.fast_reporter])
+
+        async def run_async():
+            self.slow_reporter.blocked = asyncio.Event()
+
+            await reporter.report_test_run_started_async()
+            await self._report_test_results_async(reporter, ["test_a", "test_b"])
+
+            # Let the consumers run
+            for _ in range(10):
+                await asyncio.sleep(0)
+
+            self.assertEqual(
+                self.events,
+                [
+                    ("slow", "run_started"),
+                    ("fast", "run_started"),
+                    ("fast", "result test_a"),
+                    ("fast", "result test_b"),
+                ],
+            )
+
+            self.slow_reporter.blocked.set()
+            await reporter.report_test_run_result_async()
+
+        asyncio.run(run_async())
+
+        # Each reporter receives its events in order, and the test run result
+        # is reported in the order of the reporters, after all other events
+        self.assertEqual(
+            [x for x in self.events if x[0] == "slow"],
+            [
+                ("slow", "run_started"),
+                ("slow", "result test_a"),
+                ("slow", "result test_b"),
+                ("slow", "run_result"),
+            ],
+        )
+        self.assertEqual(
+            self.events[-2:], [("slow", "run_result"), ("fast", "run_result")]
+        )
+
+    def test_report_test_result_async__bounded_queue(self):
+        reporter = AggregateReporter(
+            [self.slow_reporter, self.fast_reporter], max_pending_events=2
+        )
+
+        async def run_async():
+            self.slow_reporter.blocked = asyncio.Event()
+
+            dispatch_task = asyncio.ensure_future(
+                self._report_test_results_async(
+                    reporter, ["test_a", "test_b", "test_c", "test_d"]
+                )
+            )
+            for _ in range(10):
+                await asyncio.sleep(0)
+
+            # The slow reporter is processing one event, and two are queued
+            self.assertFalse(dispatch_task.done())
+
+            self.slow_reporter.blocked.set()
+            await dispatch_task
+            await reporter.report_test_run_result_async()
+
+        asyncio.run(run_async())
+
+        self.assertEqual(
+            [x[1] for x in self.events if x[0] == "slow"],
+            ["result test_a", "result test_b", "result test_c", "result test_d"]
+            + ["run_result"],
+        )
+
+    def test_report_test_run_result_async__reraises_reporter_error(self):
+        reporter = AggregateReporter([self.slow_reporter, self.fast_reporter])
+        self.slow_reporter.error = ValueError("disk full")
+
+        async def run_async():
+            await self._report_test_results_async(reporter, ["test_a", "test_b"])
+            await reporter.report_test_run_result_async()
+
+        with self.assertRaisesRegex(ValueError, "disk full"):
+            asyncio.run(run_async())
+
+        self.assertEqual(
+            self.events,
+            [
+                ("fast", "result test_a"),
+                ("fast", "result test_b"),
+                ("fast", "run_result"),
+            ],
+        )
@@ -1,6 +1,8 @@
 import asyncio
 import os
+import signal
 import sys
+import types
 import unittest
 import unittest.mock as mock
 from typing import Any, Callable, cast
@@ -9,6 +11,8 @@ from ltxpect import asyncpopen
 
 
 class FakeTransport(asyncio.SubprocessTransport):
+    PID = 4321
+
     def __init__(self, transport_closed_future: asyncio.Future[None]) -> None:
         self._has_returncode = False
         self._transport_closed_future = transport_closed_future
@@ -22,11 +26,19 @@ class FakeTransport(asyncio.SubprocessTransport):
         return self._protocol
 
     def close(self) -> None:
-        self._transport_closed_future.set_result(None)
+        # Like real transports, allow the transport to be closed more than once
+        if not self._transport_closed_future.done():
+            self._transport_closed_future.set_result(None)
 
     def terminate(self) -> None:
         return self.close()
 
+    def kill(self) -> None:
+        return self.close()
+
+    def get_pid(self) -> int:
+        return self.PID
+
     def set_returncode(self, returncode: int):
         self._returncode = returncode
         self._has_returncode = True
@@ -43,11 +55,15 @@ class AsyncPopenTests(unittest.TestCase):
         self.loop = asyncio.new_event_loop()
 
         patcher = mock.patch.object(
-            self.loop, "subprocess_exec", new_callable=mock.AsyncMock
+            asyncpopen, "_subprocess_exec_async", new_callable=mock.AsyncMock
         )
         self.subprocess_exec_mock = patcher.start()
         self.addCleanup(patcher.stop)
 
+        patcher = mock.patch.object(asyncpopen.os, "killpg", create=True)
+        self.killpg_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
         self.transport_closed_future = cast(
             asyncio.Future[None], self.loop.create_future()
         )
@@ -64,6 +80,7 @@ class AsyncPopenTests(unittest.TestCase):
 
         # Configure "happy path" as default behaviour
         def subprocess_exec(
+            loop: asyncio.AbstractEventLoop,
             protocol_factory: Callable[[], asyncio.BaseProtocol],
             program: str,
             *args: str,
@@ -128,7 +145,14 @@ class AsyncPopenTests(unittest.TestCase):
 
             self.assertEqual(program, "/path/to/program")
             self.assertEqual(program_args, ("first_arg", "--second_arg"))
-            self.assertEqual(subprocess_exec_kwargs, {"cwd": None, "env": os.environ})
+            self.assertEqual(
+                subprocess_exec_kwargs,
+                {
+                    "cwd": None,
+                    "env": os.environ,
+                    "start_new_session": os.name == "posix",
+                },
+            )
 
             # Cleanup
 
@@ -174,7 +198,11 @@ class AsyncPopenTests(unittest.TestCase):
             self.assertEqual(program_args, ("first_arg", "--second_arg"))
             self.assertEqual(
                 subprocess_exec_kwargs,
-                {"cwd": None, "env": {"ENV_A": "A", "ENV_B": "B"}},
+                {
+                    "cwd": None,
+                    "env": {"ENV_A": "A", "ENV_B": "B"},
+                    "start_new_session": os.name == "posix",
+                },
             )
 
             # Cleanup
@@ -220,7 +248,12 @@ class AsyncPopenTests(unittest.TestCase):
             self.assertEqual(program, "/path/to/program")
             self.assertEqual(program_args, ("first_arg", "--second_arg"))
             self.assertEqual(
-                subprocess_exec_kwargs, {"cwd": "/some/cwd", "env": os.environ}
+                subprocess_exec_kwargs,
+                {
+                    "cwd": "/some/cwd",
+                    "env": os.environ,
+                    "start_new_session": os.name == "posix",
+                },
             )
 
             # Cleanup
@@ -324,6 +357,196 @@ class AsyncPopenTests(unittest.TestCase):
 
         self._run_async_test(test_async())
 
+    async def _start_popen_async(
+        self, **kwargs: Any
+    ) -> tuple[asyncio.SubprocessProtocol, asyncio.Task[asyncpopen.AsyncPopenResult]]:
+        popen_task = asyncio.create_task(
+            asyncpopen.popen_async(
+                asyncio.get_running_loop(), ["A", "B", "C"], env={}, **kwargs
+            )
+        )
+
+        # Use asyncio.wait() in case there was an exception from popen_async()
+        futures: list[asyncio.Future[Any]] = [
+            self.subprocess_exec_called_future,
+            popen_task,
+        ]
+        done_futures, _ = await asyncio.wait(
+            futures,
+            return_when=asyncio.FIRST_COMPLETED,
+            timeout=1.0,
+        )
+        if popen_task in done_futures:
+            await popen_task
+            self.fail("popen_async() returned unexpectedly")
+
+        protocol, *_ = await self.subprocess_exec_called_future
+        assert isinstance(protocol, asyncio.SubprocessProtocol)
+        protocol.connection_made(self.transport)
+
+        return protocol, popen_task
+
+    def test_program_terminates_with_output__line_callback(self) -> None:
+        # Arrange
+
+        received_lines: list[tuple[int, bytes]] = []
+
+        async def line_callback(fd: int, line: bytes) -> None:
+            await asyncio.sleep(0)
+            received_lines.append((fd, line))
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(
+                line_callback=line_callback
+            )
+
+            # Act
+
+            protocol.pipe_data_received(1, b"First stdout line\r")
+            protocol.pipe_data_received(2, b"First stderr line\n")
+            protocol.pipe_data_received(1, b"\nSecond stdout line\rThird")
+
+            # Let the callback catch up with the lines received so far
+            for _ in range(10):
+                await asyncio.sleep(0)
+
+            received_lines_before_exit = list(received_lines)
+
+            protocol.pipe_data_received(1, b" stdout line")
+
+            self.transport.set_returncode(0)
+            protocol.connection_lost(None)
+
+            # Assert
+
+            result = await popen_task
+
+            self.assertEqual(
+                received_lines_before_exit,
+                [
+                    (2, b"First stderr line"),
+                    (1, b"First stdout line"),
+                    (1, b"Second stdout line"),
+                ],
+            )
+            self.assertEqual(
+                received_lines,
+                [*received_lines_before_exit, (1, b"Third stdout line")],
+            )
+            self.assertEqual(
+                result.stdout,
+                (b"First stdout line", b"Second stdout line", b"Third stdout line"),
+            )
+            self.assertEqual(result.stderr, (b"First stderr line",))
+
+        self._run_async_test(test_async())
+
+    def test_program_terminates_with_output__line_callback_raises(self) -> None:
+        # Arrange
+
+        async def line_callback(fd: int, line: bytes) -> None:
+            raise ValueError("OOPS")
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(
+                line_callback=line_callback
+            )
+
+            # Act
+
+            protocol.pipe_data_received(1, b"First stdout line\n")
+
+            # Assert
+
+            # The process is terminated when the callback raises
+            await self.transport_closed_future
+            self.transport.set_returncode(-1)
+            protocol.connection_lost(None)
+
+            with self.assertRaises(ValueError) as exctx:
+                await popen_task
+
+            self.assertEqual(exctx.exception.args[0], "OOPS")
+
+        self._run_async_test(test_async())
+
+    def test_program_terminates_with_output__max_captured_lines(self) -> None:
+        # Arrange
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(max_captured_lines=2)
+
+            # Act
+
+            protocol.pipe_data_received(1, b"1\n2\n3")
+            protocol.pipe_data_received(1, b"\n4\n5")
+            protocol.pipe_data_received(2, b"only stderr line")
+
+            self.transport.set_returncode(0)
+            protocol.connection_lost(None)
+
+            # Assert
+
+            result = await popen_task
+            self.assertEqual(result.stdout, (b"4", b"5"))
+            self.assertEqual(result.stderr, (b"only stderr line",))
+
+        self._run_async_test(test_async())
+
+    def test_program_terminates_with_output__max_captured_bytes(self) -> None:
+        # Arrange
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(max_captured_bytes=8)
+
+            # Act
+
+            protocol.pipe_data_received(1, b"aaa\nbbb\nccc\n")
+            protocol.pipe_data_received(2, b"0123456789")
+            protocol.pipe_data_received(2, b"abcdef\n")
+
+            self.transport.set_returncode(0)
+            protocol.connection_lost(None)
+
+            # Assert
+
+            result = await popen_task
+            self.assertEqual(result.stdout, (b"bbb", b"ccc"))
+            self.assertEqual(result.stderr, (b"89abcdef",))
+
+        self._run_async_test(test_async())
+
+    def test_program_terminates_with_output__no_capture(self) -> None:
+        # Arrange
+
+        received_lines: list[tuple[int, bytes]] = []
+
+        async def line_callback(fd: int, line: bytes) -> None:
+            received_lines.append((fd, line))
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(
+                line_callback=line_callback, max_captured_lines=0
+            )
+
+            # Act
+
+            protocol.pipe_data_received(1, b"First stdout line\nLast stdout line")
+
+            self.transport.set_returncode(0)
+            protocol.connection_lost(None)
+
+            # Assert
+
+            result = await popen_task
+            self.assertEqual(result.stdout, ())
+            self.assertEqual(
+                received_lines,
+                [(1, b"First stdout line"), (1, b"Last stdout line")],
+            )
+
+        self._run_async_test(test_async())
+
     def test_program_times_out_with_no_output(self) -> None:
         # Arrange
 
@@ -332,7 +555,11 @@ class AsyncPopenTests(unittest.TestCase):
 
             popen_task = asyncio.create_task(
                 asyncpopen.popen_async(
-                    asyncio.get_running_loop(), ["A", "B", "C"], timeout=0.2, env={}
+                    asyncio.get_running_loop(),
+                    ["A", "B", "C"],
+                    timeout=0.2,
+                    env={},
+                    termination_grace_period=0.1,
                 )
             )
 
@@ -351,8 +578,9 @@ class AsyncPopenTests(unittest.TestCase):
             protocol, *_ = await self.subprocess_exec_called_future
             protocol.connection_made(self.transport)
 
-            # Wait for call to transport.close() (due to timeout), and call
-            # protocol's connection_lost() as a result
+            # The fake process ignores SIGTERM, so wait for call to
+            # transport.close() (after the grace period), and call protocol's
+            # connection_lost() as a result
             await self.transport_closed_future
             self.transport.set_returncode(-1)
             protocol.connection_lost(None)
@@ -366,6 +594,10 @@ class AsyncPopenTests(unittest.TestCase):
             )
 
             self.assertEqual(exctx.exception.returncode, -1)
+            self.assertEqual(
+                exctx.exception.termination_stage,
+                asyncpopen.AsyncPopenTerminationStage.KILLED,
+            )
             self.assertEqual(
                 exctx.exception.stdout,
                 (),
@@ -385,7 +617,11 @@ class AsyncPopenTests(unittest.TestCase):
 
             popen_task = asyncio.create_task(
                 asyncpopen.popen_async(
-                    asyncio.get_running_loop(), ["A", "B", "C"], timeout=0.2, env={}
+                    asyncio.get_running_loop(),
+                    ["A", "B", "C"],
+                    timeout=0.2,
+                    env={},
+                    termination_grace_period=0.1,
                 )
             )
 
@@ -412,8 +648,9 @@ class AsyncPopenTests(unittest.TestCase):
             protocol.pipe_data_received(1, b"\nSecond stdout line\nLast stdout line")
             protocol.pipe_data_received(2, b" line\nLast stderr line\n")
 
-            # Wait for call to transport.close() (due to timeout), and call
-            # protocol's connection_lost() as a result
+            # The fake process ignores SIGTERM, so wait for call to
+            # transport.close() (after the grace period), and call protocol's
+            # connection_lost() as a result
             await self.transport_closed_future
             self.transport.set_returncode(-1)
             protocol.connection_lost(None)
@@ -427,6 +664,10 @@ class AsyncPopenTests(unittest.TestCase):
             )
 
             self.assertEqual(exctx.exception.returncode, -1)
+            self.assertEqual(
+                exctx.exception.termination_stage,
+                asyncpopen.AsyncPopenTerminationStage.KILLED,
+            )
             self.assertEqual(
                 exctx.exception.stdout,
                 (b"First stdout line", b"Second stdout line", b"Last stdout line"),
@@ -438,10 +679,255 @@ class AsyncPopenTests(unittest.TestCase):
 
         self._run_async_test(test_async())
 
+    @unittest.skipUnless(os.name == "posix", "requires process groups")
+    @unittest.skipUnless(os.name == "posix", "requires process groups")
+    def test_program_times_out__process_group_is_killed(self) -> None:
+        # Arrange
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(
+                timeout=0.2, termination_grace_period=0.1
+            )
+
+            # Act
+
+            await self.transport_closed_future
+            self.transport.set_returncode(-9)
+            protocol.connection_lost(None)
+
+            # Assert
+
+            with self.assertRaises(asyncpopen.AsyncPopenTimeoutError):
+                await popen_task
+
+            self.assertEqual(
+                self.killpg_mock.call_args_list,
+                [
+                    mock.call(FakeTransport.PID, signal.SIGTERM),
+                    mock.call(FakeTransport.PID, signal.SIGKILL),
+                ],
+            )
+
+        self._run_async_test(test_async())
+
+    def test_program_times_out__without_process_groups__process_is_killed(
+        self,
+    ) -> None:
+        # Arrange
+
+        patcher = mock.patch.object(asyncpopen, "_USE_PROCESS_GROUPS", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Like on Windows, where there is no SIGKILL
+        signal_patcher = mock.patch.object(
+            asyncpopen, "signal", types.SimpleNamespace(SIGTERM=signal.SIGTERM)
+        )
+        signal_patcher.start()
+        self.addCleanup(signal_patcher.stop)
+
+        terminate_mock = mock.Mock()
+        kill_mock = mock.Mock(side_effect=self.transport.close)
+        self.transport.terminate = terminate_mock  # type: ignore[method-assign]
+        self.transport.kill = kill_mock  # type: ignore[method-assign]
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(
+                timeout=0.2, termination_grace_period=0.1
+            )
+
+            # Act
+
+            await self.transport_closed_future
+            self.transport.set_returncode(1)
+            protocol.connection_lost(None)
+
+            # Assert
+
+            with self.assertRaises(asyncpopen.AsyncPopenTimeoutError) as exctx:
+                await popen_task
+
+            self.assertEqual(
+                exctx.exception.termination_stage,
+                asyncpopen.AsyncPopenTerminationStage.KILLED,
+            )
+            terminate_mock.assert_called_once_with()
+            kill_mock.assert_called_once_with()
+            self.killpg_mock.assert_not_called()
+
+        self._run_async_test(test_async())
+
+    @unittest.skipUnless(os.name == "posix", "requires process groups")
+    def test_program_times_out__process_group_terminates_on_sigterm(self) -> None:
+        # Arrange
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(
+                timeout=0.2, termination_grace_period=10
+            )
+
+            def killpg(pid: int, sig: signal.Signals) -> None:
+                if sig == signal.SIGTERM:
+                    self.transport.set_returncode(-15)
+                    asyncio.get_running_loop().call_soon(protocol.connection_lost, None)
+
+            self.killpg_mock.side_effect = killpg
+
+            # Act
+
+            with self.assertRaises(asyncpopen.AsyncPopenTimeoutError) as exctx:
+                await popen_task
+
+            # Assert
+
+            self.assertEqual(exctx.exception.returncode, -15)
+            self.assertEqual(
+                exctx.exception.termination_stage,
+                asyncpopen.AsyncPopenTerminationStage.TERMINATED,
+            )
+            self.assertEqual(
+                self.killpg_mock.call_args_list,
+                [mock.call(FakeTransport.PID, signal.SIGTERM)],
+            )
+            self.assertTrue(self.transport_closed_future.done())
+
+        self._run_async_test(test_async())
+
+    @unittest.skipUnless(os.name == "posix", "requires process groups")
+    def test_program_is_cancelled__process_group_terminates_on_sigterm(
+        self,
+    ) -> None:
+        # Arrange
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(
+                termination_grace_period=10
+            )
+
+            def killpg(pid: int, sig: signal.Signals) -> None:
+                if sig == signal.SIGTERM:
+                    self.transport.set_returncode(-15)
+                    asyncio.get_running_loop().call_soon(protocol.connection_lost, None)
+
+            self.killpg_mock.side_effect = killpg
+
+            # Act
+
+            popen_task.cancel()
+
+            # Assert
+
+            with self.assertRaises(asyncio.CancelledError):
+                await popen_task
+
+            self.assertEqual(
+                self.killpg_mock.call_args_list,
+                [mock.call(FakeTransport.PID, signal.SIGTERM)],
+            )
+            self.assertTrue(self.transport_closed_future.done())
+
+        self._run_async_test(test_async())
+
+    def test_program_terminates__resource_usage(self) -> None:
+        # Arrange
+
+        async def test_async():
+            with asyncpopen.record_resource_usage() as recorder:
+                protocol, popen_task = await self._start_popen_async()
+
+                # Act
+
+                self.transport.set_returncode(0)
+                protocol.child_resource_usage = (1.5, 0.25, 2097152)
+                protocol.process_exited()
+                protocol.connection_lost(None)
+
+                result = await popen_task
+
+            # Assert
+
+            self.assertEqual(result, (0, (), ()))
+            self.assertIsNotNone(result.resource_usage)
+            self.assertGreaterEqual(result.resource_usage.wall_time, 0)
+            self.assertEqual(result.resource_usage.user_time, 1.5)
+            self.assertEqual(result.resource_usage.system_time, 0.25)
+            self.assertEqual(result.resource_usage.max_rss, 2097152)
+
+            self.assertEqual(recorder.num_processes, 1)
+            self.assertEqual(recorder.total, result.resource_usage)
+
+        self._run_async_test(test_async())
+
+    def test_program_terminates__resource_usage_not_available(self) -> None:
+        # Arrange
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async()
+
+            # Act
+
+            self.transport.set_returncode(0)
+            protocol.process_exited()
+            protocol.connection_lost(None)
+
+            result = await popen_task
+
+            # Assert
+
+            self.assertIsNotNone(result.resource_usage)
+            self.assertGreaterEqual(result.resource_usage.wall_time, 0)
+            self.assertIsNone(result.resource_usage.user_time)
+            self.assertIsNone(result.resource_usage.system_time)
+            self.assertIsNone(result.resource_usage.max_rss)
+
+        self._run_async_test(test_async())
+
+    def test_program_times_out__resource_usage(self) -> None:
+        # Arrange
+
+        async def test_async():
+            protocol, popen_task = await self._start_popen_async(
+                timeout=0.2, termination_grace_period=0.1
+            )
+
+            # Act
+
+            await self.transport_closed_future
+            self.transport.set_returncode(-9)
+            protocol.child_resource_usage = (1.5, 0.25, 2097152)
+            protocol.process_exited()
+            protocol.connection_lost(None)
+
+            # Assert
+
+            with self.assertRaises(asyncpopen.AsyncPopenTimeoutError) as exctx:
+                await popen_task
+
+            self.assertIsNotNone(exctx.exception.resource_usage)
+            self.assertGreaterEqual(exctx.exception.resource_usage.wall_time, 0.2)
+            self.assertEqual(exctx.exception.resource_usage.user_time, 1.5)
+
+        self._run_async_test(test_async())
+
+    def test_resource_usage_combine(self) -> None:
+        first = asyncpopen.AsyncPopenResourceUsage(1.0, 0.5, 0.25, 2048)
+        second = asyncpopen.AsyncPopenResourceUsage(2.0, None, 0.5, 1024)
+
+        self.assertEqual(
+            first.combine(second),
+            asyncpopen.AsyncPopenResourceUsage(3.0, 0.5, 0.75, 2048),
+        )
+        self.assertEqual(
+            asyncpopen.AsyncPopenResourceUsage(1.0).combine(
+                asyncpopen.AsyncPopenResourceUsage(2.0)
+            ),
+            asyncpopen.AsyncPopenResourceUsage(3.0),
+        )
+
     def test_subprocess_exec_raises_exception(self) -> None:
         # Arrange
 
-        def subprocess_exec(protocol_factory, program, *args, **kwargs):
+        def subprocess_exec(loop, protocol_factory, program, *args, **kwargs):
             raise ValueError("OOPS")
 
         self.subprocess_exec_mock.side_effect = subprocess_exec
@@ -463,3 +949,63 @@ class AsyncPopenTests(unittest.TestCase):
             self.assertEqual(exctx.exception.args[0], "OOPS")
 
         self._run_async_test(test_async())
+
+
+@unittest.skipIf(sys.platform == "win32", "resource usage is not available on Windows")
+class AsyncPopenChildProcessTests(unittest.TestCase):
+    """Tests that run actual child processes."""
+
+    def setUp(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_program_terminates_with_output(self) -> None:
+        # Arrange
+        code = "import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"
+
+        async def test_async():
+            # Act
+            result = await asyncpopen.popen_async(
+                self.loop, [sys.executable, "-c", code], timeout=30
+            )
+
+            # Assert
+            self.assertEqual(result, (3, (b"out",), (b"err",)))
+            self.assertIsNotNone(result.resource_usage)
+            self.assertIsNotNone(result.resource_usage.user_time)
+            self.assertIsNotNone(result.resource_usage.system_time)
+            self.assertIsNotNone(result.resource_usage.max_rss)
+
+        self.loop.run_until_complete(test_async())
+
+    def test_programs_exit_at_the_same_time__resource_usage_of_each(self) -> None:
+        # Arrange
+        allocation_size = 256 * 1024 * 1024
+        code = "import sys, time; b = bytearray(int(sys.argv[1])); time.sleep(0.5)"
+
+        async def run_async(size):
+            return await asyncpopen.popen_async(
+                self.loop, [sys.executable, "-c", code, str(size)], timeout=30
+            )
+
+        async def test_async():
+            # Act
+            large, small = await asyncio.gather(
+                run_async(allocation_size), run_async(0)
+            )
+
+            # Assert
+            self.assertGreaterEqual(large.resource_usage.max_rss, allocation_size)
+            self.assertLess(small.resource_usage.max_rss, allocation_size)
+
+        self.loop.run_until_complete(test_async())
+
+    def test_program_not_found__raises(self) -> None:
+        async def test_async():
+            # Act / Assert
+            with self.assertRaises(FileNotFoundError):
+                await asyncpopen.popen_async(
+                    self.loop, ["/nonexistent/program"], timeout=30
+                )
+
+        self.loop.run_until_complete(test_async())
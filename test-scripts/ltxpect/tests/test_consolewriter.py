@@ -0,0 +1,93 @@
+import asyncio
+import io
+import unittest
+
+from ltxpect.colorconsolereporter import ColorConsoleReporter, debug
+from ltxpect.consolewriter import ConsoleWriter
+from ltxpect.testresult import TestResult
+
+
+class RecordingStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes: list[str] = []
+
+    def write(self, s: str) -> int:
+        self.writes.append(s)
+        return super().write(s)
+
+
+class ConsoleWriterTests(unittest.TestCase):
+    def test_write__coalesced(self):
+        stream = RecordingStream()
+        writer = ConsoleWriter(stream, use_color=False)
+
+        async def run_async():
+            for _ in range(10):
+                writer.write(".")
+
+            await asyncio.sleep(writer.FLUSH_DELAY * 3)
+
+        asyncio.run(run_async())
+
+        self.assertEqual(stream.writes, ["." * 10])
+
+    def test_flush_async__writes_buffered_text(self):
+        stream = RecordingStream()
+        writer = ConsoleWriter(stream, use_color=False)
+
+        async def run_async():
+            writer.write("Ran 1 tests\n")
+            await writer.flush_async()
+
+            self.assertEqual(stream.getvalue(), "Ran 1 tests\n")
+
+        asyncio.run(run_async())
+
+    def test_write__color(self):
+        stream = RecordingStream()
+
+        async def run_async(use_color: bool):
+            writer = ConsoleWriter(stream, use_color=use_color)
+            writer.write("F", debug.ERROR)
+            await writer.flush_async()
+
+        asyncio.run(run_async(use_color=False))
+        asyncio.run(run_async(use_color=True))
+
+        self.assertEqual(stream.writes, ["F", "\033[1;31mF\033[0m"])
+
+    def test_write__plain_if_not_a_terminal(self):
+        writer = ConsoleWriter(io.StringIO())
+
+        self.assertFalse(writer.use_color)
+
+
+class ColorConsoleReporterTests(unittest.TestCase):
+    def test_report_test_run_result_async__error_summary(self):
+        stream = RecordingStream()
+        reporter = ColorConsoleReporter(ConsoleWriter(stream))
+
+        async def run_async():
+            await reporter.report_test_run_started_async()
+            await reporter.report_test_result_async(
+                "test_a", True, TestResult("test_a", True)
+            )
+            await reporter.report_test_result_async(
+                "test_b",
+                False,
+                TestResult(
+                    "test_b",
+                    False,
+                    build_returncode=1,
+                    build_stdout=(b"! Undefined control sequence.\n",),
+                ),
+            )
+            await reporter.report_test_run_result_async()
+
+        asyncio.run(run_async())
+
+        output = stream.getvalue()
+        self.assertTrue(output.startswith("\n.B\n\n\nRan 2 tests, 1 failed."), output)
+        self.assertIn("  test_b\n    Build failed!\n", output)
+        self.assertIn("      ! Undefined control sequence.\n", output)
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+from ltxpect import asyncpopen
+from ltxpect.processpool import MemoryAwareProcessPool, read_available_memory
+
+
+class ReadAvailableMemoryTests(unittest.TestCase):
+    def test_read_available_memory(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            meminfo_path = os.path.join(tmp_dir, "meminfo")
+            with open(meminfo_path, "w") as fp:
+                fp.write(
+                    "MemTotal:        8000000 kB\n"
+                    "MemFree:          100000 kB\n"
+                    "MemAvailable:    4000000 kB\n"
+                )
+
+            self.assertEqual(read_available_memory(meminfo_path), 4000000 * 1024)
+
+    def test_read_available_memory__not_available(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.assertIsNone(
+                read_available_memory(os.path.join(tmp_dir, "does-not-exist"))
+            )
+
+
+class MemoryAwareProcessPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.num_running = 0
+        self.max_num_running = 0
+        self.available_memory: int | None = None
+
+    def _create_pool(
+        self, num_slots: int, memory_budget: int | None, rss_estimate: int
+    ) -> MemoryAwareProcessPool:
+        pool = MemoryAwareProcessPool(
+            num_slots, memory_budget, get_available_memory=lambda: self.available_memory
+        )
+        pool.DEFAULT_RSS_ESTIMATE = rss_estimate
+        return pool
+
+    async def _run_job_async(self, pool: MemoryAwareProcessPool, tool: str) -> None:
+        async with pool.acquire(tool):
+            self.num_running += 1
+            self.max_num_running = max(self.max_num_running, self.num_running)
+            await asyncio.sleep(0.01)
+            self.num_running -= 1
+
+    def _run_jobs(self, pool: MemoryAwareProcessPool, tools: list[str]) -> None:
+        async def run_async():
+            await asyncio.gather(*(self._run_job_async(pool, x) for x in tools))
+
+        asyncio.run(run_async())
+
+    def test_acquire__limited_by_slots(self):
+        pool = self._create_pool(num_slots=3, memory_budget=None, rss_estimate=100)
+
+        self._run_jobs(pool, ["gs"] * 10)
+
+        self.assertEqual(self.max_num_running, 3)
+
+    def test_acquire__limited_by_memory_budget(self):
+        pool = self._create_pool(num_slots=8, memory_budget=1000, rss_estimate=400)
+
+        self._run_jobs(pool, ["gs"] * 10)
+
+        self.assertEqual(self.max_num_running, 2)
+
+    def test_acquire__limited_by_available_memory(self):
+        pool = self._create_pool(num_slots=8, memory_budget=10000, rss_estimate=400)
+        self.available_memory = 500
+
+        self._run_jobs(pool, ["gs"] * 10)
+
+        # The available memory is not reduced by the running jobs here, but
+        # each job must still fit within it
+        self.assertEqual(self.max_num_running, 8)
+
+        self.max_num_running = 0
+        self.available_memory = 300
+
+        self._run_jobs(pool, ["gs"] * 10)
+
+        self.assertEqual(self.max_num_running, 1)
+
+    def test_acquire__job_larger_than_budget_runs_alone(self):
+        pool = self._create_pool(num_slots=8, memory_budget=100, rss_estimate=400)
+
+        self._run_jobs(pool, ["gs"] * 3)
+
+        self.assertEqual(self.max_num_running, 1)
+
+    def test_acquire__cancelled_waiter_does_not_hold_slot(self):
+        pool = self._create_pool(num_slots=1, memory_budget=None, rss_estimate=100)
+
+        async def run_async():
+            first_job = asyncio.create_task(self._run_job_async(pool, "gs"))
+            await asyncio.sleep(0)
+
+            cancelled_job = asyncio.create_task(self._run_job_async(pool, "gs"))
+            await asyncio.sleep(0)
+            cancelled_job.cancel()
+
+            await first_job
+            with self.assertRaises(asyncio.CancelledError):
+                await cancelled_job
+
+            await asyncio.wait_for(self._run_job_async(pool, "gs"), timeout=1.0)
+
+        asyncio.run(run_async())
+
+        self.assertEqual(self.max_num_running, 1)
+
+    @unittest.skipIf(
+        sys.platform == "win32", "resource usage is not available on Windows"
+    )
+    def test_acquire__learns_rss_estimate_from_processes(self):
+        pool = self._create_pool(num_slots=1, memory_budget=None, rss_estimate=1)
+
+        async def run_async():
+            async with pool.acquire("python"):
+                return await asyncpopen.popen_async(
+                    asyncio.get_running_loop(), [sys.executable, "-c", "pass"]
+                )
+
+        result = asyncio.run(run_async())
+
+        self.assertIsNotNone(result.resource_usage.max_rss)
+        self.assertEqual(pool.get_rss_estimate("python"), result.resource_usage.max_rss)
+        self.assertEqual(pool.get_rss_estimate("other"), 1)
+
+    @unittest.skipIf(
+        sys.platform == "win32", "resource usage is not available on Windows"
+    )
+    def test_acquire__rss_estimates_adapt_to_concurrent_processes(self):
+        pool = self._create_pool(num_slots=2, memory_budget=None, rss_estimate=1)
+        allocation_size = 256 * 1024 * 1024
+        code = "import sys, time; b = bytearray(int(sys.argv[1])); time.sleep(0.5)"
+
+        async def run_job_async(tool, size):
+            async with pool.acquire(tool):
+                return await asyncpopen.popen_async(
+                    asyncio.get_running_loop(),
+                    [sys.executable, "-c", code, str(size)],
+                )
+
+        async def run_async():
+            first = await asyncio.gather(
+                run_job_async("large", allocation_size), run_job_async("small", 0)
+            )
+            learned_estimate = pool.get_rss_estimate("small")
+
+            second = await run_job_async("small", 2 * allocation_size)
+            return first, learned_estimate, second
+
+        (large, small), learned_estimate, larger = asyncio.run(run_async())
+
+        # Each tool learns from its own processes, even when they run (and
+        # exit) at the same time
+        self.assertEqual(learned_estimate, small.resource_usage.max_rss)
+        self.assertLess(learned_estimate, allocation_size)
+        self.assertEqual(pool.get_rss_estimate("large"), large.resource_usage.max_rss)
+        self.assertGreaterEqual(pool.get_rss_estimate("large"), allocation_size)
+
+        # The estimate grows with a larger process
+        self.assertEqual(pool.get_rss_estimate("small"), larger.resource_usage.max_rss)
+        self.assertGreaterEqual(pool.get_rss_estimate("small"), 2 * allocation_size)
+
+    def test_acquire__assigns_lowest_free_slot(self):
+        pool = self._create_pool(num_slots=3, memory_budget=None, rss_estimate=100)
+        slots: list[int] = []
+
+        async def run_job_async(duration: float) -> None:
+            async with pool.acquire("gs") as slot:
+                slots.append(slot)
+                await asyncio.sleep(duration)
+
+        async def run_async():
+            await asyncio.gather(
+                run_job_async(0.05), run_job_async(0.01), run_job_async(0.05)
+            )
+            await run_job_async(0)
+
+        asyncio.run(run_async())
+
+        self.assertEqual(slots, [0, 1, 2, 0])
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from ltxpect.rasterizedpagecache import FileSystemRasterizedPageCache
+
+
+class FileSystemRasterizedPageCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.cache_dir = os.path.join(self.tmpdir, "cache")
+        self.pdf_path = os.path.join(self.tmpdir, "doc.pdf")
+        self.png_path_template = os.path.join(self.tmpdir, "page-%d.png")
+        self.output_png_path_template = os.path.join(self.tmpdir, "output-%d.png")
+
+        self._write_file(self.pdf_path, b"%PDF-1.5 original")
+        for page_num in (1, 2, 3):
+            self._write_file(self._png_path(page_num), b"%d" % page_num * 100)
+
+    def _write_file(self, path: str, content: bytes) -> None:
+        with open(path, "wb") as fp:
+            fp.write(content)
+
+    def _read_file(self, path: str) -> bytes:
+        with open(path, "rb") as fp:
+            return fp.read()
+
+    def _png_path(self, page_num: int) -> str:
+        return self.png_path_template.replace("%d", str(page_num))
+
+    def _output_png_path(self, page_num: int) -> str:
+        return self.output_png_path_template.replace("%d", str(page_num))
+
+    def _get_pages(self, cache, page_nums, rasterizer_settings="gs -r150"):
+        return asyncio.run(
+            cache.get_pages_async(
+                self.pdf_path,
+                page_nums,
+                rasterizer_settings,
+                self.output_png_path_template,
+            )
+        )
+
+    def _put_pages(self, cache, page_nums, rasterizer_settings="gs -r150"):
+        asyncio.run(
+            cache.put_pages_async(
+                self.pdf_path, page_nums, rasterizer_settings, self.png_path_template
+            )
+        )
+
+    def test_get_pages__pages_not_cached__returns_no_pages(self):
+        cache = FileSystemRasterizedPageCache(self.cache_dir)
+
+        self.assertEqual(self._get_pages(cache, [1, 2]), [])
+        self.assertFalse(os.path.exists(self._output_png_path(1)))
+
+    def test_get_pages__pages_cached__copies_pngs(self):
+        cache = FileSystemRasterizedPageCache(self.cache_dir)
+        self._put_pages(cache, [1, 3])
+
+        # Use a new cache instance, to verify that the cache is persistent
+        cache = FileSystemRasterizedPageCache(self.cache_dir)
+
+        self.assertEqual(self._get_pages(cache, [1, 2, 3]), [1, 3])
+        self.assertEqual(self._read_file(self._output_png_path(1)), b"1" * 100)
+        self.assertEqual(self._read_file(self._output_png_path(3)), b"3" * 100)
+        self.assertFalse(os.path.exists(self._output_png_path(2)))
+
+    def test_get_pages__different_key__returns_no_pages(self):
+        cache = FileSystemRasterizedPageCache(self.cache_dir)
+        self._put_pages(cache, [1])
+
+        self.assertEqual(self._get_pages(cache, [2]), [])
+        self.assertEqual(self._get_pages(cache, [1], "gs -r300"), [])
+
+        self._write_file(self.pdf_path, b"%PDF-1.5 regenerated prototype")
+
+        self.assertEqual(self._get_pages(cache, [1]), [])
+
+    def test_put_pages__cache_full__evicts_least_recently_used(self):
+        cache = FileSystemRasterizedPageCache(self.cache_dir, max_size_bytes=250)
+        self._put_pages(cache, [1, 2])
+
+        # Touch page 1, so that page 2 becomes the least recently used page
+        self.assertEqual(self._get_pages(cache, [1]), [1])
+
+        self._put_pages(cache, [3])
+
+        self.assertEqual(self._get_pages(cache, [1, 2, 3]), [1, 3])
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
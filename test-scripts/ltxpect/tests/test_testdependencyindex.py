@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+
+from ltxpect.testdependencyindex import (
+    FileSystemTestDependencyIndex,
+    read_latex_recorder_inputs,
+)
+
+
+class ReadLatexRecorderInputsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+    def test_read_inputs__skips_outputs_and_resolves_relative_paths(self):
+        # Arrange
+
+        fls_path = os.path.join(self.tmpdir, "output.fls")
+        with open(fls_path, "w") as fp:
+            fp.write(
+                "PWD /home/user/test/tests\n"
+                "INPUT /usr/share/texlive/texmf-dist/web2c/pdftex/pdflatex.fmt\n"
+                "INPUT test.tex\n"
+                "OUTPUT ../.build/test/output.log\n"
+                "INPUT /texmf/tex/latex/ult-base/ult-upsc.sty\n"
+                "INPUT /texmf/tex/latex/ult-base/ult-upsc.sty\n"
+                "INPUT ../.build/test/output.aux\n"
+                "OUTPUT ../.build/test/output.aux\n"
+            )
+
+        # Act
+
+        inputs = read_latex_recorder_inputs(fls_path)
+
+        # Assert
+
+        self.assertEqual(
+            inputs,
+            [
+                os.path.normpath(
+                    "/usr/share/texlive/texmf-dist/web2c/pdftex/pdflatex.fmt"
+                ),
+                os.path.normpath("/home/user/test/tests/test.tex"),
+                os.path.normpath("/texmf/tex/latex/ult-base/ult-upsc.sty"),
+            ],
+        )
+
+
+class FileSystemTestDependencyIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.index_path = os.path.join(self.tmpdir, "index", "index.json")
+        self.tex_path = os.path.join(self.tmpdir, "test.tex")
+        self.sty_path = os.path.join(self.tmpdir, "ult-upsc.sty")
+
+        self._write_file(self.tex_path, "\\documentclass{article}")
+        self._write_file(self.sty_path, "\\ProvidesPackage{ult-upsc}")
+
+    def _write_file(self, path: str, content: str) -> None:
+        with open(path, "w") as fp:
+            fp.write(content)
+
+    def test_has_changed_inputs__unknown_test__returns_true(self):
+        index = FileSystemTestDependencyIndex(self.index_path)
+
+        self.assertTrue(index.has_changed_inputs("test"))
+
+    def test_has_changed_inputs__inputs_unchanged__returns_false(self):
+        index = FileSystemTestDependencyIndex(self.index_path)
+        index.record_test_inputs("test", [self.tex_path, self.sty_path])
+        index.save()
+
+        # Use a new index instance, to verify that the index is persistent
+        index = FileSystemTestDependencyIndex(self.index_path)
+
+        self.assertFalse(index.has_changed_inputs("test"))
+
+    def test_has_changed_inputs__input_changed__returns_true(self):
+        index = FileSystemTestDependencyIndex(self.index_path)
+        index.record_test_inputs("test", [self.tex_path, self.sty_path])
+        index.save()
+
+        self._write_file(self.sty_path, "\\ProvidesPackage{ult-upsc}[changed]")
+
+        index = FileSystemTestDependencyIndex(self.index_path)
+
+        self.assertTrue(index.has_changed_inputs("test"))
+
+    def test_has_changed_inputs__input_removed__returns_true(self):
+        index = FileSystemTestDependencyIndex(self.index_path)
+        index.record_test_inputs("test", [self.tex_path, self.sty_path])
+
+        os.remove(self.sty_path)
+
+        self.assertTrue(index.has_changed_inputs("test"))
+
+    def test_forget_test__has_changed_inputs__returns_true(self):
+        index = FileSystemTestDependencyIndex(self.index_path)
+        index.record_test_inputs("test", [self.tex_path])
+        index.forget_test("test")
+        index.save()
+
+        index = FileSystemTestDependencyIndex(self.index_path)
+
+        self.assertTrue(index.has_changed_inputs("test"))
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from ltxpect.testdurationhistory import FileSystemTestDurationHistory
+
+
+class FileSystemTestDurationHistoryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.history_path = os.path.join(self.tmpdir, ".build", "durations.json")
+
+    def test_get_duration__unknown_test(self):
+        history = FileSystemTestDurationHistory(self.history_path)
+
+        self.assertIsNone(history.get_duration("test_a"))
+
+    def test_record_duration__persisted_across_instances(self):
+        # Arrange
+
+        history = FileSystemTestDurationHistory(self.history_path)
+        history.record_duration("test_a", 12.5)
+
+        # Act
+
+        history.save()
+
+        # Assert
+
+        history = FileSystemTestDurationHistory(self.history_path)
+        self.assertEqual(history.get_duration("test_a"), 12.5)
+        self.assertIsNone(history.get_duration("test_b"))
+
+    def test_record_duration__averages_with_previous_duration(self):
+        # Arrange
+
+        history = FileSystemTestDurationHistory(self.history_path)
+        history.record_duration("test_a", 10.0)
+
+        # Act
+
+        history.record_duration("test_a", 20.0)
+
+        # Assert
+
+        self.assertEqual(history.get_duration("test_a"), 15.0)
+
+    def test_load__ignores_corrupt_file(self):
+        # Arrange
+
+        os.makedirs(os.path.dirname(self.history_path))
+        with open(self.history_path, "w") as fp:
+            fp.write("{not json")
+
+        # Act
+
+        history = FileSystemTestDurationHistory(self.history_path)
+
+        # Assert
+
+        self.assertIsNone(history.get_duration("test_a"))
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock as mock
+
+from ltxpect.testresult import TestResult
+from ltxpect.testresultsjsonlinesreporter import (
+    TestResultsJsonLinesReporter,
+    load_test_results_json_lines,
+)
+from ltxpect.testresultsjsonreporter import TestResultsJsonReporter
+
+
+class TestResultsJsonLinesReporterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.jsonl_path = os.path.join(self.tmpdir, "test_result.jsonl")
+        self.json_path = os.path.join(self.tmpdir, "test_result.json")
+
+        self.test_results = [
+            (True, TestResult(test_name="test_a", build_succeeded=True)),
+            (
+                False,
+                TestResult(
+                    test_name="test_b",
+                    build_succeeded=False,
+                    build_returncode=1,
+                    build_stdout=(b"! Undefined control sequence.\n",),
+                    build_num_passes=2,
+                ),
+            ),
+            (
+                False,
+                TestResult(
+                    test_name="test_c",
+                    build_succeeded=True,
+                    build_num_passes=1,
+                    failed_pages=(3,),
+                ),
+            ),
+        ]
+
+    def _report_test_results_async(self, reporter, complete: bool = True):
+        async def run_async():
+            await reporter.report_test_run_started_async()
+            for test_passed, test_result in self.test_results:
+                await reporter.report_test_result_async(
+                    test_result.test_name, test_passed, test_result
+                )
+            if complete:
+                await reporter.report_test_run_result_async()
+
+        asyncio.run(run_async())
+
+    def test_report_test_result_async__written_immediately(self):
+        # Arrange
+
+        reporter = TestResultsJsonLinesReporter(self.jsonl_path)
+
+        # Act
+
+        self._report_test_results_async(reporter, complete=False)
+
+        # Assert
+
+        with open(self.jsonl_path, encoding="utf8") as fp:
+            records = [json.loads(line) for line in fp]
+
+        self.assertEqual(
+            [x["type"] for x in records], ["run_started", "test", "test", "test"]
+        )
+        self.assertEqual(
+            [x["test_name"] for x in records[1:]], ["test_a", "test_b", "test_c"]
+        )
+        self.assertNotIn("failure", records[1])
+        self.assertEqual(records[2]["failure"]["proc"]["returncode"], 1)
+
+        results = load_test_results_json_lines(self.jsonl_path)
+        self.assertFalse(results["complete"])
+        self.assertEqual(results["num_tests"], 3)
+
+    def test_report_test_result_async__synced_after_interval(self):
+        # Arrange
+
+        reporter = TestResultsJsonLinesReporter(self.jsonl_path)
+        reporter.FSYNC_BATCH_INTERVAL = 0.01
+
+        test_passed, test_result = self.test_results[0]
+
+        async def run_async():
+            await reporter.report_test_run_started_async()
+            self.assertEqual(fsync_mock.call_count, 1)
+
+            await reporter.report_test_result_async(
+                test_result.test_name, test_passed, test_result
+            )
+            self.assertEqual(fsync_mock.call_count, 1)
+
+            # Act
+
+            await asyncio.sleep(0.05)
+
+        with mock.patch("ltxpect.testresultsjsonlinesreporter.os.fsync") as fsync_mock:
+            asyncio.run(run_async())
+
+        # Assert
+
+        # The record is synced without waiting for the next record
+        self.assertEqual(fsync_mock.call_count, 2)
+
+    def test_load_test_results_json_lines__same_as_json_reporter(self):
+        # Arrange
+
+        self._report_test_results_async(TestResultsJsonReporter(self.json_path))
+        self._report_test_results_async(TestResultsJsonLinesReporter(self.jsonl_path))
+
+        # Act
+
+        results = load_test_results_json_lines(self.jsonl_path)
+
+        # Assert
+
+        with open(self.json_path, encoding="utf8") as fp:
+            expected_results = json.load(fp)
+
+        self.assertTrue(results.pop("complete"))
+        self.assertEqual(results, expected_results)
+
+    def test_load_test_results_json_lines__partially_written_record(self):
+        # Arrange
+
+        self._report_test_results_async(
+            TestResultsJsonLinesReporter(self.jsonl_path), complete=False
+        )
+        with open(self.jsonl_path, "a", encoding="utf8") as fp:
+            fp.write('{"type": "test", "test_na')
+
+        # Act
+
+        results = load_test_results_json_lines(self.jsonl_path)
+
+        # Assert
+
+        self.assertFalse(results["complete"])
+        self.assertEqual(results["num_tests"], 3)
+        self.assertEqual(
+            [x["test_name"] for x in results["failed_tests"]], ["test_b", "test_c"]
+        )
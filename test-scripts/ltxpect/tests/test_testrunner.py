@@ -0,0 +1,199 @@
+import asyncio
+import unittest
+import unittest.mock as mock
+
+from ltxpect.asyncpopen import AsyncPopenResourceUsage
+from ltxpect.paths import SystemPathUtil
+from ltxpect.testresult import TestResult
+from ltxpect.testrunner import TestRunner, TestRunnerConfig
+
+
+class TestRunnerWarmupTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.warmup_keys = {
+            "test_a": "ntnuthesis",
+            "test_b": "ntnuthesis",
+            "test_c": "ntnuthesis,ult-glossaries",
+        }
+
+        self.max_concurrent_warmups = 0
+        self.num_concurrent_warmups = 0
+
+        async def run_warmup_compile_for_test_async(ctx, test_name):
+            self.num_concurrent_warmups += 1
+            self.max_concurrent_warmups = max(
+                self.max_concurrent_warmups, self.num_concurrent_warmups
+            )
+            await asyncio.sleep(0.01)
+            self.num_concurrent_warmups -= 1
+
+        self.engine = mock.Mock()
+        self.engine.get_warmup_compile_key.side_effect = (
+            lambda ctx, test_name: self.warmup_keys[test_name]
+        )
+        self.engine.run_warmup_compile_for_test_async = mock.AsyncMock(
+            side_effect=run_warmup_compile_for_test_async
+        )
+        self.engine.run_test_async = mock.AsyncMock(
+            side_effect=lambda ctx, test_name: TestResult(test_name, True)
+        )
+        self.engine.finish_test_run_async = mock.AsyncMock()
+
+        self.reporter = mock.AsyncMock()
+
+    def test_run__warmup_enabled__warms_up_one_test_per_key_concurrently(self):
+        # Arrange
+
+        runner = TestRunner(
+            TestRunnerConfig(run_warmup_compile_before_tests=True),
+            self.engine,
+            self.reporter,
+            SystemPathUtil(),
+        )
+
+        # Act
+
+        retcode = asyncio.run(runner.run_async(["test_a", "test_b", "test_c"]))
+
+        # Assert
+
+        self.assertEqual(retcode, 0)
+        self.assertEqual(
+            [
+                x.args[1]
+                for x in self.engine.run_warmup_compile_for_test_async.await_args_list
+            ],
+            ["test_a", "test_c"],
+        )
+        self.assertEqual(self.max_concurrent_warmups, 2)
+        self.assertEqual(
+            self.reporter.report_warmup_compile_progress_async.await_count, 2
+        )
+        self.assertEqual(self.engine.run_test_async.await_count, 3)
+
+    def test_run__warmup_cache__skips_warm_keys_and_marks_new_keys(self):
+        # Arrange
+
+        self.engine.run_warmup_compile_for_test_async.side_effect = None
+        self.engine.run_warmup_compile_for_test_async.return_value = True
+
+        warmup_cache = mock.Mock()
+        warmup_cache.is_warm.side_effect = lambda warmup_key: warmup_key == "ntnuthesis"
+
+        runner = TestRunner(
+            TestRunnerConfig(run_warmup_compile_before_tests=True),
+            self.engine,
+            self.reporter,
+            SystemPathUtil(),
+            warmup_cache=warmup_cache,
+        )
+
+        # Act
+
+        asyncio.run(runner.run_async(["test_a", "test_b", "test_c"]))
+
+        # Assert
+
+        self.engine.run_warmup_compile_for_test_async.assert_awaited_once()
+        self.assertEqual(
+            self.engine.run_warmup_compile_for_test_async.await_args.args[1], "test_c"
+        )
+        warmup_cache.mark_warm.assert_called_once_with("ntnuthesis,ult-glossaries")
+
+
+class TestRunnerSchedulingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.started_tests: list[str] = []
+
+        async def run_test_async(ctx, test_name):
+            self.started_tests.append(test_name)
+            return TestResult(
+                test_name,
+                True,
+                build_resource_usage=AsyncPopenResourceUsage(wall_time=2.0),
+                rasterize_resource_usage=AsyncPopenResourceUsage(wall_time=0.5),
+            )
+
+        self.engine = mock.Mock()
+        self.engine.run_test_async = mock.AsyncMock(side_effect=run_test_async)
+        self.engine.finish_test_run_async = mock.AsyncMock()
+
+        self.reporter = mock.AsyncMock()
+
+        self.durations = {"test_a": 1.0, "test_c": 30.0, "test_d": 10.0}
+
+        self.duration_history = mock.Mock()
+        self.duration_history.get_duration.side_effect = self.durations.get
+
+    def _create_runner(self) -> TestRunner:
+        return TestRunner(
+            TestRunnerConfig(),
+            self.engine,
+            self.reporter,
+            SystemPathUtil(),
+            duration_history=self.duration_history,
+        )
+
+    def test_run__starts_longest_tests_first(self):
+        # Arrange
+
+        runner = self._create_runner()
+
+        # Act
+
+        asyncio.run(runner.run_async(["test_a", "test_b", "test_c", "test_d"]))
+
+        # Assert
+
+        # test_b has not been run before, and is expected to take the average
+        # duration of the other tests
+        self.assertEqual(self.started_tests, ["test_c", "test_b", "test_d", "test_a"])
+
+    def test_run__no_known_durations__keeps_order(self):
+        # Arrange
+
+        self.durations.clear()
+        runner = self._create_runner()
+
+        # Act
+
+        asyncio.run(runner.run_async(["test_d", "test_a", "test_c"]))
+
+        # Assert
+
+        self.assertEqual(self.started_tests, ["test_d", "test_a", "test_c"])
+
+    def test_run__records_process_durations_and_saves(self):
+        # Arrange
+
+        runner = self._create_runner()
+
+        # Act
+
+        asyncio.run(runner.run_async(["test_a", "test_b"]))
+
+        # Assert
+
+        self.assertEqual(
+            sorted(
+                x.args for x in self.duration_history.record_duration.call_args_list
+            ),
+            [("test_a", 2.5), ("test_b", 2.5)],
+        )
+        self.duration_history.save.assert_called_once_with()
+
+    def test_run__no_tests__reports_empty_run(self):
+        # Arrange
+
+        runner = self._create_runner()
+
+        # Act
+
+        retcode = asyncio.run(runner.run_async([]))
+
+        # Assert
+
+        self.assertEqual(retcode, 0)
+        self.engine.run_test_async.assert_not_awaited()
+        self.reporter.report_test_run_started_async.assert_awaited_once_with()
+        self.reporter.report_test_run_result_async.assert_awaited_once_with()
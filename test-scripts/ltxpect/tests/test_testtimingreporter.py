@@ -0,0 +1,106 @@
+import asyncio
+import io
+import unittest
+
+from ltxpect.testresult import TestResult, TestStage, TestStageTiming
+from ltxpect.testtimingreporter import percentile, TestTimingReporter
+
+
+def _timing(stage: TestStage, start_time: float, end_time: float, num_pages=None):
+    return TestStageTiming(
+        stage=stage, start_time=start_time, end_time=end_time, num_pages=num_pages
+    )
+
+
+class PercentileTests(unittest.TestCase):
+    def test_percentile(self):
+        values = [float(x) for x in range(1, 101)]
+
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.9), 90.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile(values, 0.0), 1.0)
+        self.assertEqual(percentile(values, 1.0), 100.0)
+
+    def test_percentile__single_value(self):
+        self.assertEqual(percentile([3.0], 0.99), 3.0)
+
+
+class TestTimingReporterTests(unittest.TestCase):
+    def _report_test_results(
+        self, reporter: TestTimingReporter, test_results: list[TestResult]
+    ) -> None:
+        async def run_async():
+            for test_result in test_results:
+                await reporter.report_test_result_async(
+                    test_result.test_name, True, test_result
+                )
+
+        asyncio.run(run_async())
+
+    def test_report_test_result_async__per_page_latencies(self):
+        # Arrange
+
+        reporter = TestTimingReporter(io.StringIO())
+
+        test_result = TestResult(
+            "test_a",
+            True,
+            stage_timings=(
+                _timing(TestStage.BUILD_QUEUE, 0.0, 1.0),
+                _timing(TestStage.BUILD, 1.0, 4.0),
+                _timing(TestStage.RASTERIZE, 4.0, 8.0, num_pages=4),
+                _timing(TestStage.COMPARE, 8.0, 8.5, num_pages=1),
+                _timing(TestStage.COMPARE, 8.0, 9.0, num_pages=1),
+            ),
+        )
+
+        # Act
+
+        self._report_test_results(reporter, [test_result])
+
+        # Assert
+
+        self.assertEqual(reporter.stage_latencies[TestStage.BUILD], [3.0])
+        self.assertEqual(reporter.stage_latencies[TestStage.RASTERIZE], [1.0])
+        self.assertEqual(reporter.stage_latencies[TestStage.COMPARE], [0.5, 1.0])
+        self.assertEqual(reporter.stage_total_times[TestStage.RASTERIZE], 4.0)
+        self.assertEqual(reporter.num_pages_rasterized, 4)
+
+    def test_report_test_run_result_async__critical_path_is_last_test(self):
+        # Arrange
+
+        output = io.StringIO()
+        reporter = TestTimingReporter(output)
+        reporter.run_start_time = 0.0
+
+        test_results = [
+            TestResult(
+                "test_slow",
+                True,
+                stage_timings=(
+                    _timing(TestStage.BUILD_QUEUE, 0.0, 0.0),
+                    _timing(TestStage.BUILD, 0.0, 20.0),
+                ),
+            ),
+            TestResult(
+                "test_fast",
+                True,
+                stage_timings=(
+                    _timing(TestStage.BUILD_QUEUE, 0.0, 1.0),
+                    _timing(TestStage.BUILD, 1.0, 2.0),
+                ),
+            ),
+        ]
+
+        # Act
+
+        self._report_test_results(reporter, test_results)
+        asyncio.run(reporter.report_test_run_result_async())
+
+        # Assert
+
+        report = output.getvalue()
+        self.assertIn("2 tests", report)
+        self.assertIn("Critical path (test_slow):", report)
+        self.assertRegex(report, r"\n  build\s+2\s+21\.0s\s+1\.00s\s+20\.00s")
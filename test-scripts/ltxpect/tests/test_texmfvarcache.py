@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from ltxpect.texmfvarcache import get_tex_distribution_key, TexmfVarWarmupCache
+
+
+class GetTexDistributionKeyTests(unittest.TestCase):
+    def test_tex_live__returns_tl_year(self):
+        self.assertEqual(
+            get_tex_distribution_key(
+                "pdfTeX 3.141592653-2.6-1.40.27 (TeX Live 2025)\nkpathsea version 6.4.1\n"
+            ),
+            "tl2025",
+        )
+
+    def test_miktex__returns_miktex_version(self):
+        self.assertEqual(
+            get_tex_distribution_key("MiKTeX-pdfTeX 4.21.0 (MiKTeX 25.4)\n"),
+            "miktex4.21.0",
+        )
+
+    def test_unknown__returns_stable_key(self):
+        key = get_tex_distribution_key("pdfTeX 3.14159265-2.6-1.40.21\n")
+
+        self.assertTrue(key.startswith("tex-"))
+        self.assertEqual(key, get_tex_distribution_key("pdfTeX 3.14159265-2.6-1.40.21"))
+
+
+class TexmfVarWarmupCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+    def test_env__points_at_versioned_directory(self):
+        cache = TexmfVarWarmupCache(self.tmpdir, "tl2025")
+
+        self.assertEqual(cache.env["TEXMFVAR"], os.path.join(self.tmpdir, "tl2025"))
+
+    def test_mark_warm__is_persistent_per_version(self):
+        cache = TexmfVarWarmupCache(self.tmpdir, "tl2025")
+        self.assertFalse(cache.is_warm("ntnuthesis"))
+
+        cache.mark_warm("ntnuthesis")
+
+        self.assertTrue(
+            TexmfVarWarmupCache(self.tmpdir, "tl2025").is_warm("ntnuthesis")
+        )
+        self.assertFalse(
+            TexmfVarWarmupCache(self.tmpdir, "tl2022").is_warm("ntnuthesis")
+        )
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from ltxpect import asyncpopen
+from ltxpect.chrometracereporter import ChromeTraceReporter
+from ltxpect.processpool import MemoryAwareProcessPool
+from ltxpect.testresult import TestResult, TestStage, TestStageTiming
+from ltxpect.tracing import record_trace, trace_test, TraceRecorder
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.tmpdir = tmpdir.name
+        self.addCleanup(tmpdir.cleanup)
+
+        self.trace_path = os.path.join(self.tmpdir, "trace.json")
+
+    def _read_slices(self) -> list[dict]:
+        with open(self.trace_path, encoding="utf8") as fp:
+            trace = json.load(fp)
+
+        return [x for x in trace["traceEvents"] if x["ph"] == "X"]
+
+    def test_record_trace__process_nested_in_pool_slot(self):
+        # Arrange
+
+        recorder = TraceRecorder()
+        reporter = ChromeTraceReporter(self.trace_path, recorder)
+        pool = MemoryAwareProcessPool(2, None, get_available_memory=lambda: None)
+
+        async def run_async():
+            with trace_test("test_a"):
+                async with pool.acquire("python"):
+                    await asyncpopen.popen_async(
+                        asyncio.get_running_loop(), [sys.executable, "-c", "pass"]
+                    )
+
+            await reporter.report_test_run_result_async()
+
+        # Act
+
+        with record_trace(recorder):
+            asyncio.run(run_async())
+
+        # Assert
+
+        slices = self._read_slices()
+        self.assertEqual(
+            [(x["name"], x["cat"], x["pid"], x["tid"]) for x in slices],
+            [
+                ("test_a", "test", 1, 1),
+                ("python", "stage", 1, 1),
+                (os.path.basename(sys.executable), "process", 1, 1),
+            ],
+        )
+
+        test_slice, _, process_slice = slices
+        self.assertGreaterEqual(process_slice["ts"], test_slice["ts"])
+        self.assertLessEqual(
+            process_slice["ts"] + process_slice["dur"],
+            test_slice["ts"] + test_slice["dur"],
+        )
+        self.assertEqual(process_slice["args"]["test"], "test_a")
+        self.assertEqual(process_slice["args"]["returncode"], 0)
+
+    def test_report_test_run_result_async__overlapping_tests_on_separate_lanes(self):
+        # Arrange
+
+        recorder = TraceRecorder()
+        reporter = ChromeTraceReporter(self.trace_path, recorder)
+
+        def create_test_result(test_name: str, start_time: float, end_time: float):
+            return TestResult(
+                test_name,
+                True,
+                stage_timings=(
+                    TestStageTiming(
+                        stage=TestStage.BUILD,
+                        start_time=recorder.origin_time + start_time,
+                        end_time=recorder.origin_time + end_time,
+                    ),
+                ),
+            )
+
+        test_results = [
+            create_test_result("test_a", 0, 2),
+            create_test_result("test_b", 1, 3),
+            create_test_result("test_c", 2, 4),
+        ]
+
+        async def run_async():
+            for test_result in test_results:
+                await reporter.report_test_result_async(
+                    test_result.test_name, True, test_result
+                )
+            await reporter.report_test_run_result_async()
+
+        # Act
+
+        asyncio.run(run_async())
+
+        # Assert
+
+        test_lanes = {
+            x["name"]: x["tid"]
+            for x in self._read_slices()
+            if x["pid"] == ChromeTraceReporter.TESTS_LANE_GROUP and x["cat"] == "test"
+        }
+        self.assertEqual(test_lanes, {"test_a": 0, "test_b": 1, "test_c": 0})
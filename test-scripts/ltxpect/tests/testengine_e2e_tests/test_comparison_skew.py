@@ -17,6 +17,7 @@ import ltxpect.testconfig
 import ltxpect.testengine
 import ltxpect.testresult
 from ltxpect import asyncpopen
+from ltxpect.buildtools.abc import LatexBuildResult
 from ltxpect.coreabc import IFileSystem, IExternalProgramLocator, IPathUtil
 from ltxpect.filesystem import FileSystem
 from ltxpect.shutilexternalprogramlocator import ShutilExternalProgramLocator
@@ -85,7 +86,7 @@ class PdfLatexTestBuilder:
         latex_build_dir_subpath: str,
         latex_jobname: str,
         timeout: float = 0,
-    ) -> asyncpopen.AsyncPopenResult:
+    ) -> LatexBuildResult:
         # Absolute path to the directory that contains the tex file
         texfile_parent_dir_path = self.path_util.path_join(
             base_dir, texfile_parent_dir_subpath
@@ -108,13 +109,15 @@ class PdfLatexTestBuilder:
             texfile_filename,
         ]
 
-        return await asyncpopen.popen_async(
+        returncode, stdout, stderr = await asyncpopen.popen_async(
             asyncio.get_running_loop(),
             cmd,
             cwd=texfile_parent_dir_path,
             timeout=timeout,
         )
 
+        return LatexBuildResult(returncode, stdout, stderr)
+
     @classmethod
     def create(
         cls: Type[Self], path_util: IPathUtil, locator: IExternalProgramLocator
@@ -351,9 +354,12 @@ class ComparisonSkewTestsMeta(type):
                     )
 
                     ctx = test_engine.create_test_run_context()
-                    without_skew_test_result: ltxpect.testresult.TestResult = (
-                        await test_engine.run_test_async(ctx, texfile_basename)
-                    )
+                    try:
+                        without_skew_test_result: ltxpect.testresult.TestResult = (
+                            await test_engine.run_test_async(ctx, texfile_basename)
+                        )
+                    finally:
+                        await test_engine.finish_test_run_async(ctx)
 
                     self.assertTrue(without_skew_test_result.build_succeeded)
                     self.assertEqual(without_skew_test_result.failed_pages, ())
@@ -375,9 +381,12 @@ class ComparisonSkewTestsMeta(type):
                     )
 
                     ctx = test_engine.create_test_run_context()
-                    with_skew_test_result: ltxpect.testresult.TestResult = (
-                        await test_engine.run_test_async(ctx, texfile_basename)
-                    )
+                    try:
+                        with_skew_test_result: ltxpect.testresult.TestResult = (
+                            await test_engine.run_test_async(ctx, texfile_basename)
+                        )
+                    finally:
+                        await test_engine.finish_test_run_async(ctx)
 
                     self.assertTrue(with_skew_test_result.build_succeeded)
                     self.assertNotEqual(with_skew_test_result.failed_pages, ())
@@ -0,0 +1,200 @@
+import asyncio
+import math
+import sys
+import time
+from typing import Sequence, TextIO, TYPE_CHECKING
+
+from .coreabc import ITestReporter
+from .testresult import TestResult, TestStage, TestStageTiming
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Return the specified percentile (as a fraction between 0 and 1) of a
+    non-empty sorted sequence of values, using the nearest-rank method.
+    """
+    assert sorted_values
+    assert 0 <= fraction <= 1
+
+    index = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+class TestTimingReporter:
+    """Reports where the time of a test run went, based on the stage timings
+    of each test. At the end of the test run, it writes the distribution of
+    the latencies of each stage (p50/p90/p99), the throughput of the test run,
+    and the critical path, i.e. the stages of the test that finished last.
+
+    The latencies of stages that process pages (e.g. rasterization) are per
+    page.
+    """
+
+    PERCENTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, output: TextIO = sys.stdout) -> None:
+        self.output = output
+
+        self.test_result_lock = asyncio.Lock()
+        self.run_start_time: float | None = None
+        self.num_tests_completed: int = 0
+        self.num_pages_rasterized: int = 0
+
+        # Maps stage -> latency of each occurrence of the stage (per page, for
+        # stages that process pages)
+        self.stage_latencies: dict[TestStage, list[float]] = {}
+
+        # Maps stage -> total time spent in the stage, across all tests
+        self.stage_total_times: dict[TestStage, float] = {}
+        self.per_page_stages: set[TestStage] = set()
+
+        # The test that finished last, and its stage timings
+        self.last_test_name: str | None = None
+        self.last_test_end_time: float | None = None
+        self.last_test_stage_timings: tuple[TestStageTiming, ...] = ()
+
+    async def report_warmup_compile_started_async(self) -> None:
+        """Report that the warmup compile step has started."""
+
+    async def report_warmup_compile_progress_async(self, test_name: str) -> None:
+        """Report that the warmup compile step has finished processing the
+        specified test.
+        """
+
+    async def report_warmup_compile_ended_async(self) -> None:
+        """Report that the warmup compile step has ended."""
+
+    async def report_test_run_started_async(self) -> None:
+        """Report that the test run has started."""
+
+        async with self.test_result_lock:
+            self.run_start_time = time.monotonic()
+
+    async def report_test_result_async(
+        self, test_name: str, test_passed: bool, test_result: TestResult
+    ) -> None:
+        """Report the result of a single test case after having been run."""
+
+        _ = test_passed
+
+        async with self.test_result_lock:
+            self.num_tests_completed += 1
+
+            for timing in test_result.stage_timings:
+                latency = timing.duration
+                if timing.num_pages:
+                    latency /= timing.num_pages
+                    self.per_page_stages.add(timing.stage)
+
+                self.stage_latencies.setdefault(timing.stage, []).append(latency)
+                self.stage_total_times[timing.stage] = (
+                    self.stage_total_times.get(timing.stage, 0) + timing.duration
+                )
+
+                if timing.stage == TestStage.RASTERIZE and timing.num_pages:
+                    self.num_pages_rasterized += timing.num_pages
+
+            if test_result.stage_timings:
+                end_time = max(x.end_time for x in test_result.stage_timings)
+                if (
+                    self.last_test_end_time is None
+                    or end_time > self.last_test_end_time
+                ):
+                    self.last_test_name = test_name
+                    self.last_test_end_time = end_time
+                    self.last_test_stage_timings = test_result.stage_timings
+
+    async def report_test_run_result_async(self) -> None:
+        """Report the result of the overall test run. The reporter is expected
+        to aggregate the information it has received about the result from
+        each individual test case.
+        """
+
+        async with self.test_result_lock:
+            self.output.write(self.format_report())
+            self.output.flush()
+
+    def format_report(self) -> str:
+        """Return the timing report for the results reported so far."""
+
+        run_start_time = self.run_start_time
+        if run_start_time is None:
+            run_start_time = min(
+                (x.start_time for x in self.last_test_stage_timings),
+                default=time.monotonic(),
+            )
+        wall_time = time.monotonic() - run_start_time
+
+        lines: list[str] = []
+        lines.append("Test timing report:")
+        lines.append(
+            "  {} tests in {:.1f} s ({:.1f} tests/min), {} pages rasterized "
+            "({:.1f} pages/s)".format(
+                self.num_tests_completed,
+                wall_time,
+                60 * self.num_tests_completed / wall_time if wall_time > 0 else 0,
+                self.num_pages_rasterized,
+                self.num_pages_rasterized / wall_time if wall_time > 0 else 0,
+            )
+        )
+        lines.append("")
+
+        lines.append(
+            "  {:<18}{:>7}{:>11}".format("Stage", "Count", "Total")
+            + "".join(
+                "{:>10}".format("p{:g}".format(100 * x)) for x in self.PERCENTILES
+            )
+            + "{:>10}".format("Max")
+        )
+        for stage in TestStage:
+            latencies = sorted(self.stage_latencies.get(stage, ()))
+            if not latencies:
+                continue
+
+            lines.append(
+                "  {:<18}{:>7}{:>10.1f}s".format(
+                    stage.value + ("/page" if stage in self.per_page_stages else ""),
+                    len(latencies),
+                    self.stage_total_times[stage],
+                )
+                + "".join(
+                    "{:>9.2f}s".format(percentile(latencies, x))
+                    for x in self.PERCENTILES
+                )
+                + "{:>9.2f}s".format(latencies[-1])
+            )
+
+        if self.last_test_name is not None:
+            lines.append("")
+            lines.append("  Critical path ({}):".format(self.last_test_name))
+
+            # Stages that occur once per page are shown as a single span
+            stage_spans: dict[TestStage, tuple[float, float, int]] = {}
+            for timing in self.last_test_stage_timings:
+                start_time, end_time, count = stage_spans.get(
+                    timing.stage, (timing.start_time, timing.end_time, 0)
+                )
+                stage_spans[timing.stage] = (
+                    min(start_time, timing.start_time),
+                    max(end_time, timing.end_time),
+                    count + 1,
+                )
+
+            for stage, (start_time, end_time, count) in sorted(
+                stage_spans.items(), key=lambda x: x[1][0]
+            ):
+                lines.append(
+                    "    {:<18}{:>9.1f}s -> {:>7.1f}s {:>9.1f}s{}".format(
+                        stage.value,
+                        start_time - run_start_time,
+                        end_time - run_start_time,
+                        end_time - start_time,
+                        " ({}x)".format(count) if count > 1 else "",
+                    )
+                )
+
+        lines.append("")
+        return "\n".join(lines) + "\n"
+
+
+if TYPE_CHECKING:
+    _: type[ITestReporter] = TestTimingReporter
@@ -0,0 +1,115 @@
+import contextlib
+import hashlib
+import json
+import os
+import re
+import subprocess
+from typing import Self, Type, TYPE_CHECKING
+
+from .coreabc import IExternalProgramLocator, IWarmupCache
+
+
+def get_tex_distribution_key(version_output: str) -> str:
+    """Return a key that identifies the TeX distribution and version, given the
+    output from running `pdflatex --version`. For TeX Live, the key matches the
+    naming of the prototype folders (e.g. "tl2025").
+    """
+    tl_match = re.search(r"\(TeX Live (\d{4})", version_output)
+    if tl_match is not None:
+        return "tl{}".format(tl_match.group(1))
+
+    miktex_match = re.search(r"MiKTeX-pdfTeX ([0-9.]+)", version_output)
+    if miktex_match is not None:
+        return "miktex{}".format(miktex_match.group(1))
+
+    first_line = version_output.strip().split("\n", 1)[0]
+    return "tex-{}".format(hashlib.sha256(first_line.encode("utf-8")).hexdigest()[:12])
+
+
+class TexmfVarWarmupCache:
+    """A persistent TEXMFVAR directory for each TeX distribution version, which
+    all builds are pointed at. Fonts, font maps and caches that are generated
+    on demand by a build end up in this directory, and are reused by later test
+    runs. The cache also records which warmup keys have already been warmed up
+    in the directory, such that the warmup compile is only done once for each.
+    """
+
+    WARM_KEYS_FILENAME = "ltxpect-warmup-keys.json"
+
+    def __init__(self, cache_root_dir: str, tex_distribution_key: str) -> None:
+        self.texmfvar_dir = os.path.abspath(
+            os.path.join(cache_root_dir, tex_distribution_key)
+        )
+
+        self._warm_keys_path = os.path.join(self.texmfvar_dir, self.WARM_KEYS_FILENAME)
+        self._warm_keys: set[str] | None = None
+
+    @property
+    def env(self) -> dict[str, str]:
+        """Environment variables that make a build use the cache directory."""
+        return {
+            "TEXMFVAR": self.texmfvar_dir,
+            "TEXMFCACHE": self.texmfvar_dir,
+        }
+
+    def _load_warm_keys(self) -> set[str]:
+        if self._warm_keys is not None:
+            return self._warm_keys
+
+        os.makedirs(self.texmfvar_dir, exist_ok=True)
+
+        try:
+            with open(self._warm_keys_path, "r", encoding="utf-8") as fp:
+                self._warm_keys = set(json.load(fp))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._warm_keys = set()
+
+        return self._warm_keys
+
+    def is_warm(self, warmup_key: str) -> bool:
+        """Return whether a warmup compile has already been done for the
+        specified warmup key.
+        """
+        return warmup_key in self._load_warm_keys()
+
+    def mark_warm(self, warmup_key: str) -> None:
+        """Record that a warmup compile has been done for the specified warmup
+        key.
+        """
+        warm_keys = self._load_warm_keys()
+        warm_keys.add(warmup_key)
+
+        tmp_warm_keys_path = "{}.{}.tmp".format(self._warm_keys_path, os.getpid())
+
+        try:
+            with open(tmp_warm_keys_path, "w", encoding="utf-8") as fp:
+                json.dump(sorted(warm_keys), fp, indent=1)
+            os.replace(tmp_warm_keys_path, self._warm_keys_path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_warm_keys_path)
+
+    @classmethod
+    def create(
+        cls: Type[Self], locator: IExternalProgramLocator, cache_root_dir: str
+    ) -> Self:
+        pdflatex_cmd = locator.find_program("pdflatex", ["pdflatex"])
+
+        pdflatex_version = subprocess.run(
+            [pdflatex_cmd, "--version"],
+            env=os.environ,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+
+        return cls(
+            cache_root_dir,
+            get_tex_distribution_key(
+                pdflatex_version.stdout.decode("utf-8", errors="replace")
+            ),
+        )
+
+
+if TYPE_CHECKING:
+    _: type[IWarmupCache] = TexmfVarWarmupCache
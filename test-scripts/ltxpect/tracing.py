@@ -0,0 +1,208 @@
+import contextlib
+import json
+import os
+import shlex
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Any
+
+from . import asyncpopen
+
+
+class TraceRecorder:
+    """Records a trace of a test run in the Trace Event Format, such that it
+    can be opened in a timeline viewer such as https://ui.perfetto.dev or
+    chrome://tracing.
+
+    Each slice is placed on a lane (a "thread" in the trace), and lanes are
+    grouped (as "processes" in the trace). Slices on the same lane should
+    either be nested or not overlap.
+    """
+
+    POOL_LANE_GROUP = 1
+    """The lane group with a lane for each process pool slot."""
+
+    def __init__(self) -> None:
+        self.events: list[dict[str, Any]] = []
+        self.origin_time = time.monotonic()
+
+        # (lane group, lane) -> lane name
+        self.lane_names: dict[tuple[int, int], str] = {}
+        self.lane_group_names: dict[int, str] = {self.POOL_LANE_GROUP: "Process pool"}
+
+    def add_slice(
+        self,
+        *,
+        name: str,
+        category: str,
+        lane_group: int,
+        lane: int,
+        start_time: float,
+        end_time: float,
+        args: dict[str, Any] | None = None,
+    ) -> None:
+        """Add a slice, with start and end times as returned by
+        time.monotonic().
+        """
+        event: dict[str, Any] = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_time - self.origin_time) * 1e6,
+            "dur": max(end_time - start_time, 0) * 1e6,
+            "pid": lane_group,
+            "tid": lane,
+        }
+        if args:
+            event["args"] = args
+
+        self.events.append(event)
+
+    def add_process(self, process_info: asyncpopen.AsyncPopenProcessInfo) -> None:
+        """Add a slice for a child process, on the lane of the process pool
+        slot that it was run in.
+        """
+        slot = _current_pool_slot.get()
+        lane = 0 if slot is None else slot + 1
+        if lane == 0:
+            self.lane_names[(self.POOL_LANE_GROUP, 0)] = "Not pooled"
+
+        resource_usage = process_info.resource_usage
+        self.add_slice(
+            name=os.path.basename(process_info.args[0]),
+            category="process",
+            lane_group=self.POOL_LANE_GROUP,
+            lane=lane,
+            start_time=process_info.start_time,
+            end_time=process_info.end_time,
+            args={
+                "test": _current_test_name.get(),
+                "command": shlex.join(process_info.args),
+                "pid": process_info.pid,
+                "returncode": process_info.returncode,
+                "user_time": resource_usage.user_time,
+                "system_time": resource_usage.system_time,
+                "max_rss": resource_usage.max_rss,
+            },
+        )
+
+    def write(self, trace_path: str) -> None:
+        """Write the trace to a JSON file."""
+
+        metadata_events: list[dict[str, Any]] = []
+        for lane_group, name in sorted(self.lane_group_names.items()):
+            metadata_events.append(
+                {
+                    "name": "process_name",
+                    "ph": "M",
+                    "pid": lane_group,
+                    "args": {"name": name},
+                }
+            )
+        for (lane_group, lane), name in sorted(self.lane_names.items()):
+            metadata_events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": lane_group,
+                    "tid": lane,
+                    "args": {"name": name},
+                }
+            )
+            metadata_events.append(
+                {
+                    "name": "thread_sort_index",
+                    "ph": "M",
+                    "pid": lane_group,
+                    "tid": lane,
+                    "args": {"sort_index": lane},
+                }
+            )
+
+        # Order enclosing slices before the slices nested in them
+        events = sorted(self.events, key=lambda x: (x["ts"], -x["dur"]))
+
+        with open(trace_path, "w", encoding="utf8") as fp:
+            json.dump(
+                {"traceEvents": metadata_events + events, "displayTimeUnit": "ms"},
+                fp,
+            )
+
+
+_active_trace_recorder: ContextVar[TraceRecorder | None] = ContextVar(
+    "_active_trace_recorder", default=None
+)
+_current_test_name: ContextVar[str | None] = ContextVar(
+    "_current_test_name", default=None
+)
+_current_pool_slot: ContextVar[int | None] = ContextVar(
+    "_current_pool_slot", default=None
+)
+
+
+@contextlib.contextmanager
+def record_trace(recorder: TraceRecorder) -> Iterator[TraceRecorder]:
+    """Record the process pool slots and child processes that are used within
+    the block (including from tasks that are created within the block).
+    """
+    token = _active_trace_recorder.set(recorder)
+    try:
+        with asyncpopen.observe_processes(recorder.add_process):
+            yield recorder
+    finally:
+        _active_trace_recorder.reset(token)
+
+
+@contextlib.contextmanager
+def trace_test(test_name: str) -> Iterator[None]:
+    """Attribute the process pool slots and child processes that are used
+    within the block to the specified test.
+    """
+    token = _current_test_name.set(test_name)
+    try:
+        yield
+    finally:
+        _current_test_name.reset(token)
+
+
+@contextlib.contextmanager
+def trace_pool_slot(slot: int, tool: str) -> Iterator[None]:
+    """Record that the process pool slot is held for the specified tool for the
+    duration of the block. The slot is shown as a slice for the test, with a
+    nested slice for the tool, which the child processes are nested in.
+    """
+    recorder = _active_trace_recorder.get()
+    token = _current_pool_slot.set(slot)
+    start_time = time.monotonic()
+    try:
+        yield
+    finally:
+        _current_pool_slot.reset(token)
+
+        if recorder is not None:
+            end_time = time.monotonic()
+            lane = slot + 1
+            recorder.lane_names[(recorder.POOL_LANE_GROUP, lane)] = "Slot {}".format(
+                slot
+            )
+
+            test_name = _current_test_name.get()
+            if test_name is not None:
+                recorder.add_slice(
+                    name=test_name,
+                    category="test",
+                    lane_group=recorder.POOL_LANE_GROUP,
+                    lane=lane,
+                    start_time=start_time,
+                    end_time=end_time,
+                )
+            recorder.add_slice(
+                name=tool,
+                category="stage",
+                lane_group=recorder.POOL_LANE_GROUP,
+                lane=lane,
+                start_time=start_time,
+                end_time=end_time,
+                args={"test": test_name},
+            )
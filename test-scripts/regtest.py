@@ -1,5 +1,6 @@
 import argparse
 import asyncio
+import contextlib
 import os
 import re
 import sys
@@ -7,20 +8,33 @@ from typing import cast, Callable
 
 import ltxpect
 import ltxpect.buildtools
+import ltxpect.buildtools.abc
 import ltxpect.buildtools.ghostscript
 import ltxpect.buildtools.imagemagick
-import ltxpect.buildtools.misc
+import ltxpect.buildtools.latexmk
+import ltxpect.buildtools.nativepdf
+import ltxpect.buildtools.nativepng
 import ltxpect.buildtools.pdfinfo
+import ltxpect.buildtools.pdflatex
+import ltxpect.buildtools.preambleformat
 import ltxpect.coreabc
 import ltxpect.paths
 from ltxpect.aggregatereporter import AggregateReporter
+from ltxpect.chrometracereporter import ChromeTraceReporter
 from ltxpect.colorconsolereporter import ColorConsoleReporter
 from ltxpect.filesystem import FileSystem
+from ltxpect.rasterizedpagecache import FileSystemRasterizedPageCache
 from ltxpect.shutilexternalprogramlocator import ShutilExternalProgramLocator
+from ltxpect.testdependencyindex import FileSystemTestDependencyIndex
+from ltxpect.testdurationhistory import FileSystemTestDurationHistory
+from ltxpect.texmfvarcache import TexmfVarWarmupCache
+from ltxpect.testresultsjsonlinesreporter import TestResultsJsonLinesReporter
 from ltxpect.testresultsjsonreporter import TestResultsJsonReporter
 from ltxpect.testconfig import TestConfig
 from ltxpect.testengine import TestEngine
 from ltxpect.testrunner import TestRunner, TestRunnerConfig
+from ltxpect.testtimingreporter import TestTimingReporter
+from ltxpect.tracing import record_trace, TraceRecorder
 
 
 def test_generator(
@@ -108,14 +122,75 @@ if __name__ == "__main__":
         default=False,
         help="whether to run a warmup compile step before executing the tests",
     )
+    parser.add_argument(
+        "--raster-cache-dir",
+        dest="raster_cache_dir",
+        type=str,
+        default=None,
+        help="a folder for caching rasterized prototype pages between test runs",
+    )
+    parser.add_argument(
+        "--concurrent-builds",
+        dest="num_concurrent_builds",
+        type=int,
+        default=None,
+        help="the maximum number of LaTeX builds to run concurrently (default: the number of concurrent processes)",
+    )
+    parser.add_argument(
+        "--process-memory-budget",
+        dest="process_memory_budget_mib",
+        type=int,
+        default=None,
+        help="the memory (in MiB) that the processes run by the tests may use (default: derived from the available memory)",
+    )
+    parser.add_argument(
+        "--changed-only",
+        dest="changed_only",
+        action="store_true",
+        help="only run tests whose input files have changed since they last passed",
+    )
+    parser.add_argument(
+        "--timing-report",
+        dest="timing_report",
+        action="store_true",
+        help="report where the time of the test run went, per test stage",
+    )
+    parser.add_argument(
+        "--trace",
+        dest="trace_path",
+        type=str,
+        default=None,
+        help="write a trace of the test run to the specified JSON file, for viewing in a timeline viewer such as https://ui.perfetto.dev",
+    )
+    parser.add_argument(
+        "--texmfvar-cache-dir",
+        dest="texmfvar_cache_dir",
+        type=str,
+        default=None,
+        help="a folder for persistent TEXMFVAR trees (one per TeX version) shared by all builds",
+    )
+    parser.add_argument(
+        "--preamble-format-cache-dir",
+        dest="preamble_format_cache_dir",
+        type=str,
+        default=None,
+        help="a folder for caching LaTeX formats with the test preambles preloaded",
+    )
+    parser.add_argument(
+        "--builder",
+        dest="builder",
+        choices=["latexmk", "pdflatex"],
+        default="latexmk",
+        help="whether to let latexmk decide the number of LaTeX passes, or to run pdflatex until the auxiliary files converge",
+    )
 
     args = parser.parse_args()
 
     path_util = ltxpect.paths.SystemPathUtil()
 
     external_program_locator = ShutilExternalProgramLocator()
-    pdf_doc_info_provider = (
-        ltxpect.buildtools.pdfinfo.PdfDocInfoProviderUsingExternalPdfInfoProgram.create(
+    pdf_doc_info_provider = ltxpect.buildtools.nativepdf.NativePdfDocInfoProvider(
+        fallback=ltxpect.buildtools.pdfinfo.PdfDocInfoProviderUsingExternalPdfInfoProgram.create(
             external_program_locator
         )
     )
@@ -125,47 +200,131 @@ if __name__ == "__main__":
         )
     )
     png_dimensions_inspector = (
-        ltxpect.buildtools.imagemagick.ImageMagickPngImageDimensionsInspector.create(
+        ltxpect.buildtools.nativepng.NativePngImageDimensionsInspector()
+    )
+    png_comparer = ltxpect.buildtools.nativepng.NativePngImageComparer(
+        fallback=ltxpect.buildtools.imagemagick.ImageMagickPngImageComparer.create(
             external_program_locator
         )
     )
-    png_comparer = ltxpect.buildtools.imagemagick.ImageMagickPngImageComparer.create(
-        external_program_locator
-    )
+    warmup_cache = None
+    if args.texmfvar_cache_dir is not None:
+        warmup_cache = TexmfVarWarmupCache.create(
+            external_program_locator, args.texmfvar_cache_dir
+        )
+
+    build_env = warmup_cache.env if warmup_cache is not None else None
+
+    preamble_format_provider = None
+    if args.preamble_format_cache_dir is not None:
+        preamble_format_provider = ltxpect.buildtools.preambleformat.MyLatexFormatPreambleFormatProvider.create(
+            external_program_locator,
+            args.preamble_format_cache_dir,
+            sty_dir=os.path.join(
+                os.path.dirname(os.path.abspath(__file__)),
+                "..",
+                "texmf-tds",
+                "tex",
+                "latex",
+                "ult-base",
+            ),
+            env=build_env,
+        )
+
+    latex_doc_buildtool: ltxpect.buildtools.abc.ILatexDocumentBuildTool
+    if args.builder == "pdflatex":
+        latex_doc_buildtool = (
+            ltxpect.buildtools.pdflatex.PdflatexPassLoopTestBuilder.create(
+                external_program_locator,
+                path_util,
+                env=build_env,
+                preamble_format_provider=preamble_format_provider,
+            )
+        )
+    else:
+        latex_doc_buildtool = ltxpect.buildtools.latexmk.LatexmkTestBuilder.create(
+            external_program_locator,
+            path_util,
+            env=build_env,
+            preamble_format_provider=preamble_format_provider,
+        )
+
+    rasterized_page_cache = None
+    if args.raster_cache_dir is not None:
+        rasterized_page_cache = FileSystemRasterizedPageCache(args.raster_cache_dir)
 
     test_base_dir = args.test_base_dir
     tex_tests_root_dir = path_util.path_join(test_base_dir, "tests")
 
+    test_dependency_index = FileSystemTestDependencyIndex(
+        path_util.path_join(test_base_dir, ".build", "test_dependency_index.json")
+    )
+
+    num_concurrent_processes = min(max(int(1.5 * cast(int, os.cpu_count())), 2), 16)
+
     test_config = TestConfig(
         test_base_dir=test_base_dir,
         proto_dir=args.proto_dir,
-        num_concurrent_processes=min(max(int(1.5 * cast(int, os.cpu_count())), 2), 16),
+        num_concurrent_processes=num_concurrent_processes,
+        num_concurrent_builds=(
+            max(args.num_concurrent_builds, 1)
+            if args.num_concurrent_builds is not None
+            else num_concurrent_processes
+        ),
+        process_memory_budget=(
+            args.process_memory_budget_mib * 1024 * 1024
+            if args.process_memory_budget_mib is not None
+            else None
+        ),
     )
     test_runner_config = TestRunnerConfig(
-        run_warmup_compile_before_tests=args.run_warmup_compile_before_tests,
+        run_warmup_compile_before_tests=(
+            args.run_warmup_compile_before_tests or warmup_cache is not None
+        ),
     )
 
     engine = TestEngine(
         test_config,
         path_util=path_util,
         fs=FileSystem(),
-        latex_doc_buildtool=ltxpect.buildtools.misc.MakefileTestBuilder(path_util),
+        latex_doc_buildtool=latex_doc_buildtool,
         pdf_doc_info_provider=pdf_doc_info_provider,
         pdf_page_rasterizer=pdf_page_rasterizer,
         png_dimensions_inspector=png_dimensions_inspector,
         png_comparer=png_comparer,
+        rasterized_page_cache=rasterized_page_cache,
+        test_dependency_index=test_dependency_index,
     )
 
-    reporter = AggregateReporter(
-        [
-            TestResultsJsonReporter(
-                path_util.path_join(test_base_dir, "test_result.json")
-            ),
-            ColorConsoleReporter(),
-        ]
+    reporters: list[ltxpect.coreabc.ITestReporter] = [
+        TestResultsJsonReporter(path_util.path_join(test_base_dir, "test_result.json")),
+        TestResultsJsonLinesReporter(
+            path_util.path_join(test_base_dir, "test_result.jsonl")
+        ),
+        ColorConsoleReporter(),
+    ]
+    if args.timing_report:
+        reporters.append(TestTimingReporter())
+
+    trace_recorder: TraceRecorder | None = None
+    if args.trace_path is not None:
+        trace_recorder = TraceRecorder()
+        reporters.append(ChromeTraceReporter(args.trace_path, trace_recorder))
+
+    reporter = AggregateReporter(reporters)
+
+    test_duration_history = FileSystemTestDurationHistory(
+        path_util.path_join(test_base_dir, ".build", "test_durations.json")
     )
 
-    runner = TestRunner(test_runner_config, engine, reporter, path_util)
+    runner = TestRunner(
+        test_runner_config,
+        engine,
+        reporter,
+        path_util,
+        warmup_cache=warmup_cache,
+        duration_history=test_duration_history,
+    )
 
     if args.test_name is not None:
         tests = [args.test_name]
@@ -181,5 +340,17 @@ if __name__ == "__main__":
             )
         ]
 
-    retcode = asyncio.run(runner.run_async(tests))
+    if args.changed_only:
+        tests = [
+            test_name
+            for test_name in tests
+            if test_dependency_index.has_changed_inputs(test_name)
+        ]
+
+    with (
+        record_trace(trace_recorder)
+        if trace_recorder is not None
+        else contextlib.nullcontext()
+    ):
+        retcode = asyncio.run(runner.run_async(tests))
     sys.exit(retcode)